@@ -0,0 +1,76 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+Timings (seconds, latency percentiles) regress when they grow; throughputs
+(".._per_second") regress when they shrink. Exits with status 1 if any
+metric regressed by more than the threshold, so it can gate CI.
+
+Usage:
+    python -m benchmarks.compare benchmarks/results/abc123.json benchmarks/results/def456.json
+    python -m benchmarks.compare old.json new.json --threshold 0.10
+"""
+
+import sys
+import json
+import argparse
+
+# Metrics compared per transcript: (stage, field)
+TIMINGS = [
+    ("parse", "seconds"), ("split", "seconds"), ("embed", "seconds"), ("faiss_build", "seconds"),
+    ("query", "p50"), ("query", "p95"), ("query", "p99"),
+    ("agent", "p50"), ("agent", "p95"), ("agent", "p99"),
+]
+THROUGHPUTS = [("parse", "segments_per_second"), ("embed", "chunks_per_second")]
+SIZES = [("faiss_build", "index_bytes"), ("faiss_build", "store_bytes_estimate")]
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> list:
+    """
+    Compare two result files.
+
+    Returns:
+        list: (transcript, metric, baseline, candidate, relative change, regressed) rows
+    """
+    old_rows = {t["name"]: t for t in baseline["transcripts"]}
+    rows = []
+    for new in candidate["transcripts"]:
+        old = old_rows.get(new["name"])
+        if old is None:
+            continue
+        for metrics, higher_is_better in ((TIMINGS, False), (SIZES, False), (THROUGHPUTS, True)):
+            for stage, field in metrics:
+                before = old.get(stage, {}).get(field)
+                after = new.get(stage, {}).get(field)
+                if not before or after is None:
+                    continue
+                change = (after - before) / before
+                regressed = -change > threshold if higher_is_better else change > threshold
+                rows.append((new["name"], f"{stage}.{field}", before, after, change, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Relative change counted as a regression")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    rows = compare(baseline, candidate, args.threshold)
+    print(f"{baseline.get('commit')} -> {candidate.get('commit')}")
+    for name, metric, before, after, change, regressed in rows:
+        flag = "REGRESSION" if regressed else ""
+        print(f"{name:<24} {metric:<32} {before:>14.6g} {after:>14.6g} {change:>+8.1%} {flag}")
+
+    regressions = sum(1 for row in rows if row[-1])
+    print(f"\n{regressions} regression(s) over {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Retrieval quality / cost evaluation for tuning chunking, TOP_K, MAX_ITERATIONS, index type
+and query expansion.
+
+Runs a labeled question set over cached transcripts and sweeps a grid of
+settings. For every configuration it reports:
+- recall@k   Share of a question's labeled time spans covered by the top k chunks
+- MRR        Mean reciprocal rank of the first chunk overlapping a labeled span
+- prompt tokens per question (from the LLM calls of a full Agent.run)
+- search and Agent.run latency percentiles
+- answered   Share of questions ending in an answer rather than hitting MAX_ITERATIONS
+
+and the Pareto frontier over (recall@k up, prompt tokens down, agent p95 down)
+among configurations that answer at least --min-answered of the questions.
+
+Question set: JSON lines, one question per line, times in seconds:
+    {"video": "<transcript name>", "question": "...", "spans": [[start, end], ...]}
+where <transcript name> is the file stem of a transcript in --transcripts.
+Without --questions, synthetic transcripts with generated questions are used.
+
+Usage:
+    python -m benchmarks.evaluate
+    python -m benchmarks.evaluate --download https://youtu.be/VIDEO_ID --transcripts .cache/transcripts
+    python -m benchmarks.evaluate --transcripts .cache/transcripts --questions questions.jsonl \\
+        --chunk-sizes 500 1000 --top-ks 3 5 8 --index-types flat hnsw
+    python -m benchmarks.evaluate --expansions off keywords llm
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+from pathlib import Path
+from langchain_core.embeddings import Embeddings
+from benchmarks.run import percentiles, git_commit, RESULTS_DIR
+from benchmarks.synthetic import TOPICS, TOPIC_SECONDS, generate_json3, recorded_transcripts
+
+
+def synthetic_dataset(durations_minutes: list, seed: int = 0):
+    """Synthetic transcripts plus one question per topic, labeled with the times it is discussed."""
+    transcripts = {}
+    questions = []
+    for i, minutes in enumerate(durations_minutes):
+        name = f"synthetic-{minutes:g}m"
+        duration = minutes * 60
+        transcripts[name] = (generate_json3(duration, seed + i), "json3")
+        for t, topic in enumerate(TOPICS):
+            spans = [
+                [start, min(start + TOPIC_SECONDS, duration)]
+                for start in range(t * TOPIC_SECONDS, int(duration), len(TOPICS) * TOPIC_SECONDS)
+            ]
+            if spans:
+                questions.append({"video": name, "question": f"What is said about {topic}?", "spans": spans})
+    return transcripts, questions
+
+
+def download(urls: list, directory: str):
+    """Fetch transcripts with yt-dlp and cache them as <video id>.json."""
+    from src.youtube_loader import YouTubeLoader
+    loader = YouTubeLoader()
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    for url in urls:
+        path = Path(directory) / f"{loader._extract_id(url)}.json"
+        path.write_text(json.dumps(loader.fetch_transcript(url)))
+        print(f"Cached {url} -> {path}", file=sys.stderr)
+
+
+def overlaps(doc, span) -> bool:
+    return doc.metadata["start"] <= span[1] and doc.metadata["end"] >= span[0]
+
+
+def retrieval_metrics(ranked_docs: list, spans: list, k: int) -> tuple:
+    """(recall@k, reciprocal rank) for one question."""
+    top = ranked_docs[:k]
+    covered = sum(1 for span in spans if any(overlaps(d, span) for d in top))
+    rank = next((i + 1 for i, d in enumerate(top) if any(overlaps(d, s) for s in spans)), None)
+    return covered / len(spans), (1.0 / rank if rank else 0.0)
+
+
+class _CachedEmbeddings(Embeddings):
+    """Embeds each distinct text once across the whole sweep."""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self._cache = {}
+
+    def embed_documents(self, texts):
+        missing = [t for t in dict.fromkeys(texts) if t not in self._cache]
+        if missing:
+            self._cache.update(zip(missing, self.embeddings.embed_documents(missing)))
+        return [self._cache[t] for t in texts]
+
+    def embed_query(self, text):
+        if ("query", text) not in self._cache:
+            self._cache[("query", text)] = self.embeddings.embed_query(text)
+        return self._cache[("query", text)]
+
+
+def pareto_frontier(rows: list, min_answered: float = 0.95) -> list:
+    """
+    Rows not dominated on (recall@k up, prompt tokens down, agent p95 down).
+
+    Configurations answering fewer than min_answered of the questions are
+    left out; cutting the agent off early is otherwise "cheapest".
+    """
+    def key(row):
+        return (row["recall_at_k"], -row["prompt_tokens"], -row["agent_latency"]["p95"])
+
+    rows = [row for row in rows if row["answered"] >= min_answered]
+    frontier = []
+    for row in rows:
+        a = key(row)
+        dominated = any(
+            all(x >= y for x, y in zip(key(other), a)) and key(other) != a
+            for other in rows
+        )
+        if not dominated:
+            frontier.append(row)
+    return sorted(frontier, key=lambda r: -r["recall_at_k"])
+
+
+def evaluate(transcripts: dict, questions: list, args) -> list:
+    from src import tracing
+    from src.youtube_loader import YouTubeLoader
+    from src.vector_store import VectorStore, get_embeddings
+    from src.agent import Agent
+    from src.llm_manager import LLM
+    from src.query_expansion import QueryExpander
+
+    memory = tracing.MemoryExporter()
+    tracing.configure(True, [memory])
+    embeddings = _CachedEmbeddings(get_embeddings())
+    llm = LLM(provider=args.llm)
+
+    parsed = {}
+    for name, (content, format_type) in transcripts.items():
+        parsed[name] = YouTubeLoader()._parse_subtitles(content, format_type)
+
+    rows = []
+    for chunk_size, overlap in itertools.product(args.chunk_sizes, args.overlaps):
+        if overlap >= chunk_size:
+            continue
+        loader = YouTubeLoader(chunk_size, overlap)
+        docs = {name: loader.split_transcript(t, name) for name, t in parsed.items()}
+
+        for index_type, expansion in itertools.product(args.index_types, args.expansions):
+            expander = QueryExpander(expansion, llm.get("rewrite"))
+            stores = {}
+            for name, video_docs in docs.items():
+                store = VectorStore(index_type)
+                store.embeddings = embeddings
+                store.create(video_docs)
+                stores[name] = store
+
+            # One search at the largest k; smaller k use its prefix
+            max_k = max(args.top_ks)
+            ranked, search_latency = [], []
+            for q in questions:
+                started = time.perf_counter()
+                ranked.append(stores[q["video"]].search_many(expander.expand(q["question"]), k=max_k))
+                search_latency.append(time.perf_counter() - started)
+
+            for top_k, max_iterations in itertools.product(args.top_ks, args.max_iterations):
+                metrics = [retrieval_metrics(r, q["spans"], top_k) for r, q in zip(ranked, questions)]
+                agents = {
+                    name: Agent(
+                        llm.get("final"), store.as_retriever(k=top_k, expander=expander),
+                        tool_llm=llm.get("tool_call"), max_iterations=max_iterations
+                    )
+                    for name, store in stores.items()
+                }
+
+                memory.clear()
+                agent_latency = []
+                answered = 0
+                for q in questions[:args.agent_questions]:
+                    started = time.perf_counter()
+                    # Runs cut off by max_iterations end on a tool call with no answer text
+                    answered += bool(agents[q["video"]].run(q["question"]).strip())
+                    agent_latency.append(time.perf_counter() - started)
+                runs = memory.spans("agent.question")
+                prompt_tokens = sum(s.attributes.get("input_tokens", 0) for s in memory.spans("llm.invoke"))
+
+                row = {
+                    "chunk_size": chunk_size,
+                    "chunk_overlap": overlap,
+                    "index_type": index_type,
+                    "query_expansion": expansion,
+                    "top_k": top_k,
+                    "max_iterations": max_iterations,
+                    "chunks": sum(len(d) for d in docs.values()),
+                    "recall_at_k": sum(m[0] for m in metrics) / len(metrics),
+                    "mrr": sum(m[1] for m in metrics) / len(metrics),
+                    "prompt_tokens": prompt_tokens / max(len(runs), 1),
+                    "answered": answered / max(len(runs), 1),
+                    "search_latency": percentiles(search_latency),
+                    "agent_latency": percentiles(agent_latency)
+                }
+                rows.append(row)
+                print(
+                    f"size={chunk_size:<5} overlap={overlap:<4} index={index_type:<5} expand={expansion:<8} k={top_k:<2} "
+                    f"iters={max_iterations:<2} recall={row['recall_at_k']:.3f} mrr={row['mrr']:.3f} "
+                    f"tokens={row['prompt_tokens']:.0f} agent_p95={row['agent_latency']['p95'] * 1000:.1f}ms",
+                    file=sys.stderr
+                )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep retrieval settings over a labeled question set")
+    parser.add_argument("--transcripts", help="Directory of cached transcripts (.json3 or list-of-segments .json)")
+    parser.add_argument("--questions", help="Labeled questions (JSON lines); synthetic if omitted")
+    parser.add_argument("--download", nargs="*", help="Fetch these videos into --transcripts first")
+    parser.add_argument("--durations", type=float, nargs="*", default=[30, 90],
+                        help="Synthetic transcript lengths in minutes (without --questions)")
+    parser.add_argument("--chunk-sizes", type=int, nargs="*", default=[500, 1000, 1500])
+    parser.add_argument("--overlaps", type=int, nargs="*", default=[0, 200])
+    parser.add_argument("--top-ks", type=int, nargs="*", default=[3, 5, 8])
+    parser.add_argument("--max-iterations", type=int, nargs="*", default=[2, 4, 10])
+    parser.add_argument("--index-types", nargs="*", default=["flat", "hnsw", "ivf"])
+    parser.add_argument("--expansions", nargs="*", default=["off"], choices=["off", "keywords", "llm"],
+                        help="Query expansion modes (QUERY_EXPANSION)")
+    parser.add_argument("--agent-questions", type=int, default=20, help="Agent.run calls per configuration")
+    parser.add_argument("--embeddings", default="hashing", choices=["hashing", "huggingface"],
+                        help="Embedding provider (huggingface downloads the configured model)")
+    parser.add_argument("--llm", default="fake", help="LLM provider for the agent runs (fake or groq)")
+    parser.add_argument("--min-answered", type=float, default=0.95,
+                        help="Share of questions a configuration must answer to be on the frontier")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/eval-<commit>.json)")
+    args = parser.parse_args()
+
+    # Must be set before the project modules read their settings
+    os.environ["EMBEDDING_PROVIDER"] = args.embeddings
+    os.environ["LLM_PROVIDER"] = args.llm
+    os.environ.setdefault("FAKE_LLM_LATENCY", "0")
+    os.environ.setdefault("FAKE_LLM_TOKENS_PER_SECOND", "1000000")
+
+    if args.download:
+        if not args.transcripts:
+            parser.error("--download needs --transcripts")
+        download(args.download, args.transcripts)
+
+    if args.questions:
+        if not args.transcripts:
+            parser.error("--questions needs --transcripts")
+        transcripts = {name: (content, fmt) for name, content, fmt in recorded_transcripts(args.transcripts)}
+        with open(args.questions, encoding="utf-8") as f:
+            questions = [json.loads(line) for line in f if line.strip()]
+        missing = {q["video"] for q in questions} - set(transcripts)
+        if missing:
+            parser.error(f"No cached transcript for: {', '.join(sorted(missing))}")
+    else:
+        transcripts, questions = synthetic_dataset(args.durations, args.seed)
+
+    rows = evaluate(transcripts, questions, args)
+    frontier = pareto_frontier(rows, args.min_answered)
+
+    print(f"\nPareto frontier (recall@k up, prompt tokens down, agent p95 down; answered >= {args.min_answered:.0%}):",
+          file=sys.stderr)
+    for row in frontier:
+        print(
+            f"  CHUNK_SIZE={row['chunk_size']} CHUNK_OVERLAP={row['chunk_overlap']} TOP_K={row['top_k']} "
+            f"MAX_ITERATIONS={row['max_iterations']} INDEX_TYPE={row['index_type']!r} "
+            f"QUERY_EXPANSION={row['query_expansion']!r}: "
+            f"recall={row['recall_at_k']:.3f} mrr={row['mrr']:.3f} tokens={row['prompt_tokens']:.0f} "
+            f"agent_p95={row['agent_latency']['p95'] * 1000:.1f}ms",
+            file=sys.stderr
+        )
+
+    commit = git_commit()
+    output = Path(args.output) if args.output else RESULTS_DIR / f"eval-{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        "commit": commit,
+        "timestamp": time.time(),
+        "questions": len(questions),
+        "llm": args.llm,
+        "embedding_provider": args.embeddings,
+        "results": rows,
+        "pareto_frontier": frontier
+    }, indent=2))
+    print(f"Results written to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
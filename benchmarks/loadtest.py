@@ -0,0 +1,605 @@
+"""
+Load test: simulated concurrent chat sessions against YouTubeQA.
+
+Users arrive at random (Poisson arrivals) at each of the given rates. Each
+user opens a session, loads a video from the mix, asks a few questions with
+think time in between, then closes the session. Everything runs offline:
+videos are synthetic transcripts served through the loader's metadata cache
+(the normal fetch, parse, split and index path still runs), embeddings use
+the hashing stand-in and answers come from the fake LLM with a configurable
+time to first token and token rate.
+
+Modes:
+- sync    YouTubeQA.ask, one thread per user
+- stream  YouTubeQA.ask_stream, one thread per user (time to first token is the first partial answer)
+- async   aload_video and ask_stream from an event loop, the way src/server.py runs them
+- http    The HTTP API (src/server.py) on a local port with Server-Sent Events,
+          or an already running server with --url (and real videos with --urls)
+
+Reported per arrival rate: throughput, time-to-first-token and total latency
+percentiles (p50/p95/p99), video load latency, peak concurrent sessions,
+memory growth (RSS) and cache hit rates: provider prefix cache (LLM
+scheduler), shared index cache and shared video loads (IndexManager), and
+cached prompt tokens per prompt version (prompt registry). The highest rate
+whose p95 latency meets --slo-p95 with under 1% errors is reported as the
+sustained rate, with the number of concurrent sessions it implies.
+
+Usage:
+    python -m benchmarks.loadtest
+    python -m benchmarks.loadtest --rates 0.5 1 2 4 --duration 60 --mode stream
+    python -m benchmarks.loadtest --videos 10 60 --video-weights 3 1 \\
+        --question-mix topic=0.6 followup=0.2 summary=0.1 metadata=0.1
+    python -m benchmarks.loadtest --mode http --url http://127.0.0.1:8000 --urls https://youtu.be/VIDEO_ID
+"""
+
+import gc
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.run import percentiles, rss_bytes, git_commit, RESULTS_DIR
+from benchmarks.synthetic import TOPIC_SECONDS, generate_json3, topic_at
+
+CHAPTER_SECONDS = 600  # Synthetic videos get a chapter every 10 minutes
+MAX_ERROR_RATE = 0.01  # Error share above which a rate does not count as sustained
+
+TOPIC_QUESTIONS = [
+    "What does the video say about {}?",
+    "Can you explain the part about {}?",
+    "What are the main points on {}?",
+]
+FOLLOWUP_QUESTIONS = ["Can you tell me more about that?", "Why is that important?", "Can you give an example?"]
+SUMMARY_QUESTIONS = ["Summarize the video", "What is this video about overall?"]
+METADATA_QUESTIONS = ["How long is the video?", "What are the video's chapters?"]
+
+
+def register_videos(minutes: list, seed: int = 0) -> list:
+    """
+    Make synthetic videos loadable without network access.
+
+    Each video's metadata is put in the loader's process-wide cache, with its
+    json3 captions as a data: URL, so load_video runs the normal path.
+
+    Args:
+        minutes: Video lengths in minutes
+        seed: Transcript seed (video i uses seed + i)
+
+    Returns:
+        list: (video URL, topics spoken about) per video
+    """
+    import base64
+    from src import youtube_loader
+
+    videos = []
+    for i, length in enumerate(minutes):
+        video_id = f"loadtest{i:03d}"  # 11 characters, like a YouTube ID
+        duration = length * 60
+        captions = base64.b64encode(generate_json3(duration, seed + i).encode("utf-8")).decode("ascii")
+        info = {
+            "id": video_id,
+            "title": f"Synthetic {length:g} minute video",
+            "channel": "Load test",
+            "description": "",
+            "upload_date": "20240101",
+            "duration": duration,
+            "language": "en",
+            "chapters": [
+                {"title": topic_at(start), "start_time": start, "end_time": min(start + CHAPTER_SECONDS, duration)}
+                for start in range(0, int(duration), CHAPTER_SECONDS)
+            ],
+            "subtitles": {"en": [{"ext": "json3", "url": f"data:application/json;base64,{captions}"}]},
+            "automatic_captions": {}
+        }
+        with youtube_loader._info_lock:
+            # Dated in the future so the entry does not expire during a long run
+            youtube_loader._info_cache[video_id] = (time.time() + 10 ** 9, info)
+        topics = list(dict.fromkeys(topic_at(t) for t in range(0, int(duration), TOPIC_SECONDS)))
+        videos.append((f"https://www.youtube.com/watch?v={video_id}", topics))
+    return videos
+
+
+def parse_mix(items: list) -> dict:
+    """Question kind weights from "kind=weight" arguments."""
+    mix = {}
+    for item in items:
+        kind, _, weight = item.partition("=")
+        if kind not in ("topic", "followup", "summary", "metadata"):
+            raise SystemExit(f"Unknown question kind: {kind}")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def make_question(kind: str, topics: list, rng: random.Random, zipf: float) -> str:
+    """A question of one kind; topics are drawn with Zipf popularity (a few are asked about most)."""
+    if kind == "followup":
+        return rng.choice(FOLLOWUP_QUESTIONS)
+    if kind == "summary":
+        return rng.choice(SUMMARY_QUESTIONS)
+    if kind == "metadata":
+        return rng.choice(METADATA_QUESTIONS)
+    topic = rng.choices(topics, weights=[1.0 / (rank + 1) ** zipf for rank in range(len(topics))])[0]
+    return rng.choice(TOPIC_QUESTIONS).format(topic)
+
+
+class LocalClient:
+    """One user's session on a YouTubeQA from the shared SessionManager."""
+
+    def __init__(self, sessions, stream: bool):
+        self.sessions = sessions
+        self.stream = stream
+        self.session_id = str(uuid.uuid4())
+
+    def load(self, url: str) -> bool:
+        return self.sessions.get(self.session_id).load_video(url)
+
+    def ask(self, question: str, started: float):
+        """(time to first token or None, answer)."""
+        qa = self.sessions.get(self.session_id)
+        if not self.stream:
+            return None, qa.ask(question)
+        return consume_stream(qa.ask_stream(question), started)
+
+    def close(self):
+        self.sessions.close(self.session_id)
+
+
+class AsyncLocalClient(LocalClient):
+    """One user's session driven from the event loop, as the HTTP server does."""
+
+    async def load(self, url: str) -> bool:
+        return await self.sessions.get(self.session_id).aload_video(url)
+
+    async def ask(self, question: str, started: float):
+        qa = self.sessions.get(self.session_id)
+        # Includes the wait for a default-executor thread, like a server request
+        return await asyncio.to_thread(consume_stream, qa.ask_stream(question), started)
+
+
+class HttpClient:
+    """One user's session over the HTTP API (streamed answers)."""
+
+    def __init__(self, base_url: str, tenant: str):
+        import httpx
+        self.client = httpx.Client(base_url=base_url, timeout=300, headers={"X-Tenant-ID": tenant})
+        self.session_id = str(uuid.uuid4())
+
+    def load(self, url: str) -> bool:
+        response = self.client.post("/videos", json={"session_id": self.session_id, "url": url})
+        return response.status_code == 200
+
+    def ask(self, question: str, started: float):
+        ttft, answer = None, ""
+        payload = {"session_id": self.session_id, "question": question, "stream": True}
+        with self.client.stream("POST", "/ask", json=payload) as response:
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP {response.status_code}")
+            event = "message"
+            for line in response.iter_lines():
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    data = json.loads(line[5:])
+                    if event == "error":
+                        raise RuntimeError(data["error"])
+                    if event == "done":
+                        answer = data["answer"]
+                    elif data.get("delta") and ttft is None:
+                        ttft = time.perf_counter() - started
+                    event = "message"
+        return ttft, answer
+
+    def close(self):
+        self.client.delete(f"/sessions/{self.session_id}")
+        self.client.close()
+
+
+def consume_stream(chunks, started: float):
+    """Drain an ask_stream generator: (seconds to the first non-empty partial answer, final answer)."""
+    ttft, answer = None, ""
+    for partial in chunks:
+        if partial and ttft is None:
+            ttft = time.perf_counter() - started
+        answer = partial
+    return ttft, answer
+
+
+class LoadTest:
+    """Runs the arrival phases and collects per-question measurements."""
+
+    def __init__(self, args, videos: list):
+        self.args = args
+        self.videos = videos
+        self.mix = parse_mix(args.question_mix)
+        self.base_url = args.url
+        self.server = None
+        self.sessions = None
+        if not args.url:
+            from src.session_manager import SessionManager
+            self.sessions = SessionManager()
+            if args.mode == "http":
+                self.server, self.base_url = start_server(self.sessions)
+        self._lock = threading.Lock()
+        self._active = 0
+        self._peak = 0
+        self._records = []
+
+    def client(self, user: int):
+        if self.args.mode == "http":
+            return HttpClient(self.base_url, f"tenant{user % self.args.tenants}")
+        if self.args.mode == "async":
+            return AsyncLocalClient(self.sessions, stream=True)
+        return LocalClient(self.sessions, stream=self.args.mode == "stream")
+
+    def plan(self, rng: random.Random):
+        """A user's video and questions."""
+        url, topics = rng.choices(self.videos, weights=self.args.video_weights or None)[0]
+        kinds = rng.choices(list(self.mix), weights=list(self.mix.values()), k=self.args.questions)
+        if kinds and kinds[0] == "followup":
+            kinds[0] = "topic"  # A follow-up needs an earlier question
+        return url, [(kind, make_question(kind, topics, rng, self.args.zipf)) for kind in kinds]
+
+    def user(self, phase: int, user: int):
+        rng = random.Random(f"{self.args.seed}:{phase}:{user}")
+        url, questions = self.plan(rng)
+        client = self.client(user)
+        self._enter()
+        try:
+            started = time.perf_counter()
+            loaded = client.load(url)
+            self._record(phase, "load", started, None, None if loaded else "load failed")
+            if not loaded:
+                return
+            for i, (kind, question) in enumerate(questions):
+                if i:
+                    time.sleep(rng.expovariate(1.0 / self.args.think_time) if self.args.think_time else 0)
+                started = time.perf_counter()
+                try:
+                    ttft, _ = client.ask(question, started)
+                    self._record(phase, kind, started, ttft)
+                except Exception as e:
+                    self._record(phase, kind, started, None, str(e))
+        finally:
+            client.close()
+            self._exit()
+
+    async def user_async(self, phase: int, user: int):
+        rng = random.Random(f"{self.args.seed}:{phase}:{user}")
+        url, questions = self.plan(rng)
+        client = self.client(user)
+        self._enter()
+        try:
+            started = time.perf_counter()
+            loaded = await client.load(url)
+            self._record(phase, "load", started, None, None if loaded else "load failed")
+            if not loaded:
+                return
+            for i, (kind, question) in enumerate(questions):
+                if i and self.args.think_time:
+                    await asyncio.sleep(rng.expovariate(1.0 / self.args.think_time))
+                started = time.perf_counter()
+                try:
+                    ttft, _ = await client.ask(question, started)
+                    self._record(phase, kind, started, ttft)
+                except Exception as e:
+                    self._record(phase, kind, started, None, str(e))
+        finally:
+            client.close()
+            self._exit()
+
+    def run_phase(self, phase: int, rate: float) -> dict:
+        """Users arrive at rate per second for --duration seconds; waits for all of them to finish."""
+        rng = random.Random(f"{self.args.seed}:{phase}")
+        arrivals, t = [], rng.expovariate(rate)
+        while t < self.args.duration:
+            arrivals.append(t)
+            t += rng.expovariate(rate)
+
+        before = self.status()
+        gc.collect()
+        rss_start = rss_bytes()
+        sampler = MemorySampler()
+        sampler.start()
+        with self._lock:
+            self._peak = self._active
+        started = time.perf_counter()
+        if self.args.mode == "async":
+            asyncio.run(self._arrive_async(phase, arrivals, started))
+        else:
+            with ThreadPoolExecutor(max_workers=self.args.max_users) as pool:
+                for user, at in enumerate(arrivals):
+                    time.sleep(max(0.0, started + at - time.perf_counter()))
+                    pool.submit(self.user, phase, user)
+        elapsed = time.perf_counter() - started
+        sampler.stop()
+        gc.collect()
+        rss_end = rss_bytes()
+        after = self.status()
+
+        records = [r for r in self._records if r["phase"] == phase]
+        questions = [r for r in records if r["kind"] != "load"]
+        answered = [r for r in questions if r["error"] is None]
+        loads = [r for r in records if r["kind"] == "load"]
+        errors = [r for r in records if r["error"] is not None]
+        return {
+            "rate": rate,
+            "seconds": elapsed,
+            "users": len(arrivals),
+            "questions": len(questions),
+            "errors": len(errors),
+            "error_rate": len(errors) / max(len(records), 1),
+            "error_samples": sorted({r["error"] for r in errors})[:5],
+            "throughput_qps": len(answered) / elapsed if elapsed else 0.0,
+            "peak_sessions": self._peak,
+            "ttft": percentiles([r["ttft"] for r in answered if r["ttft"] is not None]),
+            "latency": percentiles([r["latency"] for r in answered]),
+            "latency_by_kind": {
+                kind: percentiles([r["latency"] for r in answered if r["kind"] == kind])
+                for kind in sorted({r["kind"] for r in answered})
+            },
+            "load_latency": percentiles([r["latency"] for r in loads if r["error"] is None]),
+            "memory": {
+                "rss_start_bytes": rss_start,
+                "rss_end_bytes": rss_end,
+                "rss_peak_bytes": max(sampler.peak, rss_end),
+                "growth_bytes": rss_end - rss_start,
+                "index_bytes": after.get("total_bytes", 0)
+            },
+            "cache": cache_rates(before, after)
+        }
+
+    async def _arrive_async(self, phase: int, arrivals: list, started: float):
+        tasks = []
+        for user, at in enumerate(arrivals):
+            await asyncio.sleep(max(0.0, started + at - time.perf_counter()))
+            tasks.append(asyncio.create_task(self.user_async(phase, user)))
+        await asyncio.gather(*tasks)
+
+    def warm_up(self):
+        """Load every video once so phases measure steady state (indexes stay in the shared cache)."""
+        for url, _ in self.videos:
+            client = HttpClient(self.base_url, "warmup") if self.args.mode == "http" else LocalClient(self.sessions, False)
+            client.load(url)
+            client.close()
+
+    def status(self) -> dict:
+        """Same shape as the server's /status."""
+        if self.args.mode == "http":
+            import httpx
+            return httpx.get(f"{self.base_url}/status", timeout=30).json()
+        from src.llm_manager import get_scheduler
+        from src.prompt_registry import get_registry
+        from src.workers import get_workers
+        return {
+            "llm_scheduler": get_scheduler().metrics(),
+            "prompts": get_registry().report(),
+            "workers": get_workers().metrics(),
+            **self.sessions.report()
+        }
+
+    def close(self):
+        if self.server is not None:
+            self.server.should_exit = True
+        if self.sessions is not None:
+            self.sessions.close_all()
+
+    def _enter(self):
+        with self._lock:
+            self._active += 1
+            self._peak = max(self._peak, self._active)
+
+    def _exit(self):
+        with self._lock:
+            self._active -= 1
+
+    def _record(self, phase: int, kind: str, started: float, ttft, error: str = None):
+        with self._lock:
+            self._records.append({
+                "phase": phase, "kind": kind, "latency": time.perf_counter() - started, "ttft": ttft, "error": error
+            })
+
+
+class MemorySampler:
+    """Peak RSS while a phase runs."""
+
+    def __init__(self, interval: float = 0.2):
+        self.interval = interval
+        self.peak = rss_bytes()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._done.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, rss_bytes())
+
+
+def start_server(sessions):
+    """Serve the HTTP API on a free local port in a background thread; returns (server, base URL)."""
+    import socket
+    import uvicorn
+    from src.server import create_app
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(create_app(sessions), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def cache_rates(before: dict, after: dict) -> dict:
+    """Hit rates of a phase, from the difference of two /status snapshots."""
+    def rate(hits, total):
+        return hits / total if total else 0.0
+
+    def delta(key):
+        return after.get(key, 0) - before.get(key, 0)
+
+    def prompt_totals(status):
+        # (prompt tokens, cached prompt tokens) per prefix-cache model
+        return {m: (s["prompt_tokens"], s["cached_tokens"]) for m, s in status["llm_scheduler"]["prefix_cache"].items()}
+
+    def version_totals(status):
+        # (input tokens, cached tokens) per prompt version
+        return {
+            v: (s["input_tokens_per_question"] * s["questions"], s["cached_tokens"])
+            for v, s in status["prompts"]["stats"].items()
+        }
+
+    def changes(old, new):
+        return {key: (total - old.get(key, (0, 0))[0], cached - old.get(key, (0, 0))[1])
+                for key, (total, cached) in new.items()}
+
+    models = changes(prompt_totals(before), prompt_totals(after))
+    versions = changes(version_totals(before), version_totals(after))
+    return {
+        "prefix_cache_hit_rate": rate(sum(c for _, c in models.values()), sum(t for t, _ in models.values())),
+        "index_cache_hit_rate": rate(delta("hits"), delta("hits") + delta("misses")),
+        "index_evictions": delta("evictions"),
+        "shared_loads": delta("shared_loads"),
+        "prompt_cached_share": {v: rate(cached, total) for v, (total, cached) in versions.items() if total}
+    }
+
+
+def format_seconds(summary: dict, key: str = "p95") -> str:
+    return f"{summary[key]:.2f}s" if summary.get("n") else "n/a"
+
+
+def sustained(phases: list, slo_p95: float) -> dict:
+    """Highest rate (tried in increasing order) whose p95 latency meets the SLO with few errors."""
+    best = None
+    for phase in sorted(phases, key=lambda p: p["rate"]):
+        ok = (
+            phase["error_rate"] <= MAX_ERROR_RATE
+            and phase["latency"].get("p95", float("inf")) <= slo_p95
+        )
+        if not ok:
+            break
+        best = phase
+    if best is None:
+        return {"rate": 0.0, "sessions": 0}
+    return {"rate": best["rate"], "sessions": best["peak_sessions"], "throughput_qps": best["throughput_qps"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated concurrent chat sessions against YouTubeQA")
+    parser.add_argument("--mode", default="stream", choices=["sync", "stream", "async", "http"])
+    parser.add_argument("--rates", type=float, nargs="+", default=[0.5, 1, 2, 4],
+                        help="User arrival rates (users/sec), one phase each")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of arrivals per phase")
+    parser.add_argument("--videos", type=float, nargs="+", default=[10, 60], help="Synthetic video lengths in minutes")
+    parser.add_argument("--video-weights", type=float, nargs="*", help="Share of users per video (default: equal)")
+    parser.add_argument("--urls", nargs="*", help="Real video URLs instead of synthetic ones (needs network)")
+    parser.add_argument("--questions", type=int, default=3, help="Questions per user")
+    parser.add_argument("--question-mix", nargs="+", default=["topic=0.7", "followup=0.15", "summary=0.05", "metadata=0.1"],
+                        help="Question kinds and weights (topic, followup, summary, metadata)")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Topic popularity skew (0 = uniform)")
+    parser.add_argument("--think-time", type=float, default=2.0, help="Mean seconds between a user's questions")
+    parser.add_argument("--max-users", type=int, default=512, help="Users in progress at once (threaded modes)")
+    parser.add_argument("--tenants", type=int, default=16, help="Distinct X-Tenant-ID values (http mode)")
+    parser.add_argument("--url", help="Base URL of a running server (http mode)")
+    parser.add_argument("--cold", action="store_true", help="Skip loading every video before the first phase")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Fake LLM time to first token (s)")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=250, help="Fake LLM output rate")
+    parser.add_argument("--slo-p95", type=float, default=10.0, help="p95 answer latency (s) a sustained rate must meet")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/loadtest-<commit>.json)")
+    args = parser.parse_args()
+    if args.url and args.mode != "http":
+        parser.error("--url needs --mode http")
+    if args.url and not args.urls:
+        parser.error("A remote server cannot load synthetic videos; pass --urls")
+
+    # Must be set before the project modules read their settings
+    os.environ["EMBEDDING_PROVIDER"] = "hashing"
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["FAKE_LLM_LATENCY"] = str(args.llm_latency)
+    os.environ["FAKE_LLM_TOKENS_PER_SECOND"] = str(args.llm_tokens_per_second)
+
+    from config import settings
+    from benchmarks.synthetic import TOPICS
+
+    if args.urls:
+        videos = [(url, TOPICS) for url in args.urls]
+    else:
+        videos = register_videos(args.videos, args.seed)
+    if args.video_weights and len(args.video_weights) != len(videos):
+        parser.error("--video-weights needs one weight per video")
+
+    test = LoadTest(args, videos)
+    rss_baseline = rss_bytes()
+    if not args.cold:
+        print("Loading videos...", file=sys.stderr)
+        test.warm_up()
+
+    commit = git_commit()
+    results = {
+        "commit": commit,
+        "timestamp": time.time(),
+        "settings": {
+            "mode": args.mode,
+            "videos": args.urls or args.videos,
+            "video_weights": args.video_weights,
+            "questions_per_user": args.questions,
+            "question_mix": test.mix,
+            "zipf": args.zipf,
+            "think_time": args.think_time,
+            "duration": args.duration,
+            "llm_latency": args.llm_latency,
+            "llm_tokens_per_second": args.llm_tokens_per_second,
+            "index_type": settings.INDEX_TYPE,
+            "prompt_version": settings.PROMPT_VERSION,
+            "server_max_concurrency": settings.SERVER_MAX_CONCURRENCY
+        },
+        "rss_baseline_bytes": rss_baseline,
+        "phases": []
+    }
+    try:
+        for phase, rate in enumerate(args.rates):
+            print(f"{rate:g} users/s for {args.duration:g}s...", file=sys.stderr)
+            row = test.run_phase(phase, rate)
+            results["phases"].append(row)
+            print(
+                f"  {row['users']} users, {row['questions']} questions, {row['errors']} errors | "
+                f"{row['throughput_qps']:.2f} q/s | peak {row['peak_sessions']} sessions | "
+                f"ttft p95 {format_seconds(row['ttft'])} | latency p50 {row['latency'].get('p50', 0):.2f}s "
+                f"p95 {row['latency'].get('p95', 0):.2f}s p99 {row['latency'].get('p99', 0):.2f}s | "
+                f"rss {row['memory']['growth_bytes'] / 1e6:+.1f} MB | "
+                f"prefix cache {row['cache']['prefix_cache_hit_rate']:.0%} index cache {row['cache']['index_cache_hit_rate']:.0%}",
+                file=sys.stderr
+            )
+    finally:
+        test.close()
+
+    results["rss_growth_bytes"] = rss_bytes() - rss_baseline
+    results["sustained"] = sustained(results["phases"], args.slo_p95)
+    print(
+        f"Sustained: {results['sustained']['rate']:g} users/s "
+        f"({results['sustained']['sessions']} concurrent sessions) at p95 <= {args.slo_p95:g}s",
+        file=sys.stderr
+    )
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"loadtest-{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"Results written to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
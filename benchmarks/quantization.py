@@ -0,0 +1,143 @@
+"""
+Recall/latency/memory report for reduced-precision embedding storage.
+
+Compares float16 and int8 (FAISS scalar quantization) indexes, with and
+without rescoring, against the exact float32 baseline:
+- recall@k  Overlap of the top k with the float32 flat index's top k
+- latency   Single-query search percentiles
+- bytes     Serialized index size
+
+Vectors are transcript chunk embeddings (synthetic transcripts by default),
+optionally padded with random vectors to reach a corpus size where scan
+speed matters.
+
+Usage:
+    python -m benchmarks.quantization
+    python -m benchmarks.quantization --embeddings huggingface --durations 60 360
+    python -m benchmarks.quantization --random 200000 --index-types flat hnsw
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+from benchmarks.run import percentiles, git_commit, RESULTS_DIR
+from benchmarks.synthetic import TOPICS, synthetic_transcripts
+
+# (precision, rescore factor) pairs compared against float32
+CONFIGS = [("float32", 0), ("float16", 0), ("float16", 4), ("int8", 0), ("int8", 2), ("int8", 4), ("int8", 8)]
+
+
+def corpus(args):
+    """(chunk vectors, query vectors) as float32 arrays."""
+    import numpy as np
+    from src.youtube_loader import YouTubeLoader
+    from src.vector_store import get_embeddings
+
+    embeddings = get_embeddings()
+    loader = YouTubeLoader()
+    texts = []
+    for name, content, format_type in synthetic_transcripts(args.durations, args.seed):
+        texts += [d.page_content for d in loader.split_transcript(loader._parse_subtitles(content, format_type), name)]
+    vectors = np.array(embeddings.embed_documents(texts), dtype="float32")
+
+    rng = np.random.default_rng(args.seed)
+    questions = [f"what is said about {TOPICS[i % len(TOPICS)]} part {i}" for i in range(args.queries)]
+    queries = np.array([embeddings.embed_query(q) for q in questions], dtype="float32")
+
+    if args.random:
+        # Unit vectors around the real ones, so the padding lives in the same space
+        base = vectors[rng.integers(0, len(vectors), args.random)]
+        noise = rng.normal(0, 0.05, base.shape).astype("float32")
+        extra = base + noise
+        extra /= np.linalg.norm(extra, axis=1, keepdims=True)
+        vectors = np.vstack([vectors, extra])
+    return vectors, queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare float16/int8 embedding storage with float32")
+    parser.add_argument("--durations", type=float, nargs="*", default=[60, 360],
+                        help="Synthetic transcript lengths in minutes")
+    parser.add_argument("--random", type=int, default=50000, help="Extra vectors added to the corpus")
+    parser.add_argument("--index-types", nargs="*", default=["flat"])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--embeddings", default="hashing", choices=["hashing", "huggingface"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/quantization-<commit>.json)")
+    args = parser.parse_args()
+
+    os.environ["EMBEDDING_PROVIDER"] = args.embeddings
+
+    import faiss
+    from src.vector_store import _convert_index
+
+    vectors, queries = corpus(args)
+    flat = faiss.IndexFlatL2(vectors.shape[1])
+    flat.add(vectors)
+    _, truth = flat.search(queries, args.k)
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries, k={args.k}", file=sys.stderr)
+
+    rows = []
+    for index_type in args.index_types:
+        for precision, rescore in CONFIGS:
+            started = time.perf_counter()
+            index = flat if (index_type, precision, rescore) == ("flat", "float32", 0) else \
+                _convert_index(flat, index_type, precision, rescore)
+            build_seconds = time.perf_counter() - started
+
+            latencies = []
+            found = []
+            for query in queries:
+                started = time.perf_counter()
+                _, ids = index.search(query.reshape(1, -1), args.k)
+                latencies.append(time.perf_counter() - started)
+                found.append(ids[0])
+            recall = sum(len(set(f) & set(t)) for f, t in zip(found, truth)) / (len(queries) * args.k)
+
+            row = {
+                "index_type": index_type,
+                "precision": precision,
+                "rescore": rescore,
+                "recall_at_k": recall,
+                "latency": percentiles(latencies),
+                "index_bytes": int(faiss.serialize_index(index).nbytes),
+                "build_seconds": build_seconds
+            }
+            rows.append(row)
+
+    baseline = {r["index_type"]: r for r in rows if r["precision"] == "float32"}
+    print(f"{'index':<6} {'precision':<9} {'rescore':>7} {'recall@k':>9} {'p50 ms':>8} {'p95 ms':>8} {'MB':>8} {'size':>6}",
+          file=sys.stderr)
+    for row in rows:
+        base = baseline[row["index_type"]]
+        row["size_vs_float32"] = row["index_bytes"] / base["index_bytes"]
+        row["p50_vs_float32"] = row["latency"]["p50"] / base["latency"]["p50"]
+        print(
+            f"{row['index_type']:<6} {row['precision']:<9} {row['rescore']:>7} {row['recall_at_k']:>9.4f} "
+            f"{row['latency']['p50'] * 1000:>8.3f} {row['latency']['p95'] * 1000:>8.3f} "
+            f"{row['index_bytes'] / 2**20:>8.1f} {row['size_vs_float32']:>5.2f}x",
+            file=sys.stderr
+        )
+
+    commit = git_commit()
+    output = Path(args.output) if args.output else RESULTS_DIR / f"quantization-{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        "commit": commit,
+        "timestamp": time.time(),
+        "vectors": len(vectors),
+        "dimension": int(vectors.shape[1]),
+        "k": args.k,
+        "embedding_provider": args.embeddings,
+        "results": rows
+    }, indent=2))
+    print(f"Results written to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
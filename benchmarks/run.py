@@ -0,0 +1,215 @@
+"""
+Offline benchmark suite for ingestion, retrieval and agent latency.
+
+For each transcript (synthetic json3 of several lengths, plus any recorded
+files) it measures:
+- _parse_subtitles throughput
+- transcript chunking
+- embedding throughput (chunks/sec)
+- FAISS build time and index memory
+- search latency percentiles
+- full Agent.run latency against the offline fake LLM
+
+Results are written as JSON (one file per commit by default) so runs can be
+compared with benchmarks/compare.py.
+
+Usage:
+    python -m benchmarks.run
+    python -m benchmarks.run --durations 10 60 360 --recorded path/to/json3_dir
+    python -m benchmarks.run --embeddings huggingface --output results.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import subprocess
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def percentiles(values: list) -> dict:
+    """Latency summary in seconds."""
+    values = sorted(values)
+    if not values:
+        return {"n": 0}
+
+    def pick(q):
+        return values[min(len(values) - 1, int(len(values) * q))]
+
+    return {
+        "n": len(values),
+        "mean": sum(values) / len(values),
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "max": values[-1]
+    }
+
+
+def timed(fn, repeat: int = 1):
+    """Run fn repeat times; returns (last result, median seconds)."""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        durations.append(time.perf_counter() - started)
+    return result, sorted(durations)[len(durations) // 2]
+
+
+def rss_bytes() -> int:
+    """Current resident set size (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def benchmark_transcript(name: str, content: str, format_type: str, args) -> dict:
+    """Run every stage on one transcript and return its measurements."""
+    import faiss
+    from src.youtube_loader import YouTubeLoader
+    from src.vector_store import VectorStore
+    from src.agent import Agent
+    from src.offline_models import FakeChatModel
+    from benchmarks.synthetic import TOPICS
+
+    loader = YouTubeLoader()
+    url = f"https://www.youtube.com/watch?v={name}"
+    result = {"name": name, "bytes": len(content.encode("utf-8"))}
+
+    transcript, seconds = timed(lambda: loader._parse_subtitles(content, format_type), args.repeat)
+    result["duration_seconds"] = transcript[-1]["start"]
+    result["parse"] = {
+        "seconds": seconds,
+        "segments": len(transcript),
+        "segments_per_second": len(transcript) / seconds,
+        "mb_per_second": result["bytes"] / seconds / 1e6
+    }
+
+    docs, seconds = timed(lambda: loader.split_transcript(transcript, url), args.repeat)
+    result["split"] = {"seconds": seconds, "chunks": len(docs)}
+
+    store = VectorStore()
+    texts = [d.page_content for d in docs]
+    vectors, seconds = timed(lambda: store.embeddings.embed_documents(texts))
+    result["embed"] = {"seconds": seconds, "chunks_per_second": len(texts) / seconds}
+
+    rss_before = rss_bytes()
+    # Same index and docstore as the app (INDEX_TYPE, DOCSTORE)
+    store.store, seconds = timed(lambda: store._build(list(zip(texts, vectors)), [d.metadata for d in docs]))
+    store.indexed = store.total = len(docs)
+    result["faiss_build"] = {
+        "seconds": seconds,
+        "vectors": store.store.index.ntotal,
+        "dimension": store.store.index.d,
+        "index_bytes": int(faiss.serialize_index(store.store.index).nbytes),
+        "store_bytes_estimate": store.memory_usage(),
+        "rss_delta_bytes": rss_bytes() - rss_before
+    }
+
+    rng = random.Random(args.seed)
+    queries = [f"what does the video say about {rng.choice(TOPICS)}?" for _ in range(args.queries)]
+    store.search(queries[0])  # Warm up
+    latencies = []
+    for query in queries:
+        _, seconds = timed(lambda: store.search(query))
+        latencies.append(seconds)
+    result["query"] = percentiles(latencies)
+
+    llm = FakeChatModel(latency=args.llm_latency, tokens_per_second=args.llm_tokens_per_second)
+    agent = Agent(llm, store.as_retriever(), tool_llm=llm)
+    latencies = []
+    for query in queries[:args.questions]:
+        _, seconds = timed(lambda: agent.run(query))
+        latencies.append(seconds)
+    result["agent"] = percentiles(latencies)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for ingestion, retrieval and the agent")
+    parser.add_argument("--durations", type=float, nargs="*", default=[10, 60, 360],
+                        help="Synthetic transcript lengths in minutes")
+    parser.add_argument("--recorded", help="Directory of recorded .json3/.json subtitle files")
+    parser.add_argument("--embeddings", default="hashing", choices=["hashing", "huggingface"],
+                        help="Embedding provider (huggingface downloads the configured model)")
+    parser.add_argument("--queries", type=int, default=200, help="Searches per transcript")
+    parser.add_argument("--questions", type=int, default=20, help="Agent.run calls per transcript")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Fake LLM time to first token (s)")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=1e6, help="Fake LLM output rate")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions of the parse/split timings")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<commit>.json)")
+    args = parser.parse_args()
+
+    # Must be set before the project modules read their settings
+    os.environ["EMBEDDING_PROVIDER"] = args.embeddings
+    os.environ["LLM_PROVIDER"] = "fake"
+
+    from config import settings
+    from benchmarks.synthetic import synthetic_transcripts, recorded_transcripts
+
+    sources = list(synthetic_transcripts(args.durations, args.seed))
+    if args.recorded:
+        sources += list(recorded_transcripts(args.recorded))
+
+    commit = git_commit()
+    results = {
+        "commit": commit,
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "chunk_size": settings.CHUNK_SIZE,
+            "chunk_overlap": settings.CHUNK_OVERLAP,
+            "top_k": settings.TOP_K,
+            "index_type": settings.INDEX_TYPE,
+            "docstore": settings.DOCSTORE,
+            "embedding_provider": args.embeddings,
+            "embedding_model": settings.EMBEDDING_MODEL_NAME,
+            "llm_latency": args.llm_latency,
+            "llm_tokens_per_second": args.llm_tokens_per_second
+        },
+        "transcripts": []
+    }
+
+    for name, content, format_type in sources:
+        print(f"Benchmarking {name}...", file=sys.stderr)
+        row = benchmark_transcript(name, content, format_type, args)
+        results["transcripts"].append(row)
+        print(
+            f"  {row['parse']['segments']} segments, {row['split']['chunks']} chunks | "
+            f"parse {row['parse']['mb_per_second']:.1f} MB/s | "
+            f"embed {row['embed']['chunks_per_second']:.0f} chunks/s | "
+            f"build {row['faiss_build']['seconds'] * 1000:.1f} ms | "
+            f"query p95 {row['query']['p95'] * 1000:.2f} ms | "
+            f"agent p95 {row['agent']['p95'] * 1000:.1f} ms",
+            file=sys.stderr
+        )
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"Results written to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
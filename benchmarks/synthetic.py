@@ -0,0 +1,90 @@
+"""
+Transcripts for benchmarks: synthetic json3 generation and recorded files.
+
+Synthetic transcripts look like YouTube auto-captions: one event every few
+seconds with a handful of words, interleaved with the segment-less window
+events json3 files contain. The text is deterministic for a given seed and
+drifts between topics every couple of minutes, so searches for a topic have
+a well-defined set of relevant passages.
+"""
+
+import json
+import random
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+TOPICS = [
+    "neural networks", "gradient descent", "transformer attention", "protein folding",
+    "black holes", "quantum computing", "climate models", "battery chemistry",
+    "compiler optimization", "garbage collection", "sourdough baking", "coffee roasting",
+    "marathon training", "chess openings", "jazz harmony", "roman history",
+    "volcano formation", "coral reefs", "rocket engines", "urban planning",
+]
+
+FILLER = (
+    "so the thing is that we really want to look at how this works in practice and "
+    "what happens when you change one part of it because that is where it gets interesting "
+    "you can see here that the result depends on a few small details which we will come back to"
+).split()
+
+TOPIC_SECONDS = 120  # How long the speaker stays on one topic
+
+
+def topic_at(seconds: float) -> str:
+    """Topic spoken about at a given time of a synthetic transcript."""
+    return TOPICS[int(seconds // TOPIC_SECONDS) % len(TOPICS)]
+
+
+def generate_json3(duration_seconds: float, seed: int = 0, segment_seconds: float = 4.0) -> str:
+    """
+    Generate a json3 subtitle file.
+
+    Args:
+        duration_seconds: Length of the video
+        seed: Random seed (same seed, same transcript)
+        segment_seconds: Time between caption events
+
+    Returns:
+        str: json3 content, as served by YouTube
+    """
+    rng = random.Random(seed)
+    events = []
+    t = 0.0
+    while t < duration_seconds:
+        start_ms = int(t * 1000)
+        # Window/styling events without text, as in real files
+        if rng.random() < 0.2:
+            events.append({"tStartMs": start_ms, "dDurationMs": 0, "aAppend": 1, "segs": [{"utf8": "\n"}]})
+
+        words = rng.sample(FILLER, rng.randint(5, 9))
+        words.insert(rng.randint(0, len(words)), topic_at(t))
+        segs = []
+        offset = 0
+        for i, word in enumerate(words):
+            seg = {"utf8": word if i == 0 else " " + word}
+            if i:
+                seg["tOffsetMs"] = offset
+            segs.append(seg)
+            offset += rng.randint(150, 450)
+        events.append({"tStartMs": start_ms, "dDurationMs": int(segment_seconds * 1000), "wWinId": 1, "segs": segs})
+        t += segment_seconds * rng.uniform(0.7, 1.3)
+
+    return json.dumps({"wireMagic": "pb3", "events": events})
+
+
+def synthetic_transcripts(durations_minutes: List[float], seed: int = 0) -> Iterator[Tuple[str, str, str]]:
+    """Yield (name, content, format) for synthetic transcripts of the given lengths."""
+    for minutes in durations_minutes:
+        yield f"synthetic-{minutes:g}m", generate_json3(minutes * 60, seed), "json3"
+
+
+def recorded_transcripts(directory: str) -> Iterator[Tuple[str, str, str]]:
+    """
+    Yield (name, content, format) for recorded subtitle files.
+
+    Files ending in .json3 are parsed as json3; other .json files as the
+    generic list-of-segments format.
+    """
+    for path in sorted(Path(directory).glob("*.json*")):
+        format_type = "json3" if path.suffix == ".json3" else "json"
+        yield path.stem, path.read_text(encoding="utf-8"), format_type
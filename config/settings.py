@@ -5,26 +5,189 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+# Providers
+# "groq" for the real service; "fake" / "hashing" are deterministic offline
+# stand-ins (src/offline_models.py) for tests and benchmarks without network
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq")
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "huggingface")
+FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.2"))  # Seconds to first token
+FAKE_LLM_TOKENS_PER_SECOND = float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "200"))
+
 # Model Configuration
 # Using Llama 3.1 70B which has excellent tool calling capabilities
 GROQ_MODEL_NAME = "llama-3.3-70b-versatile"  
-EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+# Small low-latency model for turns that only pick a tool or rewrite a query
+GROQ_FAST_MODEL_NAME = "llama-3.1-8b-instant"
+# Multilingual embeddings put questions and transcripts of different languages
+# in one space (a French question finds English captions); same dimension
+MULTILINGUAL_EMBEDDINGS = os.getenv("MULTILINGUAL_EMBEDDINGS", "").lower() in ("1", "true", "yes")
+MULTILINGUAL_EMBEDDING_MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+EMBEDDING_MODEL_NAME = (
+    MULTILINGUAL_EMBEDDING_MODEL_NAME if MULTILINGUAL_EMBEDDINGS else "sentence-transformers/all-MiniLM-L6-v2"
+)
+
+# Groq Rate Limits (per API key and model, see https://console.groq.com/settings/limits)
+# All LLM calls in the process go through one scheduler that paces each
+# model's calls against these budgets and retries rate-limited calls with backoff
+GROQ_REQUESTS_PER_MINUTE = 30
+GROQ_TOKENS_PER_MINUTE = 12000
+LLM_MAX_RETRIES = 5
+LLM_BACKOFF_BASE = 1.0          # Seconds; doubled on every retry (with jitter)
+LLM_BACKOFF_MAX = 60.0
+LLM_COMPLETION_TOKENS_ESTIMATE = 512  # Expected output tokens, reserved before each call
+
+# Model Routing
+# Which model ("fast" or "large") handles each kind of LLM turn
+MODEL_ROUTING = {
+    "tool_call": "fast",  # Forced first turn whose only job is to emit a search_video call
+    "rewrite": "fast",    # Query rewriting and expansion
+    "summary": "fast",    # Background section/video summaries
+    "final": "large",     # Turns that may write the final answer
+}
 
 # LLM Parameters
 # Temperature controls randomness in responses (0.0 = deterministic, 1.0 = creative)
 DEFAULT_TEMPERATURE = 0.7
 
 # Vector DB
+# Tune with benchmarks/evaluate.py (recall/MRR vs prompt tokens and latency)
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
 TOP_K = 5
+INDEX_TYPE = "flat"   # "flat" (exact), "hnsw" or "ivf" (approximate, faster on long videos)
+HNSW_M = 32           # Graph neighbours per vector
+HNSW_EF_SEARCH = 64   # Candidates explored per HNSW search
+IVF_NLIST = 256       # Upper bound on IVF clusters (capped at sqrt of the vector count)
+IVF_NPROBE = 8        # Clusters scanned per IVF search
+
+# Query expansion before retrieval: "off", "keywords" (no LLM call) or "llm"
+# (one call to the rewrite model). The query and its sub-queries are embedded
+# in one batch, searched in one FAISS call and merged with reciprocal rank fusion
+QUERY_EXPANSION = os.getenv("QUERY_EXPANSION", "off")
+QUERY_EXPANSION_COUNT = 3   # Sub-queries added to the original query
+QUERY_EXPANSION_CACHE_SIZE = 256  # Questions whose LLM sub-queries are kept (one rewrite call per question)
+RRF_K = 60                  # Reciprocal rank fusion constant
+
+# Chapters (from the video's metadata) are chunk boundaries and a coarse
+# first-level index: when a query's cosine similarity to chapter titles is at
+# least CHAPTER_MATCH_SCORE, only chunks in the best CHAPTER_SEARCH_LIMIT
+# chapters are searched (k * CHAPTER_FETCH_FACTOR candidates are filtered)
+CHAPTER_MATCH_SCORE = 0.5
+CHAPTER_SEARCH_LIMIT = 2
+CHAPTER_FETCH_FACTOR = 4
+
+# Stored embedding precision: "float32", "float16" (2x smaller) or "int8"
+# (FAISS scalar quantization, 4x smaller). With RESCORE_FACTOR > 1, searches
+# fetch k * RESCORE_FACTOR candidates and re-rank them with a copy at the next
+# precision up (int8 -> float16, float16 -> float32), which costs that copy's memory.
+# Measure the trade-off with benchmarks/quantization.py
+EMBEDDING_PRECISION = "float32"
+RESCORE_FACTOR = 0
+# Chunk storage: "compact" keeps text in one buffer with columnar metadata
+# (src/docstore.py); "memory" is LangChain's one-Document-per-chunk store
+DOCSTORE = "compact"
+
+# Transcripts
+# Caption languages in order of preference (comma-separated in the env var).
+# Each is tried as manual subtitles, then auto-generated captions; if the
+# video has none of them, its original language is used
+TRANSCRIPT_LANGUAGES = [
+    lang.strip() for lang in os.getenv("TRANSCRIPT_LANGUAGES", "en").split(",") if lang.strip()
+]
+# yt-dlp metadata (caption tracks, title, chapters...) is cached per video so
+# loading another language does not extract it again. Caption URLs expire,
+# so entries are dropped after VIDEO_INFO_TTL seconds
+VIDEO_INFO_CACHE_SIZE = 256
+VIDEO_INFO_TTL = 3600
+
+# Ingestion
+# Chunks are embedded and indexed in time order on a background worker;
+# questions can be asked as soon as the first window is indexed
+INGEST_IN_BACKGROUND = True
+INGEST_WINDOW_SECONDS = 300  # Transcript time covered by each indexing batch
+
+# Shared Indexes
+# Video indexes are shared between sessions; idle ones are evicted (least
+# recently used first) once their total size exceeds the budget
+INDEX_MEMORY_BUDGET_MB = 1024
+SESSION_IDLE_TIMEOUT = 30 * 60  # Seconds before an inactive session releases its index
+
+# Worker Pools (src/workers.py)
+# Ingestion's CPU work (embedding transcript chunks, training IVF/quantized
+# indexes) runs in EMBEDDING_PROCESSES worker processes, each limited to
+# EMBEDDING_THREADS threads and lowered by INGEST_NICE, so it neither holds
+# this process's GIL nor starves question answering of cores. Each worker loads
+# its own copy of the embedding model, so the pool is opt-in: the default of
+# 0 processes embeds in-process.
+# Network-bound ingestion (yt-dlp, subtitle downloads, async video loads) runs
+# on IO_WORKERS threads, apart from the threads that answer questions
+EMBEDDING_PROCESSES = int(os.getenv("EMBEDDING_PROCESSES", "0"))
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", str(max(1, (os.cpu_count() or 2) // 2))))
+INGEST_NICE = 10
+IO_WORKERS = 8
+
+# Index Snapshots (src/snapshot.py)
+# Versioned, checksummed copies of built indexes in a local or shared
+# directory, so replicas warm-start instead of re-ingesting. With SNAPSHOT_DIR
+# set, loading a video first looks for a compatible snapshot there (memory-mapped,
+# nothing is embedded); with SNAPSHOT_EXPORT, indexes built here are written to it
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR")
+SNAPSHOT_EXPORT = os.getenv("SNAPSHOT_EXPORT", "").lower() in ("1", "true", "yes")
 
 # Agent
 MAX_ITERATIONS = 10
+# Per-question budgets (0 disables). Once one is used up, or a search returns
+# only chunks the question has already seen, the next call must answer from
+# what was retrieved (src/loop_control.py)
+MAX_QUESTION_SECONDS = 30.0
+MAX_QUESTION_TOKENS = 24000
+
+# Conversation Memory
+# Conversations are checkpointed per thread in a local SQLite database. Only the
+# last HISTORY_MAX_TURNS question/answer pairs are sent to the model, and tool
+# calls from earlier turns are dropped, so the prompt stays bounded over long chats.
+# Stored checkpoints are bounded separately: a thread is deleted when its
+# conversation is reset or its session closes, when it has been idle for
+# CHECKPOINT_TTL seconds, or when it is not among the CHECKPOINT_MAX_THREADS
+# most recently used threads
+CHECKPOINT_DB_PATH = Path(__file__).parent.parent / ".cache" / "checkpoints.sqlite"
+HISTORY_MAX_TURNS = 6
+CHECKPOINT_MAX_THREADS = 1000
+CHECKPOINT_TTL = 7 * 24 * 3600
+CHECKPOINT_PRUNE_INTERVAL = 60  # Seconds between sweeps for expired threads
+
+# Summary Index
+# Section summaries are built over fixed time windows of the transcript (map),
+# then combined into a single video-level summary (reduce)
+SUMMARY_WINDOW_SECONDS = 300
+SUMMARY_MAX_CONCURRENCY = 4  # Parallel LLM calls during the map step
+SUMMARY_REDUCE_FANIN = 10    # Section summaries combined per reduce call
+
+# HTTP Server (src/server.py)
+SERVER_MAX_CONCURRENCY = 16     # Requests processed at once across all tenants
+SERVER_TENANT_CONCURRENCY = 4   # Requests processed at once per tenant (caps Groq calls)
+SERVER_MAX_QUEUE = 64           # Requests allowed to wait for a slot before rejecting with 503
+SERVER_QUEUE_TIMEOUT = 30       # Seconds a request may wait for a slot
+SERVER_SHUTDOWN_TIMEOUT = 30    # Seconds to let in-flight requests finish on shutdown
+
+# Tracing (src/tracing.py)
+# Per-stage timings, LLM token counts and agent iterations, grouped into one
+# trace per question or ingestion. Exporters: log, memory, otel, prometheus
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() in ("1", "true", "yes")
+TRACE_EXPORTERS = [e.strip() for e in os.getenv("TRACE_EXPORTERS", "log").split(",") if e.strip()]
+TRACE_LOG_PATH = os.getenv("TRACE_LOG_PATH")      # JSON lines file for the log exporter (stderr if unset)
+PROMETHEUS_PORT = int(os.getenv("PROMETHEUS_PORT", "0"))  # Serve /metrics on this port (0 = don't)
 
 # Prompt Configuration
-# Change this to switch between prompt versions (e.g., "v1", "v2", "v3")
-PROMPT_VERSION = "v1"
+# Default prompt version (e.g., "v1", "v2", "v3"). At runtime the registry
+# (src/prompt_registry.py) prefers PROMPT_ACTIVE_FILE, written by
+# `python prompts/create_version.py --activate v2` (or --split v1=90,v2=10
+# for an A/B split by session), and reloads changed prompt files without
+# a restart
+PROMPT_VERSION = "v2"
+PROMPTS_DIR = Path(__file__).parent.parent / "prompts"
+PROMPT_ACTIVE_FILE = PROMPTS_DIR / "active_version.txt"
+PROMPT_RELOAD_INTERVAL = 2.0  # Seconds between checks of the prompts directory
 
 # Load system prompt from versioned file
 def load_system_prompt(version: str = PROMPT_VERSION) -> str:
@@ -33,9 +196,9 @@ def load_system_prompt(version: str = PROMPT_VERSION) -> str:
 
     This allows for easy prompt versioning and experimentation.
     To create a new version:
-    1. Copy prompts/system_prompt_v1.txt to prompts/system_prompt_v2.txt
+    1. Copy prompts/system_prompt_v2.txt to prompts/system_prompt_v3.txt
     2. Edit the new file
-    3. Change PROMPT_VERSION = "v2" above
+    3. Change PROMPT_VERSION = "v3" above
 
     Args:
         version: The prompt version to load (e.g., "v1", "v2")
@@ -43,9 +206,7 @@ def load_system_prompt(version: str = PROMPT_VERSION) -> str:
     Returns:
         str: The system prompt text
     """
-    # Get the project root directory (parent of config/)
-    project_root = Path(__file__).parent.parent
-    prompt_file = project_root / "prompts" / f"system_prompt_{version}.txt"
+    prompt_file = PROMPTS_DIR / f"system_prompt_{version}.txt"
 
     try:
         with open(prompt_file, "r", encoding="utf-8") as f:
@@ -57,7 +218,8 @@ def load_system_prompt(version: str = PROMPT_VERSION) -> str:
 Use the search tool to find relevant information from the video transcript.
 Provide clear, accurate answers based only on the video content."""
 
-# Load the system prompt
+# Load the system prompt (PROMPT_VERSION as of startup; the agent gets its
+# prompt from the registry instead)
 SYSTEM_PROMPT = load_system_prompt()
 
 def get_api_key():
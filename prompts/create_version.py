@@ -8,6 +8,12 @@ Usage:
     python prompts/create_version.py v2 --from v1  # Create v2 from v1
     python prompts/create_version.py --list      # List all versions
     python prompts/create_version.py --current   # Show current version
+    python prompts/create_version.py --activate v2        # Switch running apps to v2
+    python prompts/create_version.py --split v1=90,v2=10  # A/B split sessions
+    python prompts/create_version.py --reset     # Back to PROMPT_VERSION in config
+
+--activate, --split and --reset write (or remove) prompts/active_version.txt,
+which running apps reload within PROMPT_RELOAD_INTERVAL seconds; no restart.
 """
 
 import os
@@ -18,6 +24,8 @@ from datetime import datetime
 
 # Get the prompts directory
 PROMPTS_DIR = Path(__file__).parent
+# Runtime override of PROMPT_VERSION, read by src/prompt_registry.py
+ACTIVE_FILE = PROMPTS_DIR / "active_version.txt"
 
 def list_versions():
     """List all available prompt versions."""
@@ -46,7 +54,16 @@ def list_versions():
     print()
 
 def get_current_version():
-    """Get the currently active prompt version from config."""
+    """Get the currently active prompt version (active file, else config)."""
+    if ACTIVE_FILE.exists():
+        spec = ACTIVE_FILE.read_text(encoding="utf-8").strip()
+        if spec:
+            # With an A/B split, the version with the largest share
+            shares = {}
+            for part in spec.split(","):
+                version, _, weight = part.strip().partition("=")
+                shares[version.strip()] = float(weight) if weight else 1.0
+            return max(shares, key=shares.get)
     try:
         # Import from parent directory
         sys.path.insert(0, str(PROMPTS_DIR.parent))
@@ -65,6 +82,8 @@ def show_current():
         return
     
     print(f"\n✅ Current Active Version: {version}\n")
+    if ACTIVE_FILE.exists():
+        print(f"Active spec ({ACTIVE_FILE.name}): {ACTIVE_FILE.read_text(encoding='utf-8').strip()}\n")
     
     prompt_file = PROMPTS_DIR / f"system_prompt_{version}.txt"
     
@@ -123,14 +142,48 @@ def create_version(new_version: str, from_version: str = None):
         print(f"   File: {target_file}")
         print(f"\nNext steps:")
         print(f"1. Edit {target_file} with your changes")
-        print(f"2. Update config/settings.py: PROMPT_VERSION = \"{new_version}\"")
-        print(f"3. Test the new prompt")
+        print(f"2. Test the new prompt, e.g. with --split {from_version}=90,{new_version}=10")
+        print(f"3. Activate it: python prompts/create_version.py --activate {new_version}")
         print(f"4. Document your changes in prompts/README.md")
         return True
     except Exception as e:
         print(f"❌ Error creating version: {e}")
         return False
 
+def write_active(spec: str):
+    """
+    Set the active version(s) for running apps.
+
+    Args:
+        spec: "v2", or weights per version such as "v1=90,v2=10"
+    """
+    versions = []
+    for part in spec.split(","):
+        version, _, weight = part.strip().partition("=")
+        version = version.strip()
+        if not version.startswith("v"):
+            version = f"v{version}"
+        if not (PROMPTS_DIR / f"system_prompt_{version}.txt").exists():
+            print(f"❌ Error: Version {version} not found")
+            return False
+        try:
+            if weight and float(weight) < 0:
+                raise ValueError
+        except ValueError:
+            print(f"❌ Error: Invalid weight {weight!r} for {version}")
+            return False
+        versions.append(f"{version}={weight}" if weight else version)
+
+    ACTIVE_FILE.write_text(",".join(versions) + "\n", encoding="utf-8")
+    print(f"✅ Active prompt: {','.join(versions)} (running apps reload it automatically)")
+    return True
+
+def reset_active():
+    """Remove the runtime override; apps go back to PROMPT_VERSION in config."""
+    if ACTIVE_FILE.exists():
+        ACTIVE_FILE.unlink()
+    print("✅ Active prompt reset to PROMPT_VERSION from config/settings.py")
+
 def main():
     """Main entry point."""
     if len(sys.argv) < 2:
@@ -145,6 +198,15 @@ def main():
     elif command == "--current":
         show_current()
     
+    elif command in ("--activate", "--split"):
+        if len(sys.argv) < 3:
+            print(f"Usage: python prompts/create_version.py {command} <spec>")
+            return
+        write_active(sys.argv[2])
+
+    elif command == "--reset":
+        reset_active()
+
     elif command == "--help" or command == "-h":
         print(__doc__)
     
@@ -1,27 +1,54 @@
-from typing import TypedDict, Annotated, List
-import operator
+import time
+from typing import TypedDict, Annotated, List, Tuple
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage
 from langchain.tools import Tool
+from langchain_core.tools import StructuredTool
 from langgraph.graph import StateGraph, END
-from langgraph.prebuilt import ToolNode
-from config.settings import SYSTEM_PROMPT, MAX_ITERATIONS
+from langgraph.graph.message import add_messages
+from langgraph.prebuilt import ToolNode, InjectedState
+from config.settings import MAX_ITERATIONS
+from src.summary_index import is_global_question
+from src.video_metadata import metadata_question
+from src.memory import prune_history
+from src.llm_manager import get_scheduler, cached_prompt_tokens, INTERACTIVE
+from src.prompt_registry import get_registry
+from src.loop_control import chunk_ids, current_question, stop_reason, final_answer_message
+from src.citations import format_excerpts, question_sources, add_citations
+from src import tracing
 
 class AgentState(TypedDict):
-    messages: Annotated[List[BaseMessage], operator.add]
+    messages: Annotated[List[BaseMessage], add_messages]
     iterations: int
+    prompt_version: str  # System prompt version used for the current question
+    started_at: float  # time.time() when the question started (wall-clock budget)
 
 class Agent:
-    def __init__(self, llm, retriever):
+    def __init__(self, llm, retriever, summary_index=None, checkpointer=None, tool_llm=None, max_iterations=MAX_ITERATIONS,
+                 prompts=None, video_metadata=None):
         self.tool = self._create_tool(retriever)
+        self.summary_index = summary_index
+        self.video_metadata = video_metadata
+        self.tools = [self.tool]
+        if summary_index is not None:
+            self.tools.append(self._create_summary_tool(summary_index))
+        if video_metadata is not None:
+            self.tools.append(self._create_metadata_tool(video_metadata))
         # Bind tools to LLM - this enables tool calling
-        self.llm = llm.bind_tools([self.tool])
-        # Also create a version that forces tool use on first call
-        self.llm_force_tool = llm.bind_tools([self.tool], tool_choice="search_video")
+        self.llm = llm.bind_tools(self.tools)
+        # Also create a version that forces tool use on first call; that turn only
+        # picks the search query, so it can run on a smaller, faster model
+        self.llm_force_tool = (tool_llm or llm).bind_tools(self.tools, tool_choice="search_video")
         self.llm_base = llm
+        # With a checkpointer, each thread_id keeps its own conversation history
+        self.checkpointer = checkpointer
+        self.max_iterations = max_iterations
+        # Versioned system prompts (hot-reloaded, optionally A/B split by thread)
+        self.prompts = prompts or get_registry()
+        self.scheduler = get_scheduler()
         self.graph = self._build_graph()
 
     def _create_tool(self, retriever):
-        def search(query: str) -> str:
+        def search(query: str, state: Annotated[dict, InjectedState]) -> Tuple[str, List[str]]:
             """Search the YouTube video transcript for relevant information.
 
             This tool retrieves relevant excerpts from the video transcript based on the query.
@@ -31,83 +58,217 @@ class Agent:
                 query: The question or topic to search for in the video transcript
 
             Returns:
-                Relevant transcript excerpts that contain information about the query
+                Relevant transcript excerpts, each labelled with its chunk ID (e.g. [c754])
             """
-            # Use invoke instead of deprecated get_relevant_documents
-            docs = retriever.invoke(query)
+            # Use invoke instead of deprecated get_relevant_documents; the user question
+            # (filled in from the graph state by ToolNode) lets query expansion rewrite it once
+            docs = retriever.invoke(query, question=current_question(state.get("messages", [])))
+            # The chunk IDs go to the ToolMessage artifact (not the model) for loop control
             if not docs:
-                return "No relevant information found in the video transcript."
-            return "\n\n".join([d.page_content for d in docs])
+                return "No relevant information found in the video transcript.", []
+            return format_excerpts(docs), chunk_ids(docs)
 
-        return Tool(
+        return StructuredTool.from_function(
             name="search_video",
             description=(
                 "REQUIRED TOOL: Search the YouTube video transcript to find relevant information. "
                 "You MUST use this tool for EVERY question about the video content. "
                 "Input should be the user's question or key topics to search for. "
-                "Returns relevant excerpts from the video transcript."
+                "Returns relevant excerpts from the video transcript, each labelled like [c754]."
+            ),
+            func=search,
+            response_format="content_and_artifact"
+        )
+
+    def _create_summary_tool(self, summary_index):
+        def read_summary(query: str) -> str:
+            """Return the precomputed video and section summaries."""
+            if not summary_index.ready:
+                return "The video summary is still being generated. Use search_video instead."
+            return summary_index.render()
+
+        return Tool(
+            name="video_summary",
+            description=(
+                "Read the precomputed summary of the whole video and of each section, with times. "
+                "Use this for questions about the video as a whole (overview, main points, structure). "
+                "Input is ignored."
+            ),
+            func=read_summary
+        )
+
+    def _create_metadata_tool(self, video_metadata):
+        def video_info(query: str) -> str:
+            """Return the video's title, channel, upload date, duration, chapters and description."""
+            return video_metadata.render()
+
+        return Tool(
+            name="video_info",
+            description=(
+                "Get the video's title, channel, upload date, duration, chapter list (with times) and description. "
+                "Use this for questions about the video itself rather than what is said in it. "
+                "Input is ignored."
             ),
-            func=search
+            func=video_info
         )
 
     def _build_graph(self):
         workflow = StateGraph(AgentState)
 
-        def call_model(state):
-            messages = [HumanMessage(content=SYSTEM_PROMPT)] + state["messages"]
+        def prepare(state):
+            # Start a new question: bound the history and reset the loop counter
+            return {
+                "messages": prune_history(state["messages"]),
+                "iterations": 0,
+                "started_at": time.time()
+            }
 
-            # Force tool use on first iteration to ensure we always search the video
-            iterations = state.get("iterations", 0)
-            if iterations == 0:
-                # First call - force the agent to use the search_video tool
-                response = self.llm_force_tool.invoke(messages)
-            else:
-                # Subsequent calls - let agent decide
-                response = self.llm.invoke(messages)
+        def route_question(state):
+            # Questions about the video's metadata (length, chapters...) are answered directly
+            if self.video_metadata is not None:
+                kind = metadata_question(state["messages"][-1].content)
+                if kind and self.video_metadata.answer(kind):
+                    return "metadata"
+            # Whole-video questions skip retrieval once summaries are available
+            if self.summary_index is not None and self.summary_index.ready:
+                if is_global_question(state["messages"][-1].content):
+                    return "summary"
+            return "tool_call"
 
+        def answer_from_summary(state):
+            question = state["messages"][-1].content
+            response = self._call(self.llm_base, state, [], HumanMessage(content=self.summary_index.answer_prompt(question)))
+            iterations = state.get("iterations", 0) + 1
+            tracing.annotate(iterations=iterations)  # Recorded on the question's span
             return {
                 "messages": [response],
-                "iterations": iterations + 1
+                "iterations": iterations
+            }
+
+        def answer_from_metadata(state):
+            # No retrieval and no LLM call
+            kind = metadata_question(state["messages"][-1].content)
+            tracing.annotate(metadata_answer=kind)
+            return {"messages": [AIMessage(content=self.video_metadata.answer(kind))]}
+
+        def call_tool_model(state):
+            # First call - force the agent to use the search_video tool
+            response = self._call(self.llm_force_tool, state, state["messages"])
+            iterations = state.get("iterations", 0) + 1
+            tracing.annotate(iterations=iterations)
+            return {
+                "messages": [response],
+                "iterations": iterations
+            }
+
+        def call_model(state):
+            # Subsequent calls - let agent decide (large model, may write the final answer),
+            # unless searching has stopped paying off or a budget is used up
+            reason = stop_reason(state, self.max_iterations)
+            if reason:
+                response = self._call(self.llm_base, state, state["messages"], final_answer_message())
+                tracing.annotate(stop_reason=reason)
+            else:
+                response = self._call(self.llm, state, state["messages"])
+            iterations = state.get("iterations", 0) + 1
+            tracing.annotate(iterations=iterations)
+            return {
+                "messages": [response],
+                "iterations": iterations
             }
 
         def should_continue(state):
             last_msg = state["messages"][-1]
             if not hasattr(last_msg, "tool_calls") or not last_msg.tool_calls:
                 return "end"
-            if state.get("iterations", 0) >= MAX_ITERATIONS:
+            if state.get("iterations", 0) >= self.max_iterations:
                 return "end"
             return "continue"
 
         # Use ToolNode for automatic tool execution
-        tool_node = ToolNode([self.tool])
+        tool_node = ToolNode(self.tools)
 
+        workflow.add_node("tool_call", call_tool_model)
         workflow.add_node("agent", call_model)
         workflow.add_node("tools", tool_node)
-        workflow.set_entry_point("agent")
+        workflow.add_node("summary", answer_from_summary)
+        workflow.add_node("metadata", answer_from_metadata)
+        workflow.add_node("prepare", prepare)
+        workflow.set_entry_point("prepare")
+        workflow.add_conditional_edges("prepare", route_question, {
+            "metadata": "metadata",
+            "summary": "summary",
+            "tool_call": "tool_call"
+        })
+        workflow.add_edge("summary", END)
+        workflow.add_edge("metadata", END)
+        workflow.add_conditional_edges("tool_call", should_continue, {
+            "continue": "tools",
+            "end": END
+        })
         workflow.add_conditional_edges("agent", should_continue, {
             "continue": "tools",
             "end": END
         })
         workflow.add_edge("tools", "agent")
 
-        return workflow.compile()
+        # Questions asked without a thread stand alone and are not checkpointed
+        self.graph_stateless = workflow.compile()
+        return workflow.compile(checkpointer=self.checkpointer)
 
-    def run(self, question: str) -> str:
-        result = self.graph.invoke({
-            "messages": [HumanMessage(content=question)],
-            "iterations": 0
-        })
-        return result["messages"][-1].content
-
-    def stream(self, question: str):
-        # Stream the graph execution
-        for event in self.graph.stream({
-            "messages": [HumanMessage(content=question)],
-            "iterations": 0
-        }):
-            # Yield final answer when agent finishes
-            if "agent" in event:
-                msg = event["agent"]["messages"][-1]
-                if hasattr(msg, "content") and msg.content:
-                    yield msg.content
+    def _call(self, runnable, state, history, *extra):
+        """Invoke a model with the question's system prompt in front of history; records usage per prompt version."""
+        version = state.get("prompt_version") or self.prompts.version_for()
+        # Same SystemMessage, byte for byte, at the start of every call (prefix caching)
+        messages = self.prompts.get(version).messages(history, *extra)
+        response = self.scheduler.invoke(runnable, messages, INTERACTIVE)
+        self.prompts.record_call(version, response.usage_metadata, cached_prompt_tokens(response))
+        return response
+
+    def _graph_for(self, thread_id: str = None):
+        if self.checkpointer is None or thread_id is None:
+            return self.graph_stateless, {}
+        return self.graph, {"configurable": {"thread_id": thread_id}}
+
+    def run(self, question: str, thread_id: str = None) -> str:
+        graph, config = self._graph_for(thread_id)
+        version = self.prompts.version_for(thread_id)
+        started = time.perf_counter()
+        with tracing.span("agent.question", thread_id=thread_id, stream=False, prompt_version=version):
+            result = graph.invoke({
+                "messages": [HumanMessage(content=question)],
+                "iterations": 0,
+                "prompt_version": version
+            }, config)
+        self.prompts.record_question(version, time.perf_counter() - started)
+        # Cited chunk labels become links to their moment in the video
+        return add_citations(result["messages"][-1].content, question_sources(result["messages"]))
 
+    def stream(self, question: str, thread_id: str = None):
+        graph, config = self._graph_for(thread_id)
+        # Stream LLM tokens from the answering nodes; each yield is the answer so far,
+        # with the labels it cites replaced by links to the chunks the searches returned
+        answers = {}
+        sources = {}
+        version = self.prompts.version_for(thread_id)
+        started = time.perf_counter()
+        first_token = None
+        with tracing.span("agent.question", thread_id=thread_id, stream=True, prompt_version=version) as span:
+            for chunk, metadata in graph.stream({
+                "messages": [HumanMessage(content=question)],
+                "iterations": 0,
+                "prompt_version": version
+            }, config, stream_mode="messages"):
+                if isinstance(chunk, ToolMessage):
+                    sources.update(question_sources([chunk]))
+                    continue
+                if metadata.get("langgraph_node") not in ("tool_call", "agent", "summary", "metadata"):
+                    continue
+                if not isinstance(chunk, AIMessage) or not isinstance(chunk.content, str) or not chunk.content:
+                    continue
+                if not answers:
+                    first_token = time.perf_counter() - started
+                    span.set(first_token_seconds=first_token)
+                answers[chunk.id] = answers.get(chunk.id, "") + chunk.content
+                yield add_citations(answers[chunk.id], sources)
+        self.prompts.record_question(version, time.perf_counter() - started, first_token)
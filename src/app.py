@@ -1,7 +1,17 @@
+import uuid
+import threading
 from src.youtube_loader import YouTubeLoader
 from src.vector_store import VectorStore
-from src.llm_manager import LLM
+from src.llm_manager import LLM, KEYLESS_PROVIDERS
 from src.agent import Agent
+from src.query_expansion import QueryExpander
+from src.summary_index import SummaryIndex
+from src.memory import get_checkpointer, touch_thread, delete_thread
+from src import tracing
+from src.single_flight import video_loads
+from src.workers import get_workers
+from src.snapshot import find_snapshot, import_snapshot, export_snapshot, SnapshotError
+from config.settings import INGEST_IN_BACKGROUND, LLM_PROVIDER, SNAPSHOT_DIR, SNAPSHOT_EXPORT
 
 class YouTubeQA:
     """
@@ -11,18 +21,29 @@ class YouTubeQA:
     Supports configurable temperature for controlling response randomness.
     """
 
-    def __init__(self, api_key: str = None, temperature: float = None):
+    def __init__(self, api_key: str = None, temperature: float = None, index_manager=None, llm=None):
         """
         Initialize the YouTube Q&A system.
 
         Args:
             api_key: Groq API key (optional, can use env var)
             temperature: LLM temperature (0.0-1.0). Controls randomness.
+            index_manager: Optional shared IndexManager so sessions on the
+                           same video reuse one index
+            llm: Optional ready-made LLM manager (anything with get()),
+                 used instead of creating one from the API key
         """
         self.loader = YouTubeLoader()
         self.vector_store = VectorStore()
-        self.llm = LLM(api_key, temperature) if api_key else None
+        # Offline providers need no key
+        keyless = LLM_PROVIDER in KEYLESS_PROVIDERS
+        self.llm = llm or (LLM(api_key, temperature) if api_key or keyless else None)
         self.temperature = temperature
+        self.index_manager = index_manager
+        self.video_id = None  # Key of the loaded video (and of the index held in index_manager)
+        self.language = None  # Caption language of the loaded video
+        self.thread_id = str(uuid.uuid4())  # Conversation thread for follow-up questions
+        self._threads = set()  # Threads asked in through this instance (deleted on close)
         self.agent = None
         self.ready = False
 
@@ -60,58 +81,261 @@ class YouTubeQA:
         if self.vector_store.store:
             self._init_agent()
 
-    def load_video(self, url: str) -> bool:
+    def load_video(self, url: str, summarize: bool = True, background: bool = INGEST_IN_BACKGROUND,
+                   language: str = None) -> bool:
         """
         Load a YouTube video and create vector store.
 
+        With background ingestion, chunks are embedded and indexed in time
+        order on a worker thread and this returns as soon as the first
+        window is searchable; see ingestion_progress(). Section and video
+        summaries are generated on a background thread after this returns
+        (once an LLM is available). Concurrent loads of the same video, from
+        this or any other instance, share one ingestion.
+
+        Each caption language gets its own index under the video ID, so
+        loading another language of a cached video leaves the first one in
+        place and reuses the video's cached metadata.
+
         Args:
             url: YouTube video URL
+            summarize: Build the summary index for whole-video questions
+            background: Return once the first window is indexed
+            language: Caption language (default: first available of TRANSCRIPT_LANGUAGES)
 
         Returns:
             bool: True if successful, False otherwise
         """
         try:
-            docs = self.loader.load(url)
-            self.vector_store.create(docs)
-            if self.llm:
-                self._init_agent()
-            self.ready = self.agent is not None
+            with tracing.span("app.load_video", url=url):
+                language = self.loader.resolve_language(url, language)
+                video_id = self._video_key(url, language)
+                build = lambda: self._build_store(url, summarize, background, language)
+                if self.index_manager is not None:
+                    store = self.index_manager.acquire(video_id, build)
+                else:
+                    # Concurrent loads of the same video share one ingestion
+                    store = video_loads.do(video_id, build)
+                self._use_store(video_id, store)
             return True
         except Exception as e:
             print(f"Error: {e}")
             return False
 
+    async def aload_video(self, url: str, summarize: bool = True, background: bool = INGEST_IN_BACKGROUND,
+                          language: str = None) -> bool:
+        """
+        Async version of load_video() for event-loop callers.
+
+        Ingestion runs on the ingestion I/O pool (src/workers.py), not the
+        threads that answer questions; callers loading the same video at the
+        same time await one ingestion instead of each holding a thread.
+
+        Args:
+            url: YouTube video URL
+            summarize: Build the summary index for whole-video questions
+            background: Return once the first window is indexed
+            language: Caption language (default: first available of TRANSCRIPT_LANGUAGES)
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        try:
+            with tracing.span("app.load_video", url=url):
+                language = await get_workers().run_io_async(self.loader.resolve_language, url, language)
+                video_id = self._video_key(url, language)
+                build = lambda: self._build_store(url, summarize, background, language)
+                if self.index_manager is not None:
+                    store = await self.index_manager.acquire_async(video_id, build)
+                else:
+                    store = await video_loads.do_async(video_id, build, get_workers().io)
+                self._use_store(video_id, store)
+            return True
+        except Exception as e:
+            print(f"Error: {e}")
+            return False
+
+    def _use_store(self, video_id: str, store: VectorStore):
+        """Switch to a loaded video's index (acquired from index_manager, if any)."""
+        previous = self.video_id
+        if self.index_manager is not None:
+            # Release the previous video after acquiring, so reloading it keeps the index
+            self._release_video()
+        self.video_id = video_id
+        if previous is not None and previous != video_id:
+            # Earlier turns quote and cite the other video
+            self.reset_conversation()
+        self.vector_store = store
+        self.language = store.language
+        if self.llm:
+            self._init_agent()
+        self.ready = self.agent is not None
+
+    def _build_store(self, url: str, summarize: bool, background: bool, language: str = None) -> VectorStore:
+        """Download, split and index a video's transcript (or load its snapshot from SNAPSHOT_DIR)."""
+        video_key = self._video_key(url, language)
+        snapshot = find_snapshot(video_key)
+        if snapshot is not None:
+            try:
+                # Warm start: memory-mapped, nothing fetched or embedded (no transcript, so no summaries)
+                return import_snapshot(snapshot)
+            except SnapshotError as e:
+                print(f"Warning: Ignoring snapshot {snapshot}: {e}")
+
+        transcript = self.loader.fetch_transcript(url, language)
+        # Title, duration and chapters from the cached metadata; chapters bound the chunks
+        metadata = self.loader.video_metadata(url, transcript)
+        docs = self.loader.split_transcript(transcript, url, metadata.chapters)
+        store = VectorStore()
+        store.language = language
+        store.metadata = metadata
+        if background:
+            store.create_incremental(docs)
+            if not store.wait_until_ready():
+                raise Exception(store.error or "Indexing failed")
+        else:
+            store.create(docs)
+        if summarize:
+            store.summaries = SummaryIndex(transcript)
+        if SNAPSHOT_DIR and SNAPSHOT_EXPORT:
+            threading.Thread(target=self._export_snapshot, args=(store, video_key), daemon=True).start()
+        return store
+
+    def _export_snapshot(self, store: VectorStore, video_key: str):
+        """Write a snapshot once ingestion finishes, for other replicas to warm-start from."""
+        try:
+            export_snapshot(store, video_key)
+        except Exception as e:
+            print(f"Warning: Could not export snapshot of {video_key}: {e}")
+
+    def _video_key(self, url: str, language: str = None) -> str:
+        """
+        Key for the shared index cache and load de-duplication.
+
+        The video ID (or the URL if it has none), plus ":<language>" when a
+        caption language is given.
+        """
+        try:
+            key = self.loader._extract_id(url)
+        except ValueError:
+            key = url
+        return f"{key}:{language}" if language else key
+
+    def available_languages(self, url: str) -> dict:
+        """
+        List the caption languages of a video (from the cached metadata).
+
+        Args:
+            url: YouTube video URL
+
+        Returns:
+            dict: 'manual' and 'automatic' language codes
+        """
+        return self.loader.available_languages(url)
+
+    def _release_video(self):
+        """Release the shared index held by this instance, if any."""
+        if self.index_manager is not None and self.video_id is not None:
+            self.index_manager.release(self.video_id)
+            self.video_id = None
+
+    def close(self, forget: bool = True):
+        """
+        Release shared resources held by this instance.
+
+        Args:
+            forget: Also delete the checkpoints of the conversation threads asked in here
+        """
+        self._release_video()
+        self.agent = None
+        self.ready = False
+        if forget:
+            for thread_id in self._threads:
+                delete_thread(thread_id)
+            self._threads.clear()
+
+    def ingestion_progress(self) -> dict:
+        """
+        Get indexing progress of the current video.
+
+        Returns:
+            dict: 'indexed' and 'total' chunk counts, 'done' flag and 'error' (or None)
+        """
+        return self.vector_store.progress()
+
     def _init_agent(self):
         """Initialize the agent with current LLM and vector store."""
-        self.agent = Agent(self.llm.get(), self.vector_store.as_retriever())
+        summaries = self.vector_store.summaries
+        if summaries is not None:
+            summaries.build_async(self.llm.get("summary"))
+        # Searches can fan out into sub-queries (QUERY_EXPANSION), retrieved in one batch
+        expander = QueryExpander(llm=self.llm.get("rewrite"))
+        self.agent = Agent(
+            self.llm.get("final"), self.vector_store.as_retriever(expander=expander), summaries,
+            checkpointer=get_checkpointer(), tool_llm=self.llm.get("tool_call"),
+            video_metadata=self.vector_store.metadata
+        )
         self.ready = True
 
-    def ask(self, question: str) -> str:
+    def summary_status(self) -> str:
+        """
+        Get the state of the summary index.
+
+        Returns:
+            str: "disabled", "pending", "building", "ready" or "failed"
+        """
+        summaries = self.vector_store.summaries
+        if summaries is None:
+            return "disabled"
+        if summaries.ready:
+            return "ready"
+        if summaries.error:
+            return "failed"
+        return "building" if summaries.building else "pending"
+
+    def reset_conversation(self):
+        """Start a new conversation thread; earlier questions are forgotten (and their checkpoints deleted)."""
+        delete_thread(self.thread_id)
+        self._threads.discard(self.thread_id)
+        self.thread_id = str(uuid.uuid4())
+
+    def ask(self, question: str, thread_id: str = None) -> str:
         """
         Ask a question about the video (non-streaming).
 
+        Follow-up questions see earlier turns of the same conversation thread.
+
         Args:
             question: Question to ask
+            thread_id: Conversation thread (defaults to this instance's thread)
 
         Returns:
             str: Answer from the agent
         """
         if not self.ready:
             raise ValueError("System not ready")
-        return self.agent.run(question)
+        return self.agent.run(question, self._thread(thread_id))
 
-    def ask_stream(self, question: str):
+    def ask_stream(self, question: str, thread_id: str = None):
         """
         Ask a question about the video (streaming).
 
         Args:
             question: Question to ask
+            thread_id: Conversation thread (defaults to this instance's thread)
 
         Yields:
             str: Answer chunks as they're generated
         """
         if not self.ready:
             raise ValueError("System not ready")
-        for chunk in self.agent.stream(question):
+        for chunk in self.agent.stream(question, self._thread(thread_id)):
             yield chunk
 
+    def _thread(self, thread_id: str = None) -> str:
+        """Conversation thread of a question, recorded for checkpoint retention."""
+        thread_id = thread_id or self.thread_id
+        self._threads.add(thread_id)
+        touch_thread(thread_id)
+        return thread_id
+
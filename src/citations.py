@@ -0,0 +1,93 @@
+"""
+Chunk labels for the model and timestamped citations for answers.
+
+Search results reach the model as "[c754] caption text" excerpts: c754 is a
+compact label for the chunk starting at second 754, instead of a time
+prefix on every caption line. The search tool also returns the chunks' IDs
+(video source and start time from the index metadata) as the ToolMessage
+artifact. When the answer cites a label, it is replaced with a link to that
+moment of the video, e.g. [12:34](https://www.youtube.com/watch?v=ID&t=754s).
+Labels that no search of the question returned are dropped.
+
+A chunk without a start time (captions that carried none) is labelled by
+its position in the search results instead, e.g. [p2]; its citations are
+dropped from the answer, as there is no moment to link to.
+"""
+
+import re
+from typing import Dict, List, Tuple
+from langchain_core.documents import Document
+from langchain_core.messages import BaseMessage, ToolMessage
+from src.loop_control import question_messages
+from src.summary_index import _format_time
+from src.youtube_loader import YouTubeLoader
+
+# One label or a comma-separated group: [c754] or [c754, p2]
+_LABEL = r"[cp]\d+"
+_CITATION = re.compile(rf"(\s?)\[({_LABEL}(?:\s*,\s*{_LABEL})*)\]")
+
+
+def chunk_label(doc: Document, position: int) -> str:
+    """Compact label of a retrieved chunk: its start second, or its 1-based position in the results."""
+    start = doc.metadata.get("start")
+    return f"p{position}" if start is None else f"c{int(start)}"
+
+
+def format_excerpts(docs: List[Document]) -> str:
+    """Search tool output: one labelled excerpt per chunk."""
+    return "\n\n".join(f"[{chunk_label(d, i)}] {d.page_content}" for i, d in enumerate(docs, 1))
+
+
+def watch_url(source: str, seconds: float) -> str:
+    """youtube.com link to a moment of a video (None if source is not a YouTube URL or ID)."""
+    try:
+        video_id = YouTubeLoader._extract_id(source)
+    except ValueError:
+        return None
+    return f"https://www.youtube.com/watch?v={video_id}&t={int(seconds)}s"
+
+
+def question_sources(messages: List[BaseMessage]) -> Dict[str, Tuple[str, float]]:
+    """
+    Chunks retrieved for the current question, by label.
+
+    Args:
+        messages: Conversation messages (search ToolMessages carry chunk IDs as artifacts)
+
+    Returns:
+        dict: Label -> (source, start seconds, None for a chunk without a start time)
+    """
+    sources = {}
+    for message in question_messages(messages):
+        if isinstance(message, ToolMessage) and isinstance(message.artifact, list):
+            for position, chunk_id in enumerate(message.artifact, 1):
+                source, timed, start = chunk_id.rpartition("@")
+                if timed:
+                    sources[f"c{int(float(start))}"] = (source, float(start))
+                else:
+                    sources[f"p{position}"] = (chunk_id.rpartition("#")[0], None)
+    return sources
+
+
+def add_citations(answer: str, sources: Dict[str, Tuple[str, float]]) -> str:
+    """
+    Replace the chunk labels an answer cites with timestamp links.
+
+    Args:
+        answer: Answer text from the model
+        sources: Label -> (source, start seconds), from question_sources()
+
+    Returns:
+        str: Answer with [mm:ss](watch URL) citations
+    """
+    def cite(match):
+        links = []
+        for label in re.findall(_LABEL, match.group(2)):
+            if label not in sources or sources[label][1] is None:
+                continue
+            source, start = sources[label]
+            url = watch_url(source, start)
+            links.append(f"[{_format_time(start)}]({url})" if url else f"[{_format_time(start)}]")
+        return match.group(1) + " ".join(links) if links else ""
+
+    return _CITATION.sub(cite, answer)
@@ -0,0 +1,247 @@
+"""
+Array-backed docstore for transcript chunks.
+
+FAISS's default InMemoryDocstore keeps one Document (with its own metadata
+dict) per chunk, keyed by a UUID string, plus a dict from index position to
+that UUID. CompactDocstore instead stores:
+
+- all chunk text in one contiguous UTF-8 buffer, with an offset array
+- metadata as columns: source (interned), start and end time (NaN when
+  a chunk has none, so the key is left out of its metadata)
+- ids implicitly: a chunk's id is its position, as a string
+
+Documents are built on demand when FAISS looks a chunk up. A docstore can
+be saved to a directory and loaded back memory-mapped, so the text and
+columns of many videos stay on disk until they are read.
+"""
+
+import json
+import math
+import mmap
+from array import array
+from pathlib import Path
+from typing import Dict, List, Union
+import numpy as np
+from langchain.docstore.document import Document
+from langchain_community.docstore.base import AddableMixin, Docstore
+
+_COLUMNS = {"offsets": "q", "source": "I", "start": "d", "end": "d"}
+_MISSING = float("nan")  # start/end of chunks without timestamps
+
+
+class CompactDocstore(Docstore, AddableMixin):
+    """
+    Docstore holding chunk text in one buffer and metadata in columns.
+
+    Metadata keys other than source/start/end are kept in a side dict for
+    the chunks that have them.
+    """
+
+    def __init__(self):
+        self._text = bytearray()
+        self._offsets = array("q", [0])  # Chunk i is _text[_offsets[i]:_offsets[i + 1]]
+        self._source = array("I")        # Index into _sources
+        self._start = array("d")
+        self._end = array("d")
+        self._sources = []               # Interned source strings
+        self._source_codes = {}
+        self._extras = {}                # Position -> metadata beyond the columns
+        self._aliases = {}               # Non-positional id -> position
+        self._deleted = set()
+        self._mmap = None                # Open mapping of the text buffer when loaded from disk
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        """Append documents. Ids are expected to be their positions ("0", "1", ...)."""
+        self._make_writable()
+        for doc_id, doc in texts.items():
+            position = len(self)
+            if doc_id != str(position):
+                self._aliases[doc_id] = position
+
+            metadata = dict(doc.metadata)
+            source = str(metadata.pop("source", ""))
+            code = self._source_codes.get(source)
+            if code is None:
+                code = self._source_codes[source] = len(self._sources)
+                self._sources.append(source)
+
+            self._text += doc.page_content.encode("utf-8")
+            self._offsets.append(len(self._text))
+            self._source.append(code)
+            self._start.append(_time(metadata.pop("start", None)))
+            self._end.append(_time(metadata.pop("end", None)))
+            if metadata:
+                self._extras[position] = metadata
+
+    def search(self, search: str) -> Union[str, Document]:
+        """Build the Document for an id (a position, or an id passed to add)."""
+        position = self._aliases.get(search)
+        if position is None:
+            try:
+                position = int(search)
+            except ValueError:
+                return f"ID {search} not found."
+        if not 0 <= position < len(self) or position in self._deleted:
+            return f"ID {search} not found."
+        return self.document(position)
+
+    def delete(self, ids: List) -> None:
+        """Mark documents as deleted (their bytes are kept until the store is rebuilt)."""
+        for doc_id in ids:
+            position = self._aliases.get(doc_id, None)
+            self._deleted.add(position if position is not None else int(doc_id))
+
+    def document(self, position: int) -> Document:
+        """Build the Document view of one chunk."""
+        text = bytes(self._text[self._offsets[position]:self._offsets[position + 1]]).decode("utf-8")
+        metadata = {"source": self._sources[self._source[position]]}
+        for key, column in (("start", self._start), ("end", self._end)):
+            value = float(column[position])
+            if not math.isnan(value):
+                metadata[key] = value
+        metadata.update(self._extras.get(position, {}))
+        return Document(page_content=text, metadata=metadata)
+
+    def memory_usage(self) -> int:
+        """
+        Bytes of text, columns and sources.
+
+        For a store loaded memory-mapped this is an upper bound: mapped pages
+        only take memory once they are read, but any of them may be.
+        """
+        columns = sum(
+            a.nbytes if hasattr(a, "nbytes") else a.itemsize * len(a)
+            for a in (self._offsets, self._source, self._start, self._end)
+        )
+        return self.text_bytes() + columns + sum(len(s) for s in self._sources)
+
+    def text_bytes(self) -> int:
+        """Size of the chunk text buffer."""
+        return len(self._text)
+
+    def save(self, directory: str):
+        """
+        Write the docstore to a directory.
+
+        Args:
+            directory: Target directory (created if missing)
+        """
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        (path / "text.bin").write_bytes(bytes(self._text))
+        for name in _COLUMNS:
+            np.save(path / f"{name}.npy", np.asarray(getattr(self, f"_{name}")))
+        (path / "meta.json").write_text(json.dumps({
+            "sources": self._sources,
+            "extras": {str(k): v for k, v in self._extras.items()},
+            "aliases": self._aliases,
+            "deleted": sorted(self._deleted)
+        }))
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: bool = True) -> "CompactDocstore":
+        """
+        Load a docstore written by save().
+
+        Args:
+            directory: Directory passed to save()
+            mmap_mode: Map the text and columns instead of reading them into memory
+
+        Returns:
+            CompactDocstore: The docstore (read-only until something is added)
+        """
+        path = Path(directory)
+        store = cls()
+        meta = json.loads((path / "meta.json").read_text())
+        store._sources = meta["sources"]
+        store._source_codes = {s: i for i, s in enumerate(store._sources)}
+        store._extras = {int(k): v for k, v in meta["extras"].items()}
+        store._aliases = meta["aliases"]
+        store._deleted = set(meta["deleted"])
+
+        for name in _COLUMNS:
+            setattr(store, f"_{name}", np.load(path / f"{name}.npy", mmap_mode="r" if mmap_mode else None))
+        text_path = path / "text.bin"
+        if mmap_mode and text_path.stat().st_size > 0:
+            with open(text_path, "rb") as f:
+                store._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            store._text = store._mmap
+        else:
+            store._text = bytearray(text_path.read_bytes())
+        return store
+
+    def _make_writable(self):
+        """Copy mapped or loaded data into growable buffers before the first append."""
+        if isinstance(self._offsets, array):
+            return
+        self._text = bytearray(self._text[:])
+        for name, typecode in _COLUMNS.items():
+            setattr(self, f"_{name}", array(typecode, np.asarray(getattr(self, f"_{name}")).tolist()))
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __getstate__(self):
+        # Mapped buffers cannot be pickled (FAISS.save_local pickles the docstore)
+        state = self.__dict__.copy()
+        state["_text"] = bytes(self._text[:])
+        state["_mmap"] = None
+        for name, typecode in _COLUMNS.items():
+            state[f"_{name}"] = array(typecode, np.asarray(getattr(self, f"_{name}")).tolist())
+        return state
+
+
+def _time(value) -> float:
+    return _MISSING if value is None else float(value)
+
+
+class PositionalIds:
+    """
+    index_to_docstore_id mapping for CompactDocstore: position i maps to "i".
+
+    Stands in for FAISS's dict without one entry per chunk; only ids that
+    differ from their position are stored.
+    """
+
+    def __init__(self):
+        self._count = 0
+        self._overrides = {}
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index) -> str:
+        index = int(index)
+        if not 0 <= index < self._count:
+            raise KeyError(index)
+        return self._overrides.get(index, str(index))
+
+    def get(self, index, default=None):
+        try:
+            return self[index]
+        except KeyError:
+            return default
+
+    def __contains__(self, index) -> bool:
+        return 0 <= int(index) < self._count
+
+    def __iter__(self):
+        return iter(range(self._count))
+
+    def update(self, mapping: Dict[int, str]):
+        for index, doc_id in mapping.items():
+            if doc_id != str(index):
+                self._overrides[index] = doc_id
+            self._count = max(self._count, index + 1)
+
+    def keys(self):
+        return range(self._count)
+
+    def values(self):
+        return [self[i] for i in range(self._count)]
+
+    def items(self):
+        return [(i, self[i]) for i in range(self._count)]
@@ -1,5 +1,80 @@
+import time
+import heapq
+import random
+import itertools
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
 from langchain_groq import ChatGroq
-from config.settings import GROQ_MODEL_NAME, DEFAULT_TEMPERATURE, set_api_key
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables.config import ensure_config, merge_configs
+from src import tracing
+from config.settings import (
+    GROQ_MODEL_NAME, GROQ_FAST_MODEL_NAME, MODEL_ROUTING, DEFAULT_TEMPERATURE, set_api_key,
+    LLM_PROVIDER, FAKE_LLM_LATENCY, FAKE_LLM_TOKENS_PER_SECOND,
+    GROQ_REQUESTS_PER_MINUTE, GROQ_TOKENS_PER_MINUTE, LLM_MAX_RETRIES,
+    LLM_BACKOFF_BASE, LLM_BACKOFF_MAX, LLM_COMPLETION_TOKENS_ESTIMATE
+)
+
+
+def _create_groq(model_name: str, temperature: float, api_key: str = None):
+    # Retries are handled by LLMScheduler, which knows about the shared rate limits
+    kwargs = {"api_key": api_key} if api_key else {}
+    return ChatGroq(model=model_name, temperature=temperature, max_retries=0, **kwargs)
+
+
+def _create_fake(model_name: str, temperature: float, api_key: str = None):
+    from src.offline_models import FakeChatModel
+    return FakeChatModel(
+        model_name=f"fake-{model_name}",
+        latency=FAKE_LLM_LATENCY,
+        tokens_per_second=FAKE_LLM_TOKENS_PER_SECOND
+    )
+
+
+# Chat model providers: name -> factory(model_name, temperature, api_key) returning a chat model
+PROVIDERS = {
+    "groq": _create_groq,
+    "fake": _create_fake,
+}
+
+# Providers that need no API key
+KEYLESS_PROVIDERS = {"fake"}
+
+
+def register_provider(name: str, factory: Callable, needs_api_key: bool = True):
+    """
+    Register a chat model provider.
+
+    Args:
+        name: Provider name used in LLM_PROVIDER
+        factory: Callable(model_name, temperature, api_key) returning a LangChain chat model
+        needs_api_key: Whether the provider requires an API key
+    """
+    PROVIDERS[name] = factory
+    if not needs_api_key:
+        KEYLESS_PROVIDERS.add(name)
+
+
+def create_chat_model(model_name: str, temperature: float, provider: str = LLM_PROVIDER, api_key: str = None):
+    """
+    Create a chat model from a registered provider.
+
+    Args:
+        model_name: Provider model name
+        temperature: Sampling temperature
+        provider: Provider name (defaults to LLM_PROVIDER)
+        api_key: Optional API key (providers fall back to their env vars)
+
+    Returns:
+        BaseChatModel: The chat model
+    """
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown LLM provider: {provider}. Available: {', '.join(PROVIDERS)}")
+    return PROVIDERS[provider](model_name, temperature, api_key)
+
 
 class LLM:
     """
@@ -10,26 +85,44 @@ class LLM:
     - 0.0 = Deterministic, focused
     - 0.7 = Balanced (default)
     - 1.0 = Creative, diverse
+
+    Holds a large model for final answers and a small, fast model for
+    tool-selection and query-rewrite turns (see MODEL_ROUTING). Models come
+    from a pluggable provider (LLM_PROVIDER); "fake" runs fully offline.
     """
 
-    def __init__(self, api_key: str = None, temperature: float = None):
+    def __init__(self, api_key: str = None, temperature: float = None, provider: str = LLM_PROVIDER):
         """
         Initialize the LLM.
 
         Args:
             api_key: Groq API key (optional, can use env var)
             temperature: Controls randomness (0.0-1.0). Defaults to config value.
+            provider: Chat model provider name (see PROVIDERS)
         """
         if api_key:
             set_api_key(api_key)
+        self.provider = provider
 
         # Use provided temperature or default from config
         self.temperature = temperature if temperature is not None else DEFAULT_TEMPERATURE
-        self.llm = ChatGroq(model=GROQ_MODEL_NAME, temperature=self.temperature)
+        self._create_models()
+
+    def _create_models(self):
+        self.llm = create_chat_model(GROQ_MODEL_NAME, self.temperature, self.provider)
+        self.fast_llm = create_chat_model(GROQ_FAST_MODEL_NAME, self.temperature, self.provider)
+
+    def get(self, role: str = "final"):
+        """
+        Get the LLM instance for a kind of turn.
+
+        Args:
+            role: Turn type from MODEL_ROUTING ("tool_call", "rewrite", "summary", "final")
 
-    def get(self):
-        """Get the LLM instance."""
-        return self.llm
+        Returns:
+            The fast or large chat model
+        """
+        return self.fast_llm if MODEL_ROUTING.get(role, "large") == "fast" else self.llm
 
     def update_temperature(self, temperature: float):
         """
@@ -39,5 +132,382 @@ class LLM:
             temperature: New temperature value (0.0-1.0)
         """
         self.temperature = temperature
-        self.llm = ChatGroq(model=GROQ_MODEL_NAME, temperature=self.temperature)
+        self._create_models()
+
+
+class _TokenWatch(BaseCallbackHandler):
+    """Notes whether a call has streamed any token to its callbacks (and so to a reader)."""
+
+    def __init__(self):
+        self.streamed = False
+
+    def on_llm_new_token(self, token: str, **kwargs):
+        self.streamed = True
+
+
+# Call priorities: lower runs first
+INTERACTIVE = 0  # User questions
+BACKGROUND = 1   # Summaries and other ingestion-time work
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at capacity per minute."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount tokens are available (0 if available now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)  # A single oversized call must still run eventually
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    def consume(self, amount: float):
+        """Take tokens; may go negative when correcting an underestimate."""
+        self.tokens -= amount
+
+
+class LLMScheduler:
+    """
+    Rate-limit aware scheduler for LLM calls.
+
+    Every call is admitted against its model's two token buckets, one for
+    requests per minute and one for tokens per minute (Groq limits each model
+    separately). Callers of a model wait in priority order, so interactive
+    questions go ahead of background summarization, and a throttled model
+    does not hold up calls to another one. Rate-limited (429) and transient
+    server errors are retried with jittered exponential backoff, unless the
+    call already streamed tokens to its reader. A retry-after header from
+    the provider pauses that model's callers for that long.
+
+    Calls run on the caller's thread, so LangChain callbacks (streaming,
+    tracing) keep working.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = GROQ_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = GROQ_TOKENS_PER_MINUTE,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff_base: float = LLM_BACKOFF_BASE,
+        backoff_max: float = LLM_BACKOFF_MAX
+    ):
+        """
+        Initialize the scheduler.
+
+        Args:
+            requests_per_minute: Request budget per model
+            tokens_per_minute: Token budget per model (prompt + completion)
+            max_retries: Retries per call on rate-limit or transient errors
+            backoff_base: First backoff delay in seconds
+            backoff_max: Upper bound for a backoff delay in seconds
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._cond = threading.Condition()
+        self._queue = []  # Heap of (priority, sequence, model) tickets
+        self._sequence = itertools.count()
+        self._buckets = {}  # Model name -> (requests bucket, tokens bucket)
+        self._paused_until = {}  # Model name -> monotonic time, set from retry-after headers
+
+        # Metrics
+        self._waits = {INTERACTIVE: deque(maxlen=1000), BACKGROUND: deque(maxlen=1000)}
+        self._latencies = {}  # Model name -> recent call durations (excluding queueing)
+        self._prefix_cache = {}  # Model name -> [calls, prompt tokens, cached prompt tokens]
+        self.calls = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.failures = 0
+
+    def call(
+        self,
+        fn: Callable,
+        priority: int = INTERACTIVE,
+        estimated_tokens: int = 0,
+        model: str = "",
+        can_retry: Callable[[], bool] = None
+    ):
+        """
+        Run an LLM call once it is admitted, retrying on rate limits.
+
+        Args:
+            fn: Zero-argument callable making the LLM request
+            priority: INTERACTIVE or BACKGROUND
+            estimated_tokens: Expected prompt + completion tokens
+            model: Model name whose budgets the call counts against
+            can_retry: Asked after a failed attempt; False re-raises instead of retrying
+
+        Returns:
+            Whatever fn returns
+        """
+        for attempt in range(self.max_retries + 1):
+            self._admit(priority, estimated_tokens, model)
+            try:
+                result = fn()
+            except Exception as e:
+                if not _is_retryable(e) or attempt == self.max_retries or (can_retry and not can_retry()):
+                    with self._cond:
+                        self.failures += 1
+                    raise
+                with self._cond:
+                    self.retries += 1
+                self._backoff(e, attempt, model)
+                continue
+
+            usage = getattr(result, "usage_metadata", None)
+            with self._cond:
+                # Correct the token bucket with the real usage when the provider reports it
+                if usage and usage.get("total_tokens"):
+                    self._budget(model)[1].consume(usage["total_tokens"] - estimated_tokens)
+                self.calls += 1
+            return result
+
+    def invoke(self, runnable, messages: list, priority: int = INTERACTIVE, config: dict = None):
+        """
+        Invoke a chat model (or bound model) on a list of messages through the scheduler.
+
+        Args:
+            runnable: Chat model or runnable to invoke
+            messages: Input messages
+            priority: INTERACTIVE or BACKGROUND
+            config: Optional runnable config
+
+        Returns:
+            The model response
+        """
+        model = model_name(runnable)
+        watch = _TokenWatch()
+
+        def timed_invoke():
+            nonlocal watch
+            watch = _TokenWatch()
+            started = time.monotonic()
+            try:
+                # One request span per attempt; the enclosing llm.invoke span includes queueing
+                with tracing.span("llm.request", model=model):
+                    # Added to the inherited callbacks (LangGraph's token streaming among them)
+                    return runnable.invoke(messages, merge_configs(ensure_config(config), {"callbacks": [watch]}))
+            finally:
+                with self._cond:
+                    self._latencies.setdefault(model, deque(maxlen=1000)).append(time.monotonic() - started)
+
+        with tracing.span("llm.invoke", model=model, priority=priority, messages=len(messages)) as span:
+            # A stream that already sent tokens is not retried: the reader would get them twice
+            result = self.call(
+                timed_invoke, priority, estimate_tokens(messages), model, can_retry=lambda: not watch.streamed
+            )
+            usage = getattr(result, "usage_metadata", None) or {}
+            span.set(
+                input_tokens=usage.get("input_tokens", 0),
+                output_tokens=usage.get("output_tokens", 0),
+                tool_calls=len(getattr(result, "tool_calls", None) or [])
+            )
+            cached = cached_prompt_tokens(result)
+            if cached is not None:
+                span.set(cached_tokens=cached)
+                with self._cond:
+                    stats = self._prefix_cache.setdefault(model, [0, 0, 0])
+                    stats[0] += 1
+                    stats[1] += usage.get("input_tokens", 0)
+                    stats[2] += cached
+            return result
+
+    def batch(self, runnable, inputs: List[list], priority: int = BACKGROUND, max_concurrency: int = 4) -> list:
+        """
+        Invoke a chat model on several message lists through the scheduler.
+
+        Args:
+            runnable: Chat model or runnable to invoke
+            inputs: One message list per call
+            priority: INTERACTIVE or BACKGROUND
+            max_concurrency: Calls in flight at once
+
+        Returns:
+            list: Responses in input order
+        """
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(inputs)))) as pool:
+            # Each call runs in a copy of the caller's context so its spans join the caller's trace
+            futures = [
+                pool.submit(contextvars.copy_context().run, self.invoke, runnable, messages, priority)
+                for messages in inputs
+            ]
+            return [f.result() for f in futures]
+
+    def metrics(self) -> dict:
+        """
+        Get queue depth, wait times, per-model latency, prefix-cache hit rates and retry counters.
+
+        Returns:
+            dict: Metrics, with wait-time percentiles (seconds) per priority
+                  and call latency percentiles (seconds) and prompt cache
+                  usage per model
+        """
+        with self._cond:
+            depth = {"interactive": 0, "background": 0}
+            for priority, _, _ in self._queue:
+                depth["interactive" if priority == INTERACTIVE else "background"] += 1
+            waits = {p: sorted(w) for p, w in self._waits.items()}
+            latencies = {m: sorted(l) for m, l in self._latencies.items()}
+            prefix_cache = {
+                m: {
+                    "calls": calls,
+                    "prompt_tokens": prompt,
+                    "cached_tokens": cached,
+                    "hit_rate": cached / prompt if prompt else 0.0
+                }
+                for m, (calls, prompt, cached) in self._prefix_cache.items()
+            }
+            counters = {
+                "calls": self.calls,
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+                "failures": self.failures
+            }
+        return {
+            "queue_depth": depth,
+            "wait_seconds": {
+                name: _percentiles(waits[priority])
+                for name, priority in (("interactive", INTERACTIVE), ("background", BACKGROUND))
+            },
+            "latency_seconds": {m: _percentiles(l) for m, l in latencies.items()},
+            # Share of prompt tokens served from the provider's prefix cache,
+            # for models whose responses report it
+            "prefix_cache": prefix_cache,
+            **counters
+        }
+
+    def _budget(self, model: str):
+        """Request and token buckets of a model (call with self._cond held)."""
+        if model not in self._buckets:
+            self._buckets[model] = (TokenBucket(self.requests_per_minute), TokenBucket(self.tokens_per_minute))
+        return self._buckets[model]
+
+    def _admit(self, priority: int, estimated_tokens: int, model: str):
+        """Block until this call is first in line for its model and both of the model's budgets allow it."""
+        ticket = (priority, next(self._sequence), model)
+        started = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            requests, tokens = self._budget(model)
+            while True:
+                now = time.monotonic()
+                if ticket == min(t for t in self._queue if t[2] == model):
+                    wait = max(
+                        self._paused_until.get(model, 0.0) - now,
+                        requests.wait_time(1, now),
+                        tokens.wait_time(estimated_tokens, now)
+                    )
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                else:
+                    self._cond.wait()
+            self._queue.remove(ticket)
+            heapq.heapify(self._queue)
+            requests.consume(1)
+            tokens.consume(estimated_tokens)
+            self._waits[priority].append(time.monotonic() - started)
+            self._cond.notify_all()
+
+    def _backoff(self, error: Exception, attempt: int, model: str):
+        """Sleep before a retry, honouring retry-after when the provider sends it."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+            # Everyone else calling this model would hit the same limit, so pause its queue
+            with self._cond:
+                self.rate_limited += 1
+                self._paused_until[model] = max(self._paused_until.get(model, 0.0), time.monotonic() + retry_after)
+                self._cond.notify_all()
+        elif _status_code(error) == 429:
+            with self._cond:
+                self.rate_limited += 1
+        time.sleep(delay)
+
+
+def model_name(runnable) -> str:
+    """Name of the model behind a chat model or a bound runnable (tools, config)."""
+    model = getattr(runnable, "bound", runnable)
+    return getattr(model, "model_name", None) or getattr(model, "model", None) or type(model).__name__
+
+
+def cached_prompt_tokens(result):
+    """Prompt tokens the provider served from its prefix cache, or None if the response does not say."""
+    usage = getattr(result, "usage_metadata", None) or {}
+    details = usage.get("input_token_details") or {}
+    if "cache_read" in details:
+        return details["cache_read"]
+    # OpenAI-compatible raw usage (Groq): prompt_tokens_details.cached_tokens
+    token_usage = (getattr(result, "response_metadata", None) or {}).get("token_usage") or {}
+    details = token_usage.get("prompt_tokens_details") or {}
+    return details.get("cached_tokens")
+
+
+def estimate_tokens(messages: list) -> int:
+    """Rough prompt + completion token estimate (about 4 characters per token)."""
+    chars = sum(len(m.content) if isinstance(m.content, str) else len(str(m.content)) for m in messages)
+    return chars // 4 + LLM_COMPLETION_TOKENS_ESTIMATE
+
+
+def _status_code(error: Exception):
+    code = getattr(error, "status_code", None)
+    if code is None and getattr(error, "response", None) is not None:
+        code = getattr(error.response, "status_code", None)
+    return code
+
+
+def _retry_after(error: Exception):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Rate limits, server errors and connection problems are worth retrying."""
+    code = _status_code(error)
+    if code is not None:
+        return code == 429 or code >= 500
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError", "RateLimitError")
+
+
+def _percentiles(values: list) -> dict:
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+    return {
+        "p50": values[len(values) // 2],
+        "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+        "max": values[-1]
+    }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
 
+def get_scheduler() -> LLMScheduler:
+    """Get the process-wide LLM scheduler (all sessions share the provider's limits)."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            if LLM_PROVIDER in KEYLESS_PROVIDERS:
+                # Offline models have no provider limits to pace against
+                _scheduler = LLMScheduler(requests_per_minute=1e9, tokens_per_minute=1e12)
+            else:
+                _scheduler = LLMScheduler()
+        return _scheduler
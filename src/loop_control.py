@@ -0,0 +1,131 @@
+"""
+Stopping rules for the agent's search/answer loop.
+
+A question normally ends when the model answers without calling a tool.
+The loop is also cut short, with one last call that must answer from the
+excerpts already retrieved, when:
+- no_new_chunks    the latest search returned only chunks the question
+                   had already seen (a paraphrased re-search)
+- time_budget      MAX_QUESTION_SECONDS have passed since the question started
+- token_budget     the question's LLM calls used MAX_QUESTION_TOKENS
+- max_iterations   the next call would be the last one MAX_ITERATIONS allows
+
+Search tools return their chunk IDs as the ToolMessage artifact, so the
+rules only need the question's messages.
+"""
+
+import time
+import hashlib
+from typing import List, Optional
+from langchain_core.documents import Document
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage
+from config.settings import MAX_ITERATIONS, MAX_QUESTION_SECONDS, MAX_QUESTION_TOKENS
+
+# Sent after the history (for that call only) when the loop is stopped early
+FINAL_ANSWER_INSTRUCTION = (
+    "Searching again will not find anything new. Answer the question now using only the "
+    "transcript excerpts above; if they do not contain the answer, say so."
+)
+
+
+def chunk_id(doc: Document) -> str:
+    """
+    Stable ID of a retrieved chunk: its video and start time, or, for a chunk
+    without a start time, its video and a hash of its text.
+    """
+    source = doc.metadata.get("source", "")
+    start = doc.metadata.get("start")
+    if start is None:
+        return f"{source}#{hashlib.sha1(doc.page_content.encode('utf-8')).hexdigest()[:16]}"
+    return f"{source}@{float(start):.2f}"
+
+
+def chunk_ids(docs: List[Document]) -> List[str]:
+    """Stable IDs of retrieved chunks, for a search tool's artifact."""
+    return [chunk_id(d) for d in docs]
+
+
+def question_messages(messages: List[BaseMessage]) -> List[BaseMessage]:
+    """Messages of the current question: everything after the last user message."""
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            return messages[i + 1:]
+    return messages
+
+
+def current_question(messages: List[BaseMessage]) -> Optional[str]:
+    """Text of the last user message (the question being answered), or None."""
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            return str(message.content)
+    return None
+
+
+def found_new_chunks(messages: List[BaseMessage]) -> bool:
+    """
+    Whether the latest round of searches returned any chunk not seen earlier in the question.
+
+    Only tool results carrying chunk IDs count; a round without any (another
+    tool, or a failed call) is treated as progress.
+    """
+    current = question_messages(messages)
+    latest = []
+    for message in reversed(current):
+        if not isinstance(message, ToolMessage):
+            break
+        latest.append(message)
+    latest = [m for m in latest if isinstance(m.artifact, list)]
+    if not latest:
+        return True
+    seen = set()
+    for message in current[:len(current) - len(latest)]:
+        if isinstance(message, ToolMessage) and isinstance(message.artifact, list):
+            seen.update(message.artifact)
+    if not seen:
+        return True  # First search of the question
+    return any(chunk not in seen for m in latest for chunk in m.artifact)
+
+
+def question_tokens(messages: List[BaseMessage]) -> int:
+    """Input plus output tokens of the current question's LLM calls."""
+    total = 0
+    for message in question_messages(messages):
+        if isinstance(message, AIMessage) and message.usage_metadata:
+            total += message.usage_metadata.get("input_tokens", 0) + message.usage_metadata.get("output_tokens", 0)
+    return total
+
+
+def stop_reason(
+    state: dict,
+    max_iterations: int = MAX_ITERATIONS,
+    max_seconds: float = MAX_QUESTION_SECONDS,
+    max_tokens: int = MAX_QUESTION_TOKENS
+) -> Optional[str]:
+    """
+    Why the next model call must write the final answer, if it must.
+
+    Args:
+        state: Agent state ('messages', 'iterations' and 'started_at', a time.time())
+        max_iterations: LLM calls allowed per question
+        max_seconds: Wall-clock budget per question (0 disables)
+        max_tokens: Token budget per question (0 disables)
+
+    Returns:
+        str: Stop reason, or None to let the model decide
+    """
+    messages = state["messages"]
+    if not found_new_chunks(messages):
+        return "no_new_chunks"
+    started_at = state.get("started_at")
+    if max_seconds and started_at and time.time() - started_at >= max_seconds:
+        return "time_budget"
+    if max_tokens and question_tokens(messages) >= max_tokens:
+        return "token_budget"
+    if state.get("iterations", 0) + 1 >= max_iterations:
+        return "max_iterations"
+    return None
+
+
+def final_answer_message() -> HumanMessage:
+    """Instruction appended to the last call of a stopped loop."""
+    return HumanMessage(content=FINAL_ANSWER_INSTRUCTION)
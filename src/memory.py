@@ -0,0 +1,167 @@
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage, RemoveMessage
+from config.settings import (
+    CHECKPOINT_DB_PATH, HISTORY_MAX_TURNS, CHECKPOINT_MAX_THREADS, CHECKPOINT_TTL, CHECKPOINT_PRUNE_INTERVAL
+)
+
+_checkpointer = None
+_checkpointer_lock = threading.Lock()
+
+# Last use of each thread: a table next to the SQLite checkpoints (so retention
+# survives restarts), or this dict with in-memory checkpoints
+_ACTIVITY_TABLE = "thread_activity"
+_activity = {}
+_activity_lock = threading.Lock()
+_next_prune = 0.0
+
+
+def get_checkpointer(path: Path = CHECKPOINT_DB_PATH):
+    """
+    Get the process-wide LangGraph checkpointer for conversation threads.
+
+    Uses a local SQLite database; falls back to in-memory checkpoints if
+    langgraph-checkpoint-sqlite is not installed.
+
+    Args:
+        path: SQLite database file
+
+    Returns:
+        BaseCheckpointSaver: Shared checkpointer
+    """
+    global _checkpointer
+    with _checkpointer_lock:
+        if _checkpointer is None:
+            try:
+                from langgraph.checkpoint.sqlite import SqliteSaver
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+                # Shared between Streamlit/server threads; SqliteSaver serializes access itself
+                conn = sqlite3.connect(str(path), check_same_thread=False)
+                _checkpointer = SqliteSaver(conn)
+                with _checkpointer.cursor() as cur:
+                    cur.execute(
+                        f"CREATE TABLE IF NOT EXISTS {_ACTIVITY_TABLE} (thread_id TEXT PRIMARY KEY, last_used REAL NOT NULL)"
+                    )
+                    # Threads checkpointed before retention existed start their TTL now
+                    cur.execute(
+                        f"INSERT OR IGNORE INTO {_ACTIVITY_TABLE} SELECT DISTINCT thread_id, ? FROM checkpoints",
+                        (time.time(),)
+                    )
+            except ImportError:
+                from langgraph.checkpoint.memory import MemorySaver
+                print("Warning: langgraph-checkpoint-sqlite not installed. Conversations are kept in memory only.")
+                _checkpointer = MemorySaver()
+        return _checkpointer
+
+
+def touch_thread(thread_id: str):
+    """
+    Record that a conversation thread was used, and periodically delete stale threads.
+
+    Threads idle longer than CHECKPOINT_TTL, or beyond the CHECKPOINT_MAX_THREADS
+    most recently used, lose their checkpoints.
+
+    Args:
+        thread_id: Conversation thread about to be asked in
+    """
+    global _next_prune
+    checkpointer = get_checkpointer()
+    now = time.time()
+    if _sqlite(checkpointer):
+        with checkpointer.cursor() as cur:
+            cur.execute(
+                f"INSERT INTO {_ACTIVITY_TABLE} VALUES (?, ?) "
+                "ON CONFLICT(thread_id) DO UPDATE SET last_used = excluded.last_used",
+                (thread_id, now)
+            )
+    else:
+        with _activity_lock:
+            _activity[thread_id] = now
+    with _activity_lock:
+        if now < _next_prune:
+            return
+        _next_prune = now + CHECKPOINT_PRUNE_INTERVAL
+    for stale in stale_threads(now, keep=thread_id):
+        delete_thread(stale)
+
+
+def stale_threads(now: float = None, max_threads: int = CHECKPOINT_MAX_THREADS, ttl: float = CHECKPOINT_TTL,
+                  keep: str = None) -> List[str]:
+    """
+    Threads whose checkpoints should be deleted.
+
+    Args:
+        now: Current time (default time.time())
+        max_threads: Most recently used threads to keep (0 keeps all)
+        ttl: Seconds of inactivity before a thread expires (0 never expires)
+        keep: Thread never returned (the one in use)
+
+    Returns:
+        List[str]: Expired threads, then the least recently used beyond max_threads
+    """
+    now = time.time() if now is None else now
+    checkpointer = get_checkpointer()
+    if _sqlite(checkpointer):
+        with checkpointer.cursor(transaction=False) as cur:
+            rows = cur.execute(f"SELECT thread_id, last_used FROM {_ACTIVITY_TABLE} ORDER BY last_used DESC").fetchall()
+    else:
+        with _activity_lock:
+            rows = sorted(_activity.items(), key=lambda item: item[1], reverse=True)
+    stale = []
+    for rank, (thread_id, last_used) in enumerate(rows):
+        if thread_id == keep:
+            continue
+        if (ttl and now - last_used > ttl) or (max_threads and rank >= max_threads):
+            stale.append(thread_id)
+    return stale
+
+
+def delete_thread(thread_id: str):
+    """Delete a conversation thread's checkpoints (after a reset, or when its session closes)."""
+    checkpointer = get_checkpointer()
+    checkpointer.delete_thread(thread_id)
+    if _sqlite(checkpointer):
+        with checkpointer.cursor() as cur:
+            cur.execute(f"DELETE FROM {_ACTIVITY_TABLE} WHERE thread_id = ?", (thread_id,))
+    else:
+        with _activity_lock:
+            _activity.pop(thread_id, None)
+
+
+def _sqlite(checkpointer) -> bool:
+    return hasattr(checkpointer, "conn")
+
+
+def prune_history(messages: List[BaseMessage], max_turns: int = HISTORY_MAX_TURNS) -> List[RemoveMessage]:
+    """
+    Work out which messages to drop to keep the conversation bounded.
+
+    The newest message is the question being asked. Earlier turns keep only
+    the user question and final answer (tool calls and tool results are
+    dropped), and only the last max_turns earlier turns are kept.
+
+    Args:
+        messages: Full conversation history, oldest first
+        max_turns: Number of earlier question/answer turns to keep
+
+    Returns:
+        List[RemoveMessage]: Removals to apply through the add_messages reducer
+    """
+    history = messages[:-1]
+    questions = [i for i, m in enumerate(history) if isinstance(m, HumanMessage)]
+    if max_turns <= 0:
+        cutoff = len(history)
+    elif len(questions) > max_turns:
+        cutoff = questions[-max_turns]
+    else:
+        cutoff = 0
+
+    remove = []
+    for i, msg in enumerate(history):
+        intermediate = isinstance(msg, ToolMessage) or (isinstance(msg, AIMessage) and msg.tool_calls)
+        if i < cutoff or intermediate:
+            remove.append(RemoveMessage(id=msg.id))
+    return remove
@@ -0,0 +1,191 @@
+"""
+Deterministic offline stand-ins for the chat model and embeddings.
+
+Used for tests, benchmarks and load tests on machines without network
+access (LLM_PROVIDER=fake, EMBEDDING_PROVIDER=hashing). Nothing here is
+random: the same inputs always give the same outputs (only the simulated
+prompt cache usage depends on earlier calls).
+"""
+
+import re
+import json
+import time
+import zlib
+import math
+import threading
+from collections import OrderedDict
+from typing import Any, Iterator, List, Optional
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+# Simulated provider prompt cache: (model, hash of a message prefix) entries, oldest first
+_PREFIX_CACHE_SIZE = 10000
+_prefix_cache = OrderedDict()
+_prefix_lock = threading.Lock()
+
+
+def _text(message: BaseMessage) -> str:
+    return message.content if isinstance(message.content, str) else str(message.content)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic chat model that supports tool calling.
+
+    Behaviour:
+    - With tools bound, if a tool is forced or no tool has answered since the
+      last user message, it calls a tool (the forced one, else search_video,
+      else the first) with the user's question as the query.
+    - Otherwise it answers by quoting the start of the latest tool result
+      (or of the last message when there is none).
+
+    Latency is simulated as a fixed time to first token plus a per-token
+    rate, both when invoking and when streaming. With prefix_caching, usage
+    reports the prompt tokens of the longest message prefix sent before to
+    the same model as input_token_details["cache_read"], like providers
+    with prompt caching.
+    """
+
+    model_name: str = "fake"
+    latency: float = 0.2             # Seconds before the first token
+    tokens_per_second: float = 200.0
+    answer_words: int = 60           # Length of generated answers
+    prefix_caching: bool = True
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"model_name": self.model_name}
+
+    def bind_tools(self, tools: list, *, tool_choice: Optional[str] = None, **kwargs: Any):
+        formatted = [convert_to_openai_tool(t) for t in tools]
+        return super().bind(tools=formatted, tool_choice=tool_choice, **kwargs)
+
+    def _respond(self, messages: List[BaseMessage], tools: list = None, tool_choice: str = None) -> AIMessage:
+        names = [t["function"]["name"] for t in tools or []]
+
+        # Messages since the latest user question
+        last_human = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=-1)
+        question = _text(messages[last_human]) if last_human >= 0 else ""
+        tool_results = [m for m in messages[last_human + 1:] if isinstance(m, ToolMessage)]
+
+        forced = tool_choice if tool_choice in names else None
+        if names and tool_choice != "none" and (forced or not tool_results):
+            name = forced or ("search_video" if "search_video" in names else names[0])
+            call_id = f"call_{zlib.crc32(f'{len(messages)}:{question}'.encode()):08x}"
+            return AIMessage(content="", tool_calls=[{"name": name, "args": {"query": question}, "id": call_id}])
+
+        source = _text(tool_results[-1]) if tool_results else _text(messages[-1])
+        words = source.split()[:self.answer_words]
+        return AIMessage(content="Based on the video: " + " ".join(words))
+
+    def _usage(self, messages: List[BaseMessage], message: AIMessage) -> dict:
+        input_tokens = sum(len(_text(m)) for m in messages) // 4 + 1
+        output_tokens = max(1, len(_text(message).split()) + 10 * len(message.tool_calls))
+        usage = {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+        if self.prefix_caching:
+            usage["input_token_details"] = {"cache_read": self._cached_prefix_tokens(messages)}
+        return usage
+
+    def _cached_prefix_tokens(self, messages: List[BaseMessage]) -> int:
+        """Tokens of the longest leading run of messages already sent to this model; records this prompt."""
+        keys, chars, cached = [], 0, 0
+        digest = 0
+        for m in messages:
+            digest = zlib.crc32(f"{m.type}\0{_text(m)}\0".encode(), digest)
+            chars += len(_text(m))
+            keys.append(((self.model_name, digest, chars), chars))
+        with _prefix_lock:
+            for key, prefix_chars in keys:
+                if key not in _prefix_cache:
+                    break
+                cached = prefix_chars
+            for key, _ in keys:
+                _prefix_cache[key] = True
+                _prefix_cache.move_to_end(key)
+            while len(_prefix_cache) > _PREFIX_CACHE_SIZE:
+                _prefix_cache.popitem(last=False)
+        return cached // 4
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        tools: list = None,
+        tool_choice: str = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        message = self._respond(messages, tools, tool_choice)
+        message.usage_metadata = self._usage(messages, message)
+        time.sleep(self.latency + message.usage_metadata["output_tokens"] / self.tokens_per_second)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        tools: list = None,
+        tool_choice: str = None,
+        **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        message = self._respond(messages, tools, tool_choice)
+        usage = self._usage(messages, message)
+        time.sleep(self.latency)
+
+        if message.tool_calls:
+            call = message.tool_calls[0]
+            time.sleep(usage["output_tokens"] / self.tokens_per_second)
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content="",
+                tool_call_chunks=[{"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": 0}],
+                usage_metadata=usage
+            ))
+            return
+
+        words = message.content.split(" ")
+        for i, word in enumerate(words):
+            token = word if i == 0 else " " + word
+            chunk = ChatGenerationChunk(message=AIMessageChunk(
+                content=token,
+                usage_metadata=usage if i == len(words) - 1 else None
+            ))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+            time.sleep(1.0 / self.tokens_per_second)
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Bag-of-words feature hashing embeddings.
+
+    Texts sharing words get similar vectors, so retrieval behaves sensibly
+    without downloading a model. Vectors are L2-normalized.
+    """
+
+    def __init__(self, size: int = 384):
+        self.size = size
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.size
+        for word in _WORD.findall(text.lower()):
+            h = zlib.crc32(word.encode("utf-8"))
+            vector[h % self.size] += 1.0 if (h >> 16) & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
@@ -0,0 +1,89 @@
+"""
+Prompt assembly for agent turns.
+
+Every LLM call of a question starts with the system prompt followed by the
+conversation, which only grows at the end. Providers with prompt (prefix)
+caching reuse work only when the leading tokens are identical from call to
+call, so the system prompt is compiled once per text into a SystemMessage
+that every call, session and agent shares, and each call's input is a view
+of that prefix plus the state's messages rather than a new list.
+"""
+
+from collections.abc import Sequence
+from functools import lru_cache
+from typing import List
+from langchain_core.messages import BaseMessage, SystemMessage
+
+
+class PromptMessages(Sequence):
+    """Read-only [prefix..., *messages] view; the message list is not copied."""
+
+    __slots__ = ("prefix", "messages")
+
+    def __init__(self, prefix: tuple, messages: List[BaseMessage]):
+        self.prefix = prefix
+        self.messages = messages
+
+    def __len__(self) -> int:
+        return len(self.prefix) + len(self.messages)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        if index < len(self.prefix):
+            return self.prefix[index]
+        return self.messages[index - len(self.prefix)]
+
+    def __iter__(self):
+        yield from self.prefix
+        yield from self.messages
+
+
+class CompiledPrompt:
+    """
+    A system prompt compiled into the stable prefix of every call.
+
+    Use compile_prompt() so that equal texts share one instance.
+    """
+
+    def __init__(self, text: str):
+        """
+        Compile a system prompt.
+
+        Args:
+            text: System prompt text (sent byte-for-byte as given)
+        """
+        self.text = text
+        self.system_message = SystemMessage(content=text)
+        self.prefix = (self.system_message,)
+
+    def messages(self, history: List[BaseMessage], *extra: BaseMessage) -> Sequence:
+        """
+        Messages for one call: the system prefix, then the conversation.
+
+        Args:
+            history: Conversation messages (not copied unless extra is given)
+            extra: Messages appended after the history for this call only
+
+        Returns:
+            Sequence[BaseMessage]: Input for a chat model or LLMScheduler.invoke
+        """
+        return PromptMessages(self.prefix, list(history) + list(extra) if extra else history)
+
+
+@lru_cache(maxsize=64)
+def compile_prompt(text: str) -> CompiledPrompt:
+    """
+    Get the compiled prompt for a system prompt text (cached per text).
+
+    Args:
+        text: System prompt text
+
+    Returns:
+        CompiledPrompt: Shared compiled prompt
+    """
+    return CompiledPrompt(text)
@@ -0,0 +1,315 @@
+import re
+import time
+import zlib
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Dict, List
+from config.settings import (
+    PROMPT_VERSION, PROMPTS_DIR, PROMPT_ACTIVE_FILE, PROMPT_RELOAD_INTERVAL, load_system_prompt
+)
+from src.prompt_builder import CompiledPrompt, compile_prompt
+from src.llm_manager import _percentiles
+
+_VERSION_FILE = re.compile(r"system_prompt_(v[\w.-]+)\.txt$")
+
+
+def parse_split(text: str) -> Dict[str, float]:
+    """
+    Parse an active-version spec: "v2" or "v1=90,v2=10" (weights, any scale).
+
+    Returns:
+        dict: Version -> share of sessions (sums to 1)
+    """
+    weights = {}
+    for part in text.replace("\n", ",").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        version, _, weight = part.partition("=")
+        weights[version.strip()] = float(weight) if weight else 1.0
+    total = sum(weights.values())
+    if not weights or total <= 0:
+        raise ValueError(f"Invalid prompt version spec: {text!r}")
+    return {version: weight / total for version, weight in weights.items()}
+
+
+class _VersionStats:
+    def __init__(self):
+        self.questions = 0
+        self.llm_calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cached_tokens = 0
+        self.latencies = deque(maxlen=1000)   # Seconds per question
+        self.first_tokens = deque(maxlen=1000)  # Seconds to first streamed token
+
+
+class PromptRegistry:
+    """
+    All system prompt versions in the prompts directory, switchable at runtime.
+
+    Every prompts/system_prompt_<version>.txt is loaded and compiled up
+    front. The directory is re-checked (file modification times) at most
+    every reload_interval seconds when a prompt is requested, so new or
+    edited versions, and changes to the active-version file, apply without
+    a restart.
+
+    The active spec is one version, or weights over several; with weights,
+    each session (conversation thread) is assigned a version by a stable
+    hash of its ID, so an A/B split keeps a conversation on one prompt.
+    Latency and token usage are recorded per version.
+    """
+
+    def __init__(
+        self,
+        directory: Path = PROMPTS_DIR,
+        active_file: Path = PROMPT_ACTIVE_FILE,
+        default_version: str = PROMPT_VERSION,
+        reload_interval: float = PROMPT_RELOAD_INTERVAL
+    ):
+        """
+        Load every prompt version.
+
+        Args:
+            directory: Directory of system_prompt_<version>.txt files
+            active_file: File holding the active spec ("v2" or "v1=90,v2=10")
+            default_version: Active version when active_file does not exist
+            reload_interval: Minimum seconds between directory checks
+        """
+        self.directory = Path(directory)
+        self.active_file = Path(active_file)
+        self.default_version = default_version
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._prompts = {}     # version -> CompiledPrompt
+        self._mtimes = {}      # path -> (mtime, size) of the loaded contents
+        self._split = {default_version: 1.0}
+        self._pinned = None    # Spec set through activate()/set_split(), overrides the file
+        self._checked = 0.0
+        self._warned = None    # Last active-file problem reported, so it is printed once
+        self._stats = {}       # version -> _VersionStats
+        self.reloads = 0
+        self.reload()
+
+    def reload(self) -> bool:
+        """
+        Re-read changed, new or deleted prompt files and the active spec.
+
+        Returns:
+            bool: Whether anything changed
+        """
+        with self._lock:
+            self._checked = time.monotonic()
+            changed = False
+            seen = set()
+            for path in self.directory.glob("system_prompt_*.txt"):
+                match = _VERSION_FILE.search(path.name)
+                if not match:
+                    continue
+                try:
+                    stat = path.stat()
+                    mtime = (stat.st_mtime_ns, stat.st_size)
+                    if self._mtimes.get(path) == mtime:
+                        seen.add(path)
+                        continue
+                    text = path.read_text(encoding="utf-8").strip()
+                except FileNotFoundError:
+                    continue  # Deleted while scanning
+                seen.add(path)
+                self._prompts[match.group(1)] = compile_prompt(text)
+                self._mtimes[path] = mtime
+                changed = True
+            for path in set(self._mtimes) - seen:
+                del self._mtimes[path]
+                self._prompts.pop(_VERSION_FILE.search(path.name).group(1), None)
+                changed = True
+            if self.default_version not in self._prompts:
+                # load_system_prompt falls back to the built-in prompt
+                self._prompts[self.default_version] = compile_prompt(load_system_prompt(self.default_version))
+
+            split = self._pinned or self._read_active_file()
+            if split != self._split:
+                self._split = split
+                changed = True
+            if changed:
+                self.reloads += 1
+            return changed
+
+    def _read_active_file(self) -> Dict[str, float]:
+        """Active spec from the file (or the default version); unknown versions are skipped with a warning."""
+        try:
+            split = parse_split(self.active_file.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {self.default_version: 1.0}
+        except ValueError as e:
+            self._warn(f"{e}; using {self.default_version}")
+            return {self.default_version: 1.0}
+        unknown = [v for v in split if v not in self._prompts]
+        if unknown:
+            self._warn(f"Unknown prompt version(s) in {self.active_file}: {', '.join(unknown)}")
+            split = {v: w for v, w in split.items() if v in self._prompts}
+            total = sum(split.values())
+            return {v: w / total for v, w in split.items()} if split else {self.default_version: 1.0}
+        return split
+
+    def _warn(self, message: str):
+        if message != self._warned:
+            print(f"Warning: {message}")
+            self._warned = message
+
+    def _maybe_reload(self):
+        if time.monotonic() - self._checked >= self.reload_interval:
+            self.reload()
+
+    def versions(self) -> List[str]:
+        """Loaded prompt versions."""
+        self._maybe_reload()
+        with self._lock:
+            return sorted(self._prompts)
+
+    def activate(self, version: str):
+        """
+        Make one version active for all sessions (until reset_active()).
+
+        Args:
+            version: Loaded prompt version
+        """
+        self.set_split({version: 1.0})
+
+    def set_split(self, weights: Dict[str, float]):
+        """
+        A/B split sessions between versions (until reset_active()).
+
+        Args:
+            weights: Version -> weight (any scale)
+        """
+        self._maybe_reload()
+        split = parse_split(",".join(f"{v}={w}" for v, w in weights.items()))
+        with self._lock:
+            unknown = [v for v in split if v not in self._prompts]
+            if unknown:
+                raise ValueError(f"Unknown prompt version(s): {', '.join(unknown)}")
+            self._pinned = self._split = split
+
+    def reset_active(self):
+        """Go back to the active-version file (or the default version)."""
+        with self._lock:
+            self._pinned = None
+        self.reload()
+
+    def version_for(self, session_id: str = None) -> str:
+        """
+        Version a session's questions use.
+
+        Args:
+            session_id: Conversation thread or session ID (None: the largest share)
+
+        Returns:
+            str: Prompt version
+        """
+        self._maybe_reload()
+        with self._lock:
+            split = self._split
+        if session_id is None or len(split) == 1:
+            return max(split, key=split.get)
+        point = zlib.crc32(str(session_id).encode()) / 2**32
+        cumulative = 0.0
+        for version, share in split.items():
+            cumulative += share
+            if point < cumulative:
+                return version
+        return version
+
+    def get(self, version: str = None, session_id: str = None) -> CompiledPrompt:
+        """
+        Compiled prompt for a version (default: the session's version).
+
+        Args:
+            version: Prompt version
+            session_id: Used to pick the version when none is given
+
+        Returns:
+            CompiledPrompt: The prompt
+        """
+        version = version or self.version_for(session_id)
+        with self._lock:
+            prompt = self._prompts.get(version)
+            if prompt is None:
+                # Deleted since the question started; the default always exists
+                prompt = self._prompts[self.default_version]
+            return prompt
+
+    def record_call(self, version: str, usage: dict, cached_tokens: int = None):
+        """
+        Record the token usage of one LLM call made with a version.
+
+        Args:
+            version: Prompt version
+            usage: usage_metadata of the response
+            cached_tokens: Prompt tokens served from the provider's prefix cache
+        """
+        with self._lock:
+            stats = self._stats.setdefault(version, _VersionStats())
+            stats.llm_calls += 1
+            stats.input_tokens += (usage or {}).get("input_tokens", 0)
+            stats.output_tokens += (usage or {}).get("output_tokens", 0)
+            stats.cached_tokens += cached_tokens or 0
+
+    def record_question(self, version: str, seconds: float, first_token_seconds: float = None):
+        """
+        Record one answered question.
+
+        Args:
+            version: Prompt version
+            seconds: Total question latency
+            first_token_seconds: Time to the first streamed answer token
+        """
+        with self._lock:
+            stats = self._stats.setdefault(version, _VersionStats())
+            stats.questions += 1
+            stats.latencies.append(seconds)
+            if first_token_seconds is not None:
+                stats.first_tokens.append(first_token_seconds)
+
+    def report(self) -> dict:
+        """
+        Get the loaded versions, active split and per-version statistics.
+
+        Returns:
+            dict: 'versions', 'active' (version -> share), 'reloads' and
+                  'stats' with latency percentiles and tokens per question
+        """
+        self._maybe_reload()
+        with self._lock:
+            stats = {
+                version: {
+                    "questions": s.questions,
+                    "llm_calls": s.llm_calls,
+                    "input_tokens_per_question": s.input_tokens / max(s.questions, 1),
+                    "output_tokens_per_question": s.output_tokens / max(s.questions, 1),
+                    "cached_tokens": s.cached_tokens,
+                    "latency_seconds": _percentiles(sorted(s.latencies)),
+                    "first_token_seconds": _percentiles(sorted(s.first_tokens))
+                }
+                for version, s in self._stats.items()
+            }
+            return {
+                "versions": sorted(self._prompts),
+                "active": dict(self._split),
+                "reloads": self.reloads,
+                "stats": stats
+            }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> PromptRegistry:
+    """Get the process-wide prompt registry."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = PromptRegistry()
+        return _registry
@@ -0,0 +1,186 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List
+from langchain_core.messages import HumanMessage
+from src.llm_manager import get_scheduler, INTERACTIVE
+from src.single_flight import SingleFlight
+from src import tracing
+from config.settings import QUERY_EXPANSION, QUERY_EXPANSION_COUNT, QUERY_EXPANSION_CACHE_SIZE, RRF_K
+
+EXPANSION_PROMPT = """Write {count} different search queries for finding the parts of a YouTube video transcript
+that answer the question below. Cover different aspects, synonyms and likely wording in the video.
+Write one query per line, with no numbering or other text.
+
+Question: {question}"""
+
+_WORD = re.compile(r"[\w'-]+")
+_LIST_MARKER = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+
+# Words that carry no topic on their own
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being below between both but by
+can could did do does doing down during each explain few for from further had has have having he her here hers him
+his how i if in into is it its itself just me more most my no nor not now of off on once only or other our ours out
+over own please same she should so some such tell than that the their theirs them then there these they this those
+through to too under until up very video was we were what when where which while who whom why will with would you
+your yours mention mentioned say says said talk talks
+""".split())
+
+# Process-wide LLM sub-queries: (count, question) -> queries, least recently used first
+_question_cache = OrderedDict()
+_question_lock = threading.Lock()
+_question_loads = SingleFlight()
+
+
+def keywords(question: str) -> List[str]:
+    """Content words of a question, in order, without duplicates."""
+    words = []
+    for word in _WORD.findall(question.lower()):
+        word = word.strip("'-")
+        if len(word) > 1 and word not in STOPWORDS and word not in words:
+            words.append(word)
+    return words
+
+
+def keyword_queries(question: str, count: int = QUERY_EXPANSION_COUNT) -> List[str]:
+    """
+    Sub-queries built from the question's keywords, without an LLM.
+
+    The first is all keywords together; the others are overlapping groups
+    of keywords, so passages that mention only some of them still rank.
+
+    Args:
+        question: User question
+        count: Maximum number of sub-queries
+
+    Returns:
+        List[str]: Sub-queries (may be empty for questions without keywords)
+    """
+    words = keywords(question)
+    if not words:
+        return []
+    queries = [" ".join(words)]
+    size = max(1, (len(words) + 1) // 2)
+    for start in range(0, len(words)):
+        group = " ".join(words[start:start + size])
+        if group not in queries:
+            queries.append(group)
+        if len(queries) >= count or start + size >= len(words):
+            break
+    return queries[:count]
+
+
+def reciprocal_rank_fusion(rankings: List[List[Hashable]], k: int = RRF_K) -> List[Hashable]:
+    """
+    Fuse ranked result lists: each item scores sum(1 / (k + rank)) over the lists it is in.
+
+    Args:
+        rankings: One ranked list of item keys per query
+        k: Damping constant (larger values flatten the rank weights)
+
+    Returns:
+        List: Item keys, best first
+    """
+    scores: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class QueryExpander:
+    """
+    Expands a search query into several sub-queries before retrieval.
+
+    Modes:
+    - "keywords"  Keyword groups of the query (no LLM call)
+    - "llm"       One call to the rewrite model (MODEL_ROUTING["rewrite"]);
+                  falls back to keywords if the call fails or returns nothing.
+                  Given the user question, the call rewrites the question
+                  and its sub-queries are reused by every search for it,
+                  so a question costs one rewrite call however often the
+                  agent searches
+    - "off"       Only the query itself
+
+    The original query is always the first sub-query. Retrieval embeds all
+    of them in one batch, searches them in one FAISS call and fuses the
+    results (VectorStore.search_many).
+    """
+
+    def __init__(self, mode: str = QUERY_EXPANSION, llm=None, count: int = QUERY_EXPANSION_COUNT):
+        """
+        Initialize the expander.
+
+        Args:
+            mode: "off", "keywords" or "llm"
+            llm: Chat model for the "llm" mode (usually LLM.get("rewrite"))
+            count: Sub-queries added to the original query
+        """
+        if mode == "llm" and llm is None:
+            print("Warning: QUERY_EXPANSION=llm needs a rewrite model. Using keyword expansion.")
+            mode = "keywords"
+        self.mode = mode
+        self.llm = llm
+        self.count = count
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off" and self.count > 0
+
+    def expand(self, query: str, question: str = None) -> List[str]:
+        """
+        Get the sub-queries for a query.
+
+        Args:
+            query: Search query or user question
+            question: User question the search is for ("llm" mode rewrites it
+                      once and caches the result; None: rewrite the query)
+
+        Returns:
+            List[str]: The query followed by up to count distinct sub-queries
+        """
+        if not self.enabled:
+            return [query]
+        with tracing.span("query.expand", mode=self.mode) as span:
+            extra = self._question_queries(question or query) if self.mode == "llm" else []
+            if not extra:
+                extra = keyword_queries(query, self.count)
+            queries = [query]
+            seen = {query.strip().lower()}
+            for q in extra:
+                if q.strip().lower() not in seen:
+                    seen.add(q.strip().lower())
+                    queries.append(q.strip())
+            queries = queries[:self.count + 1]
+            span.set(queries=len(queries))
+            return queries
+
+    def _question_queries(self, question: str) -> List[str]:
+        """LLM sub-queries of a question, from the process-wide cache when possible."""
+        key = (self.count, question.strip())
+        with _question_lock:
+            if key in _question_cache:
+                _question_cache.move_to_end(key)
+                return _question_cache[key]
+
+        # Parallel searches for the same question share one rewrite call
+        queries = _question_loads.do(key, lambda: self._llm_queries(question))
+        if queries:
+            with _question_lock:
+                _question_cache[key] = queries
+                _question_cache.move_to_end(key)
+                while len(_question_cache) > QUERY_EXPANSION_CACHE_SIZE:
+                    _question_cache.popitem(last=False)
+        return queries
+
+    def _llm_queries(self, query: str) -> List[str]:
+        try:
+            response = get_scheduler().invoke(
+                self.llm, [HumanMessage(content=EXPANSION_PROMPT.format(count=self.count, question=query))], INTERACTIVE
+            )
+        except Exception as e:
+            print(f"Warning: Query expansion failed: {e}")
+            return []
+        lines = [_LIST_MARKER.sub("", line).strip().strip('"') for line in str(response.content).splitlines()]
+        return [line for line in lines if line][:self.count]
@@ -0,0 +1,319 @@
+"""
+HTTP API for YouTube Q&A.
+
+Wraps YouTubeQA sessions in an async FastAPI service:
+- POST /videos          Load (ingest) a video into a session
+- POST /ask             Ask a question (JSON, or Server-Sent Events with "stream": true)
+- GET  /sessions/{id}   Session status and ingestion progress
+- GET  /status          Queue depth, active requests, LLM scheduler, worker pool and shared index statistics
+
+Questions (and their Groq calls) run in worker threads; video ingestion runs
+on the ingestion pools of src/workers.py (yt-dlp on I/O threads, embedding in
+niced worker processes when EMBEDDING_PROCESSES is set), so a long video does
+not slow down answers. Requests wait in a bounded queue for a global slot and
+a per-tenant slot (tenant taken from the X-Tenant-ID header); when the queue
+is full they are rejected with 503 and a Retry-After header. Questions of one
+session are answered one at a time. On shutdown new requests are rejected and
+in-flight requests get SERVER_SHUTDOWN_TIMEOUT seconds to finish.
+
+Usage:
+    python -m src.server --host 0.0.0.0 --port 8000
+"""
+
+import json
+import weakref
+import asyncio
+import argparse
+from contextlib import asynccontextmanager
+from typing import Callable, Optional
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from src.session_manager import SessionManager
+from src.llm_manager import get_scheduler
+from src.prompt_registry import get_registry
+from src.workers import get_workers
+from config.settings import (
+    SERVER_MAX_CONCURRENCY, SERVER_TENANT_CONCURRENCY, SERVER_MAX_QUEUE,
+    SERVER_QUEUE_TIMEOUT, SERVER_SHUTDOWN_TIMEOUT, get_api_key
+)
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted."""
+
+
+class AdmissionController:
+    """
+    Bounded request queue with global and per-tenant concurrency limits.
+
+    A request first waits for a slot of its tenant, then for a global slot.
+    At most max_queue requests may be waiting at once; beyond that, and
+    after queue_timeout seconds of waiting in total, requests are rejected.
+    A tenant's semaphore is dropped once it has no active or waiting requests.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = SERVER_MAX_CONCURRENCY,
+        tenant_concurrency: int = SERVER_TENANT_CONCURRENCY,
+        max_queue: int = SERVER_MAX_QUEUE,
+        queue_timeout: float = SERVER_QUEUE_TIMEOUT
+    ):
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.tenant_concurrency = tenant_concurrency
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._tenants = {}  # tenant -> [semaphore, active and waiting requests]
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.waiting = 0
+        self.active = 0
+        self.rejected = 0
+        self.draining = False
+
+    async def acquire(self, tenant: str):
+        """Wait for a slot; raises Overloaded if the request cannot be admitted."""
+        if self.draining:
+            self.rejected += 1
+            raise Overloaded("Server is shutting down")
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded("Request queue is full")
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.queue_timeout
+        tenant_slot = self._join(tenant)
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(tenant_slot.acquire(), self.queue_timeout)
+            try:
+                # Both waits share one deadline
+                await asyncio.wait_for(self._global.acquire(), max(deadline - loop.time(), 0))
+            except BaseException:
+                tenant_slot.release()
+                raise
+        except BaseException as e:
+            self._leave(tenant)
+            if isinstance(e, asyncio.TimeoutError):
+                self.rejected += 1
+                raise Overloaded("Timed out waiting for a slot")
+            raise
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        self._idle.clear()
+
+    def release(self, tenant: str):
+        """Give back the slots taken by acquire()."""
+        self._global.release()
+        self._tenants[tenant][0].release()
+        self._leave(tenant)
+        self.active -= 1
+        if self.active == 0:
+            self._idle.set()
+
+    def _join(self, tenant: str) -> asyncio.Semaphore:
+        entry = self._tenants.get(tenant)
+        if entry is None:
+            entry = self._tenants[tenant] = [asyncio.Semaphore(self.tenant_concurrency), 0]
+        entry[1] += 1
+        return entry[0]
+
+    def _leave(self, tenant: str):
+        entry = self._tenants[tenant]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._tenants[tenant]
+
+    @asynccontextmanager
+    async def slot(self, tenant: str):
+        await self.acquire(tenant)
+        try:
+            yield
+        finally:
+            self.release(tenant)
+
+    async def drain(self, timeout: float = SERVER_SHUTDOWN_TIMEOUT) -> bool:
+        """Stop admitting requests and wait for in-flight ones. Returns False on timeout."""
+        self.draining = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "tenants": len(self._tenants),
+            "draining": self.draining
+        }
+
+
+class LoadVideoRequest(BaseModel):
+    session_id: str
+    url: str
+    language: Optional[str] = None  # Caption language (default: TRANSCRIPT_LANGUAGES order)
+
+
+class AskRequest(BaseModel):
+    session_id: str
+    question: str
+    stream: bool = False
+    thread_id: Optional[str] = None
+
+
+def create_app(
+    sessions: SessionManager = None,
+    llm_factory: Callable = None,
+    admission: AdmissionController = None
+) -> FastAPI:
+    """
+    Create the FastAPI application.
+
+    Args:
+        sessions: Session manager (a new one is created if omitted)
+        llm_factory: Optional callable returning an LLM manager for new
+                     sessions; use it to run against a fake LLM locally.
+                     Defaults to Groq with GROQ_API_KEY.
+        admission: Admission controller (created from settings if omitted)
+
+    Returns:
+        FastAPI: The application
+    """
+    sessions = sessions or SessionManager()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Created inside the running loop
+        app.state.admission = admission or AdmissionController()
+        yield
+        await app.state.admission.drain()
+        await run_in_threadpool(sessions.close_all)
+
+    app = FastAPI(title="YouTube Q&A", lifespan=lifespan)
+    # One question at a time per session; a lock lives while a request holds it
+    question_locks = weakref.WeakValueDictionary()
+
+    # Session calls may delete SQLite checkpoints (expiry, close), so they run off the event loop
+    async def get_session(session_id: str):
+        return await run_in_threadpool(
+            sessions.get, session_id, api_key=get_api_key() or None, llm_factory=llm_factory
+        )
+
+    def question_lock(session_id: str) -> asyncio.Lock:
+        lock = question_locks.get(session_id)
+        if lock is None:
+            lock = question_locks[session_id] = asyncio.Lock()
+        return lock
+
+    async def admit(tenant: str):
+        try:
+            await app.state.admission.acquire(tenant)
+        except Overloaded as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+    @app.post("/videos")
+    async def load_video(request: LoadVideoRequest, x_tenant_id: str = Header("default")):
+        await admit(x_tenant_id)
+        try:
+            qa = await get_session(request.session_id)
+            if not await qa.aload_video(request.url, language=request.language):
+                raise HTTPException(status_code=422, detail="Failed to load video")
+            return session_status(qa, request.session_id)
+        finally:
+            app.state.admission.release(x_tenant_id)
+
+    @app.post("/ask")
+    async def ask(request: AskRequest, x_tenant_id: str = Header("default")):
+        # Looked up and marked active in one step; never creates a session
+        qa = await run_in_threadpool(sessions.touch, request.session_id)
+        if qa is None or not qa.ready:
+            raise HTTPException(status_code=409, detail="No video loaded for this session")
+        lock = question_lock(request.session_id)
+
+        await admit(x_tenant_id)
+        if not request.stream:
+            try:
+                async with lock:
+                    answer = await asyncio.to_thread(qa.ask, request.question, request.thread_id)
+                return {"answer": answer}
+            finally:
+                app.state.admission.release(x_tenant_id)
+
+        async def events():
+            # The slot and the session's lock are held until the stream finishes or the client disconnects
+            try:
+                async with lock:
+                    answer = ""
+                    async for partial in iterate_in_threadpool(qa.ask_stream(request.question, request.thread_id)):
+                        # ask_stream yields the answer so far; send only what is new
+                        delta = partial[len(answer):] if partial.startswith(answer) else partial
+                        answer = partial
+                        yield f"data: {json.dumps({'delta': delta})}\n\n"
+                    yield f"event: done\ndata: {json.dumps({'answer': answer})}\n\n"
+            except Exception as e:
+                yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+            finally:
+                app.state.admission.release(x_tenant_id)
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/sessions/{session_id}")
+    async def get_status(session_id: str):
+        qa = sessions.peek(session_id)
+        if qa is None:
+            raise HTTPException(status_code=404, detail="Unknown session")
+        return session_status(qa, session_id)
+
+    @app.delete("/sessions/{session_id}")
+    async def close_session(session_id: str):
+        await run_in_threadpool(sessions.close, session_id)
+        return {"closed": session_id}
+
+    @app.get("/status")
+    async def status():
+        return {
+            "admission": app.state.admission.stats(),
+            "llm_scheduler": get_scheduler().metrics(),
+            "prompts": get_registry().report(),
+            "workers": get_workers().metrics(),
+            **sessions.report()
+        }
+
+    return app
+
+
+def session_status(qa, session_id: str) -> dict:
+    return {
+        "session_id": session_id,
+        "ready": qa.ready,
+        "video_id": qa.video_id,
+        "language": qa.language,
+        "ingestion": qa.ingestion_progress(),
+        "summary": qa.summary_status()
+    }
+
+
+def main():
+    """Run the server with uvicorn."""
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="YouTube Q&A HTTP server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_app(), host=args.host, port=args.port,
+        timeout_graceful_shutdown=SERVER_SHUTDOWN_TIMEOUT
+    )
+
+
+if __name__ == "__main__":
+    main()
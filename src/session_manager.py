@@ -0,0 +1,328 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict
+from src.vector_store import VectorStore
+from src.app import YouTubeQA
+from src.single_flight import video_loads
+from src.workers import get_workers
+from config.settings import INDEX_MEMORY_BUDGET_MB, SESSION_IDLE_TIMEOUT
+
+
+class _IndexEntry:
+    def __init__(self, store: VectorStore):
+        self.store = store
+        self.refs = 0
+        self.last_used = time.time()
+
+
+class IndexManager:
+    """
+    Process-wide cache of video indexes shared between sessions.
+
+    Indexes are keyed by video ID and reference counted. When the total
+    estimated size goes over the memory budget, idle indexes (no references)
+    are evicted, least recently used first. Indexes still in use are never
+    evicted, so the budget can be exceeded while they are all held.
+
+    Concurrent misses on the same video build it once (through the
+    process-wide video_loads single-flight): later callers wait for the
+    first builder and share its index (or its error).
+    """
+
+    def __init__(self, memory_budget_mb: int = INDEX_MEMORY_BUDGET_MB):
+        """
+        Initialize an empty index manager.
+
+        Args:
+            memory_budget_mb: Target upper bound for all indexes combined
+        """
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self._entries = OrderedDict()  # video_id -> _IndexEntry, least recently used first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def acquire(self, video_id: str, builder: Callable[[], VectorStore]) -> VectorStore:
+        """
+        Get the index for a video, building it if it is not cached.
+
+        Every acquire must be paired with a release() once the caller is done.
+
+        Args:
+            video_id: YouTube video ID
+            builder: Called without arguments to build the index on a miss
+
+        Returns:
+            VectorStore: The shared index
+        """
+        store = self._cached(video_id)
+        if store is None:
+            # Build outside the lock so other videos are not blocked
+            store = self._add(video_id, video_loads.do(video_id, lambda: self._build(video_id, builder)))
+        return store
+
+    async def acquire_async(self, video_id: str, builder: Callable[[], VectorStore]) -> VectorStore:
+        """
+        Async version of acquire(); a build runs on the ingestion I/O pool.
+
+        Args:
+            video_id: YouTube video ID
+            builder: Blocking callable that builds the index on a miss
+
+        Returns:
+            VectorStore: The shared index
+        """
+        store = self._cached(video_id)
+        if store is None:
+            store = self._add(
+                video_id,
+                await video_loads.do_async(video_id, lambda: self._build(video_id, builder), get_workers().io)
+            )
+        return store
+
+    def release(self, video_id: str):
+        """
+        Drop one reference to a video's index.
+
+        Args:
+            video_id: YouTube video ID passed to acquire()
+        """
+        with self._lock:
+            entry = self._entries.get(video_id)
+            if entry is None:
+                return
+            entry.refs = max(entry.refs - 1, 0)
+            entry.last_used = time.time()
+            self._evict()
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Get the estimated memory use of each cached index.
+
+        Returns:
+            dict: Bytes per video ID
+        """
+        with self._lock:
+            entries = list(self._entries.items())
+        return {video_id: entry.store.memory_usage() for video_id, entry in entries}
+
+    def report(self) -> dict:
+        """
+        Get cache statistics and per-index details.
+
+        Returns:
+            dict: Totals, hit/miss/eviction counters and one row per index
+        """
+        with self._lock:
+            entries = list(self._entries.items())
+            counters = {
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "shared_loads": video_loads.shared  # Misses that joined a load already in progress
+            }
+        indexes = [
+            {
+                "video_id": video_id,
+                "refs": entry.refs,
+                "bytes": entry.store.memory_usage(),
+                "chunks": entry.store.indexed,
+                "last_used": entry.last_used
+            }
+            for video_id, entry in entries
+        ]
+        return {
+            "total_bytes": sum(i["bytes"] for i in indexes),
+            "budget_bytes": self.memory_budget,
+            **counters,
+            "indexes": indexes
+        }
+
+    def _cached(self, video_id: str):
+        """Check out a cached index, or count a miss and return None."""
+        with self._lock:
+            entry = self._entries.get(video_id)
+            if entry is not None:
+                self.hits += 1
+                return self._checkout(video_id, entry)
+            self.misses += 1
+            return None
+
+    def _build(self, video_id: str, builder: Callable[[], VectorStore]) -> VectorStore:
+        """
+        Build an index inside the single-flight call, caching it before the call ends.
+
+        A caller that missed the cache just as another build finished starts a
+        new flight; it finds that build's index here instead of building again.
+        """
+        with self._lock:
+            entry = self._entries.get(video_id)
+            if entry is not None:
+                return entry.store
+        store = builder()
+        with self._lock:
+            self._entries.setdefault(video_id, _IndexEntry(store))
+        return store
+
+    def _add(self, video_id: str, store: VectorStore) -> VectorStore:
+        """Check out a built index, caching it again if it was evicted since."""
+        with self._lock:
+            # Re-checked under the lock: callers that shared one build, or built
+            # after a miss, all check out the one cached entry
+            entry = self._entries.get(video_id)
+            if entry is None:
+                entry = _IndexEntry(store)
+                self._entries[video_id] = entry
+            store = self._checkout(video_id, entry)
+            self._evict()
+            return store
+
+    def _checkout(self, video_id: str, entry: _IndexEntry) -> VectorStore:
+        entry.refs += 1
+        entry.last_used = time.time()
+        self._entries.move_to_end(video_id)
+        return entry.store
+
+    def _evict(self):
+        """Evict idle indexes, least recently used first, until within budget. Caller holds the lock."""
+        total = sum(entry.store.memory_usage() for entry in self._entries.values())
+        for video_id in list(self._entries):
+            if total <= self.memory_budget:
+                break
+            entry = self._entries[video_id]
+            if entry.refs > 0:
+                continue
+            total -= entry.store.memory_usage()
+            del self._entries[video_id]
+            self.evictions += 1
+
+
+class SessionManager:
+    """
+    Tracks per-session YouTubeQA instances that share indexes.
+
+    Each session keeps its own LLM client and agent (cheap), while embedding
+    models and video indexes are shared through one IndexManager.
+    """
+
+    def __init__(self, index_manager: IndexManager = None, idle_timeout: float = SESSION_IDLE_TIMEOUT):
+        """
+        Initialize the session manager.
+
+        Args:
+            index_manager: Shared index cache (a new one is created if omitted)
+            idle_timeout: Seconds of inactivity before a session is closed
+        """
+        self.index_manager = index_manager or IndexManager()
+        self.idle_timeout = idle_timeout
+        self._sessions = {}  # session_id -> (YouTubeQA, last_seen)
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        session_id: str,
+        api_key: str = None,
+        temperature: float = None,
+        llm=None,
+        llm_factory: Callable = None
+    ):
+        """
+        Get a session's YouTubeQA, creating it on first use.
+
+        Args:
+            session_id: Unique session identifier
+            api_key: Groq API key for a new session
+            temperature: LLM temperature for a new session
+            llm: Optional LLM manager for a new session (overrides api_key)
+            llm_factory: Optional callable returning the LLM manager, called only
+                         when the session is created
+
+        Returns:
+            YouTubeQA: The session's Q&A instance
+        """
+        self.expire_idle()
+        with self._lock:
+            if session_id in self._sessions:
+                qa, _ = self._sessions[session_id]
+            else:
+                if llm is None and llm_factory is not None:
+                    llm = llm_factory()
+                qa = YouTubeQA(api_key, temperature, index_manager=self.index_manager, llm=llm)
+            self._sessions[session_id] = (qa, time.time())
+            return qa
+
+    def touch(self, session_id: str):
+        """
+        Mark an existing session active, without creating it.
+
+        The lookup and the touch happen under one lock, so a session that
+        expires meanwhile is not silently replaced by a new, empty one.
+
+        Args:
+            session_id: Unique session identifier
+
+        Returns:
+            YouTubeQA or None: The session's Q&A instance, or None if it does not
+            exist or has been idle longer than the idle timeout
+        """
+        self.expire_idle()
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or entry[1] < now - self.idle_timeout:
+                return None
+            self._sessions[session_id] = (entry[0], now)
+            return entry[0]
+
+    def peek(self, session_id: str):
+        """
+        Get a session's YouTubeQA without creating it or marking it active.
+
+        Args:
+            session_id: Unique session identifier
+
+        Returns:
+            YouTubeQA or None: The session's Q&A instance, if it exists
+        """
+        with self._lock:
+            entry = self._sessions.get(session_id)
+        return entry[0] if entry else None
+
+    def close(self, session_id: str, forget: bool = True):
+        """
+        Close a session and release its index.
+
+        Args:
+            session_id: Unique session identifier
+            forget: Delete the checkpoints of the session's conversation threads
+        """
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+        if entry:
+            entry[0].close(forget)
+
+    def expire_idle(self):
+        """Close sessions that have been inactive longer than the idle timeout."""
+        cutoff = time.time() - self.idle_timeout
+        with self._lock:
+            expired = [sid for sid, (_, seen) in self._sessions.items() if seen < cutoff]
+        for session_id in expired:
+            self.close(session_id)
+
+    def close_all(self):
+        """Close every session (used on shutdown; conversations are kept until they expire)."""
+        with self._lock:
+            session_ids = list(self._sessions)
+        for session_id in session_ids:
+            self.close(session_id, forget=False)
+
+    def report(self) -> dict:
+        """
+        Get session counts and shared index statistics.
+
+        Returns:
+            dict: Active session count plus the IndexManager report
+        """
+        with self._lock:
+            sessions = len(self._sessions)
+        return {"sessions": sessions, **self.index_manager.report()}
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import Executor, Future
+from typing import Callable, Hashable
+
+
+class SingleFlight:
+    """
+    De-duplicates concurrent calls that share a key.
+
+    The first caller for a key runs the function; callers arriving while it
+    runs wait for it and get the same result (or the same exception). Once
+    the call finishes the key is free again, so results are not cached here.
+
+    Thread callers use do(), asyncio callers use do_async(); both join the
+    same in-flight call.
+    """
+
+    def __init__(self):
+        """Initialize with no calls in flight."""
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> Future of the call in flight
+        self.calls = 0    # Calls started (one per flight)
+        self.shared = 0   # Callers that joined a call already in flight
+
+    def do(self, key: Hashable, fn: Callable):
+        """
+        Run fn for key, or wait for the call already running for key.
+
+        Args:
+            key: Identifies calls that can share a result
+            fn: Called without arguments
+
+        Returns:
+            The result of fn (raises its exception)
+        """
+        future, owner = self._join(key)
+        if not owner:
+            return future.result()
+        self._run(key, future, fn)
+        return future.result()
+
+    async def do_async(self, key: Hashable, fn: Callable, executor: Executor = None):
+        """
+        Async version of do(); fn runs on an executor so the event loop is not blocked.
+
+        Args:
+            key: Identifies calls that can share a result
+            fn: Blocking callable, called without arguments
+            executor: Where fn runs (default: the event loop's default executor)
+
+        Returns:
+            The result of fn (raises its exception)
+        """
+        future, owner = self._join(key)
+        if owner:
+            context = contextvars.copy_context()
+            loop = asyncio.get_running_loop()
+            loop.run_in_executor(executor, context.run, self._run, key, future, fn)
+        return await asyncio.wrap_future(future)
+
+    def in_flight(self) -> int:
+        """Number of keys with a call running."""
+        with self._lock:
+            return len(self._calls)
+
+    def _join(self, key: Hashable):
+        """(future for key, whether the caller must run it)."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.shared += 1
+                return future, False
+            future = self._calls[key] = Future()
+            self.calls += 1
+            return future, True
+
+    def _run(self, key: Hashable, future: Future, fn: Callable):
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+# Process-wide coordinator for video ingestion, keyed by video ID
+video_loads = SingleFlight()
@@ -0,0 +1,352 @@
+"""
+Portable snapshots of video indexes, for warm-starting app replicas.
+
+A snapshot is a directory holding everything a VectorStore needs, so a node
+can serve a video without fetching captions or embedding anything:
+
+    <SNAPSHOT_DIR>/<video key>/
+        manifest.json   Format version, embedding model and dimension, chunking
+                        parameters, index type/precision, video metadata, and
+                        the size and SHA-256 of every file below
+        index.faiss     FAISS index (faiss.write_index)
+        docstore/       Chunk text and metadata columns (CompactDocstore.save)
+
+Snapshots are written to a temporary directory and renamed into place, so
+readers of a shared directory never see a partial one. Loading checks the
+manifest (format, embedding model, file sizes) and memory-maps the index and
+docstore, so startup does not wait on reading every byte; verify() reads
+everything and checks the checksums.
+
+Usage:
+    python -m src.snapshot export https://youtu.be/VIDEO_ID --language en --dir /shared/snapshots
+    python -m src.snapshot import /shared/snapshots/VIDEO_ID_en
+    python -m src.snapshot verify /shared/snapshots
+    python -m src.snapshot list /shared/snapshots
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+from pathlib import Path
+from typing import List, Optional
+from config.settings import (
+    SNAPSHOT_DIR, EMBEDDING_MODEL_NAME, EMBEDDING_PROVIDER, CHUNK_SIZE, CHUNK_OVERLAP
+)
+from src import tracing
+
+SNAPSHOT_FORMAT = 1
+MANIFEST = "manifest.json"
+INDEX_FILE = "index.faiss"
+DOCSTORE_DIR = "docstore"
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot is missing, corrupt or incompatible with this node."""
+
+
+def snapshot_name(video_key: str) -> str:
+    """Directory name of a video key ("VIDEO_ID:en" -> "VIDEO_ID_en")."""
+    return re.sub(r"[^\w.-]", "_", video_key)
+
+
+def find_snapshot(video_key: str, directory: str = SNAPSHOT_DIR) -> Optional[Path]:
+    """Snapshot directory for a video key, if one exists."""
+    if not directory:
+        return None
+    path = Path(directory) / snapshot_name(video_key)
+    return path if (path / MANIFEST).exists() else None
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _files(path: Path) -> List[Path]:
+    return sorted(p for p in path.rglob("*") if p.is_file() and p.name != MANIFEST)
+
+
+def export_snapshot(
+    store,
+    video_key: str,
+    directory: str = SNAPSHOT_DIR,
+    chunk_size: int = CHUNK_SIZE,
+    chunk_overlap: int = CHUNK_OVERLAP
+) -> Path:
+    """
+    Write a fully indexed VectorStore as a snapshot.
+
+    Args:
+        store: VectorStore (waits for background ingestion to finish)
+        video_key: Video ID and caption language ("VIDEO_ID:en")
+        directory: Snapshot directory (replaced atomically if it exists)
+        chunk_size: Chunk size the transcript was split with
+        chunk_overlap: Chunk overlap the transcript was split with
+
+    Returns:
+        Path: The snapshot directory
+    """
+    import faiss
+    from src.docstore import CompactDocstore
+
+    if not directory:
+        raise SnapshotError("No snapshot directory (set SNAPSHOT_DIR or pass --dir)")
+    if store._thread is not None:
+        store._thread.join()
+    if store.store is None or store.error:
+        raise SnapshotError(f"Index is not built: {store.error or 'empty'}")
+
+    target = Path(directory) / snapshot_name(video_key)
+    staging = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    with tracing.span("snapshot.export", video=video_key) as span, store._lock:
+        index = store.store.index
+        faiss.write_index(index, str(staging / INDEX_FILE))
+        docstore = store.store.docstore
+        if not isinstance(docstore, CompactDocstore):
+            # InMemoryDocstore: copy the chunks in index order into the portable format
+            compact = CompactDocstore()
+            ids = store.store.index_to_docstore_id
+            compact.add({str(i): docstore.search(ids[i]) for i in range(index.ntotal)})
+            docstore = compact
+        docstore.save(staging / DOCSTORE_DIR)
+
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "created": time.time(),
+            "video_key": video_key,
+            "language": store.language,
+            "embedding": {"provider": EMBEDDING_PROVIDER, "model": EMBEDDING_MODEL_NAME, "dimension": index.d},
+            "chunking": {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap},
+            "index": {"type": store.index_type, "precision": store.precision, "rescore": store.rescore},
+            "chunks": index.ntotal,
+            "metadata": store.metadata.to_info() if store.metadata is not None else None,
+            "files": {
+                str(p.relative_to(staging)): {"bytes": p.stat().st_size, "sha256": _sha256(p)}
+                for p in _files(staging)
+            }
+        }
+        (staging / MANIFEST).write_text(json.dumps(manifest, indent=2))
+        span.set(chunks=index.ntotal, bytes=sum(f["bytes"] for f in manifest["files"].values()))
+
+    # Swap into place; a reader sees the old snapshot or the new one, never a partial one
+    if target.exists():
+        old = target.with_name(f".{target.name}.{os.getpid()}.old")
+        target.rename(old)
+        staging.rename(target)
+        shutil.rmtree(old, ignore_errors=True)
+    else:
+        staging.rename(target)
+    return target
+
+
+def read_manifest(path: str) -> dict:
+    """Load and check a snapshot's manifest against this node's embedding model and chunking."""
+    path = Path(path)
+    try:
+        manifest = json.loads((path / MANIFEST).read_text())
+    except (OSError, ValueError) as e:
+        raise SnapshotError(f"Unreadable snapshot manifest in {path}: {e}")
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise SnapshotError(f"Snapshot format {manifest.get('format')} is not supported (expected {SNAPSHOT_FORMAT})")
+    embedding = manifest["embedding"]
+    if (embedding["provider"], embedding["model"]) != (EMBEDDING_PROVIDER, EMBEDDING_MODEL_NAME):
+        # Vectors from another model are not comparable with this node's query embeddings
+        raise SnapshotError(
+            f"Snapshot embeddings are {embedding['provider']}/{embedding['model']}, "
+            f"this node uses {EMBEDDING_PROVIDER}/{EMBEDDING_MODEL_NAME}"
+        )
+    chunking = manifest["chunking"]
+    if (chunking["chunk_size"], chunking["chunk_overlap"]) != (CHUNK_SIZE, CHUNK_OVERLAP):
+        print(f"Warning: Snapshot {path.name} was chunked with size {chunking['chunk_size']} / "
+              f"overlap {chunking['chunk_overlap']} (this node: {CHUNK_SIZE} / {CHUNK_OVERLAP})")
+    return manifest
+
+
+def import_snapshot(path: str, mmap_mode: bool = True):
+    """
+    Load a snapshot as a ready VectorStore.
+
+    Args:
+        path: Snapshot directory
+        mmap_mode: Memory-map the index and docstore instead of reading them
+
+    Returns:
+        VectorStore: Fully indexed store (with its VideoMetadata, if any)
+
+    Raises:
+        SnapshotError: If the snapshot is incomplete or incompatible
+    """
+    import faiss
+    from langchain_community.vectorstores import FAISS
+    from src.docstore import CompactDocstore, PositionalIds
+    from src.vector_store import VectorStore
+    from src.video_metadata import VideoMetadata
+
+    path = Path(path)
+    with tracing.span("snapshot.import", path=str(path)) as span:
+        manifest = read_manifest(path)
+        # Cheap completeness check; checksums are verified by verify()
+        for name, entry in manifest["files"].items():
+            file = path / name
+            if not file.exists() or file.stat().st_size != entry["bytes"]:
+                raise SnapshotError(f"Snapshot file {name} is missing or truncated")
+
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap_mode else 0
+        try:
+            index = faiss.read_index(str(path / INDEX_FILE), flags)
+        except RuntimeError:
+            # Index types without mmap support are read into memory
+            index = faiss.read_index(str(path / INDEX_FILE))
+        docstore = CompactDocstore.load(path / DOCSTORE_DIR, mmap_mode)
+        if index.ntotal != manifest["chunks"] or len(docstore) != manifest["chunks"]:
+            raise SnapshotError(f"Snapshot has {index.ntotal} vectors and {len(docstore)} chunks, "
+                                f"manifest says {manifest['chunks']}")
+
+        settings = manifest["index"]
+        store = VectorStore(settings["type"], "compact", settings["precision"], settings["rescore"])
+        ids = PositionalIds()
+        ids.update({i: str(i) for i in range(index.ntotal)})
+        store.store = FAISS(
+            embedding_function=store.embeddings, index=index, docstore=docstore, index_to_docstore_id=ids
+        )
+        store.language = manifest.get("language")
+        if manifest.get("metadata"):
+            store.metadata = VideoMetadata(manifest["metadata"])
+        store.indexed = store.total = index.ntotal
+        store._first_window.set()
+        span.set(chunks=index.ntotal)
+    return store
+
+
+def verify_snapshot(path: str) -> List[str]:
+    """
+    Check a snapshot's manifest and every file's size and checksum.
+
+    Args:
+        path: Snapshot directory
+
+    Returns:
+        List[str]: Problems found (empty if the snapshot is intact)
+    """
+    path = Path(path)
+    try:
+        manifest = read_manifest(path)
+    except (SnapshotError, KeyError) as e:
+        return [str(e)]
+    problems = []
+    for name, entry in manifest["files"].items():
+        file = path / name
+        if not file.exists():
+            problems.append(f"{name}: missing")
+        elif file.stat().st_size != entry["bytes"]:
+            problems.append(f"{name}: {file.stat().st_size} bytes, expected {entry['bytes']}")
+        elif _sha256(file) != entry["sha256"]:
+            problems.append(f"{name}: checksum mismatch")
+    extra = {str(p.relative_to(path)) for p in _files(path)} - set(manifest["files"])
+    problems += [f"{name}: not in manifest" for name in sorted(extra)]
+    return problems
+
+
+def _snapshot_dirs(path: Path) -> List[Path]:
+    """The snapshot at path, or every snapshot directly inside it."""
+    if (path / MANIFEST).exists():
+        return [path]
+    return sorted(p for p in path.iterdir() if (p / MANIFEST).exists()) if path.is_dir() else []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export, import and verify video index snapshots")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Build a video's index and write it as a snapshot")
+    export.add_argument("url", help="YouTube video URL")
+    export.add_argument("--language", help="Caption language (default: TRANSCRIPT_LANGUAGES order)")
+    export.add_argument("--dir", default=SNAPSHOT_DIR, help="Snapshot directory (default: SNAPSHOT_DIR)")
+
+    load = commands.add_parser("import", help="Load a snapshot and report its size and load time")
+    load.add_argument("path", help="Snapshot directory")
+    load.add_argument("--query", help="Run a search against the loaded index")
+    load.add_argument("--no-mmap", action="store_true", help="Read files into memory instead of mapping them")
+
+    verify = commands.add_parser("verify", help="Check manifests and checksums")
+    verify.add_argument("path", help="Snapshot, or directory of snapshots")
+
+    listing = commands.add_parser("list", help="List the snapshots in a directory")
+    listing.add_argument("path", nargs="?", default=SNAPSHOT_DIR)
+
+    args = parser.parse_args()
+
+    if args.command == "export":
+        from src.youtube_loader import YouTubeLoader
+        from src.vector_store import VectorStore
+
+        loader = YouTubeLoader()
+        language = loader.resolve_language(args.url, args.language)
+        try:
+            key = f"{loader._extract_id(args.url)}:{language}"
+        except ValueError:
+            key = f"{args.url}:{language}"
+        transcript = loader.fetch_transcript(args.url, language)
+        metadata = loader.video_metadata(args.url, transcript)
+        docs = loader.split_transcript(transcript, args.url, metadata.chapters)
+        store = VectorStore()
+        store.language = language
+        store.metadata = metadata
+        store.create(docs)
+        path = export_snapshot(store, key, args.dir)
+        print(f"✅ Exported {len(docs)} chunks to {path}")
+
+    elif args.command == "import":
+        import src.vector_store  # noqa: F401  (module import time is not load time)
+        started = time.perf_counter()
+        store = import_snapshot(args.path, not args.no_mmap)
+        seconds = time.perf_counter() - started
+        print(f"✅ Loaded {store.total} chunks ({store.language}) in {seconds * 1000:.1f} ms; "
+              f"{store.memory_usage() / 2**20:.1f} MB in memory at most")
+        if args.query:
+            for doc in store.search(args.query):
+                start = doc.metadata.get("start")
+                prefix = f"[{start:.0f}s] " if start is not None else ""
+                print(f"{prefix}{doc.page_content[:100]!r}")
+
+    elif args.command == "verify":
+        paths = _snapshot_dirs(Path(args.path))
+        if not paths:
+            print(f"No snapshots in {args.path}")
+            sys.exit(1)
+        failed = 0
+        for path in paths:
+            problems = verify_snapshot(path)
+            failed += bool(problems)
+            print(f"{'✅' if not problems else '❌'} {path.name}")
+            for problem in problems:
+                print(f"   {problem}")
+        sys.exit(1 if failed else 0)
+
+    elif args.command == "list":
+        if not args.path:
+            parser.error("No snapshot directory (set SNAPSHOT_DIR or pass a path)")
+        for path in _snapshot_dirs(Path(args.path)):
+            try:
+                manifest = json.loads((path / MANIFEST).read_text())
+                size = sum(f["bytes"] for f in manifest["files"].values())
+                print(f"{path.name:<24} {manifest['chunks']:>6} chunks {size / 2**20:>8.1f} MB  "
+                      f"{manifest['index']['type']}/{manifest['index']['precision']}  "
+                      f"{manifest['embedding']['provider']}/{manifest['embedding']['model']}")
+            except (OSError, ValueError, KeyError) as e:
+                print(f"{path.name:<24} unreadable manifest: {e}")
+
+
+if __name__ == "__main__":
+    main()
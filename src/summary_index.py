@@ -0,0 +1,167 @@
+import re
+import threading
+from typing import List
+from langchain_core.messages import HumanMessage
+from src.llm_manager import get_scheduler, BACKGROUND
+from src import tracing
+from config.settings import SUMMARY_WINDOW_SECONDS, SUMMARY_MAX_CONCURRENCY, SUMMARY_REDUCE_FANIN
+
+SECTION_PROMPT = """Summarize this section of a YouTube video transcript ({start} - {end}).
+Write 2-4 sentences covering the main points. Use only information from the transcript.
+
+Transcript:
+{text}"""
+
+REDUCE_PROMPT = """Below are summaries of consecutive sections of a YouTube video.
+Combine them into a single summary of 4-8 sentences covering the main topics in order.
+Use only information from the summaries.
+
+Section summaries:
+{text}"""
+
+ANSWER_PROMPT = """Answer the question about a YouTube video using ONLY the precomputed summaries below.
+Mention section times when relevant.
+
+{summaries}
+
+Question: {question}"""
+
+# Questions about the video as a whole are answered from the summaries instead of retrieval
+GLOBAL_QUESTION_PATTERN = re.compile(
+    r"\b(summar(y|ies|ize|ise|izing|ising)|overview|tl;?dr|gist|recap|outline|"
+    r"main (points?|ideas?|topics?|themes?|takeaways?)|key (points?|ideas?|takeaways?)|"
+    r"what(?:'s| is) (?:this|the) video about|what does (?:this|the) video (?:cover|talk about))\b",
+    re.IGNORECASE
+)
+
+
+def is_global_question(question: str) -> bool:
+    """Return True if the question is about the video as a whole."""
+    return bool(GLOBAL_QUESTION_PATTERN.search(question))
+
+
+def _format_time(seconds: float) -> str:
+    return f"{int(seconds // 60):02d}:{int(seconds % 60):02d}"
+
+
+class SummaryIndex:
+    """
+    Hierarchical summaries of a video transcript.
+
+    Built with a map-reduce pass at ingestion time: each time window of the
+    transcript gets a section summary (map), and section summaries are
+    combined into a video-level summary (reduce). Whole-video questions can
+    then be answered from the summaries in a single LLM call.
+    """
+
+    def __init__(self, transcript: List[dict], window_seconds: int = SUMMARY_WINDOW_SECONDS):
+        """
+        Initialize an empty summary index for a transcript.
+
+        Args:
+            transcript: Parsed transcript (dicts with 'start' and 'text' keys)
+            window_seconds: Length of each summarized section in seconds
+        """
+        self.transcript = transcript  # Released once the summaries are built
+        self.window_seconds = window_seconds
+        self.sections = []  # List of {"start", "end", "summary"} dicts in time order
+        self.video_summary = None
+        self.ready = False
+        self.error = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def building(self) -> bool:
+        """True while a background build is running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def build(self, llm):
+        """
+        Build section and video summaries.
+
+        Args:
+            llm: Chat model used for summarization
+        """
+        # Summaries queue behind interactive questions for the shared rate limits
+        scheduler = get_scheduler()
+        try:
+            with tracing.span("summary.build") as span:
+                windows = self._windows(self.transcript)
+                prompts = [
+                    [HumanMessage(content=SECTION_PROMPT.format(
+                        start=_format_time(w["start"]), end=_format_time(w["end"]), text=w["text"]
+                    ))]
+                    for w in windows
+                ]
+
+                # Map: summarize every window
+                responses = scheduler.batch(llm, prompts, BACKGROUND, SUMMARY_MAX_CONCURRENCY)
+                sections = [
+                    {"start": w["start"], "end": w["end"], "summary": r.content.strip()}
+                    for w, r in zip(windows, responses)
+                ]
+
+                # Reduce: combine section summaries until a single summary remains
+                summaries = [s["summary"] for s in sections]
+                while len(summaries) > 1:
+                    groups = [
+                        summaries[i:i + SUMMARY_REDUCE_FANIN]
+                        for i in range(0, len(summaries), SUMMARY_REDUCE_FANIN)
+                    ]
+                    responses = scheduler.batch(
+                        llm,
+                        [[HumanMessage(content=REDUCE_PROMPT.format(text="\n\n".join(g)))] for g in groups],
+                        BACKGROUND,
+                        SUMMARY_MAX_CONCURRENCY
+                    )
+                    summaries = [r.content.strip() for r in responses]
+
+                span.set(sections=len(sections))
+                self.sections = sections
+                self.video_summary = summaries[0] if summaries else ""
+                self.transcript = None
+                self.ready = True
+        except Exception as e:
+            self.error = str(e)
+            print(f"Error building summaries: {e}")
+
+    def build_async(self, llm):
+        """
+        Build the summaries on a background thread.
+
+        Args:
+            llm: Chat model used for summarization
+        """
+        # Indexes may be shared between sessions; only one of them builds
+        with self._lock:
+            if self.ready or self.building:
+                return
+            self.error = None
+            self._thread = threading.Thread(target=self.build, args=(llm,), daemon=True)
+            self._thread.start()
+
+    def render(self) -> str:
+        """Format the summaries as plain text for the LLM."""
+        lines = [f"VIDEO SUMMARY:\n{self.video_summary}", "", "SECTION SUMMARIES:"]
+        for s in self.sections:
+            lines.append(f"[{_format_time(s['start'])} - {_format_time(s['end'])}] {s['summary']}")
+        return "\n".join(lines)
+
+    def answer_prompt(self, question: str) -> str:
+        """Build the single-call prompt for answering a question from the summaries."""
+        return ANSWER_PROMPT.format(summaries=self.render(), question=question)
+
+    def _windows(self, transcript: List[dict]) -> List[dict]:
+        """Group transcript segments into consecutive time windows."""
+        windows = []
+        for seg in transcript:
+            index = int(seg["start"] // self.window_seconds)
+            if not windows or windows[-1]["index"] != index:
+                windows.append({"index": index, "start": seg["start"], "end": seg["start"], "parts": []})
+            windows[-1]["end"] = seg["start"]
+            windows[-1]["parts"].append(seg["text"])
+        return [
+            {"start": w["start"], "end": w["end"], "text": " ".join(w["parts"])}
+            for w in windows
+        ]
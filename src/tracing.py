@@ -0,0 +1,308 @@
+"""
+Lightweight span-based tracing.
+
+Wrap a stage in a span to time it:
+
+    with tracing.span("loader.parse_subtitles", format="json3") as s:
+        transcript = parse(...)
+        s.set(segments=len(transcript))
+
+Spans opened inside another span (on the same thread, or on threads and
+LangGraph nodes started with a copied context) become its children and
+share its trace ID, so one question or one ingestion forms one trace.
+Finished spans are handed to the configured exporters:
+
+- "log"        One JSON line per span (stderr, or TRACE_LOG_PATH)
+- "otel"       OpenTelemetry spans (requires opentelemetry-api/-sdk)
+- "prometheus" Stage duration histograms, token counters and iteration counts
+               (requires prometheus-client)
+- "memory"     Keeps recent spans in memory (benchmarks and debugging)
+
+When tracing is disabled span() returns a shared no-op object, so the cost
+of an instrumented stage is one function call and one flag check.
+"""
+
+import sys
+import json
+import time
+import uuid
+import threading
+from collections import deque
+from contextvars import ContextVar
+from typing import List, Optional
+from config.settings import TRACING_ENABLED, TRACE_EXPORTERS, TRACE_LOG_PATH, PROMETHEUS_PORT
+
+
+class Span:
+    """A timed stage of work with attributes."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent", "attributes", "start_ns", "duration", "error", "_started", "_token", "_state")
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: dict):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.attributes = attributes
+        self.start_ns = 0
+        self.duration = None
+        self.error = None
+        self._started = 0.0
+        self._token = None
+        self._state = {}  # Per-exporter state (e.g. the OpenTelemetry span)
+
+    @property
+    def parent_id(self) -> Optional[str]:
+        return self.parent.span_id if self.parent is not None else None
+
+    def set(self, **attributes):
+        """Add or update attributes."""
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        self.start_ns = time.time_ns()
+        self._started = time.perf_counter()
+        self._token = _current.set(self)
+        for exporter in _exporters:
+            exporter.on_start(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._started
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        try:
+            _current.reset(self._token)
+        except ValueError:
+            # Exited from another context (e.g. a generator finished on a different thread)
+            pass
+        for exporter in _exporters:
+            try:
+                exporter.on_end(self)
+            except Exception as e:
+                print(f"Warning: trace exporter {type(exporter).__name__} failed: {e}")
+        return False
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start_ns / 1e9,
+            "duration": self.duration,
+            "error": self.error,
+            "attributes": self.attributes
+        }
+
+
+class _NoopSpan:
+    """Returned by span() when tracing is disabled."""
+
+    trace_id = None
+    span_id = None
+
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+_current = ContextVar("tracing_span", default=None)
+_exporters = []
+_enabled = False
+
+
+def span(name: str, **attributes):
+    """
+    Open a span; use as a context manager.
+
+    Args:
+        name: Stage name, dotted by component (e.g. "index.embed")
+        **attributes: Initial attributes
+
+    Returns:
+        Span: The span (a no-op object when tracing is disabled)
+    """
+    if not _enabled:
+        return _NOOP
+    return Span(name, _current.get(), attributes)
+
+
+def current_span():
+    """Get the innermost open span, or a no-op span if there is none."""
+    return (_current.get() if _enabled else None) or _NOOP
+
+
+def annotate(**attributes):
+    """Set attributes on the innermost open span."""
+    if _enabled:
+        current = _current.get()
+        if current is not None:
+            current.set(**attributes)
+
+
+def current_trace_id() -> Optional[str]:
+    """Trace ID of the innermost open span, if any."""
+    return current_span().trace_id
+
+
+class SpanExporter:
+    """Receives spans as they start and end. Subclasses override what they need."""
+
+    def on_start(self, span: Span):
+        pass
+
+    def on_end(self, span: Span):
+        pass
+
+
+class LogExporter(SpanExporter):
+    """Writes one JSON line per finished span."""
+
+    def __init__(self, path: str = None):
+        """
+        Args:
+            path: File to append to (stderr if omitted)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def on_end(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            else:
+                print(line, file=sys.stderr)
+
+
+class MemoryExporter(SpanExporter):
+    """Keeps the most recent finished spans in memory."""
+
+    def __init__(self, max_spans: int = 10000):
+        self._spans = deque(maxlen=max_spans)
+
+    def on_end(self, span: Span):
+        self._spans.append(span)
+
+    def spans(self, name: str = None) -> List[Span]:
+        """Finished spans, oldest first, optionally only those with a given name."""
+        return [s for s in list(self._spans) if name is None or s.name == name]
+
+    def clear(self):
+        self._spans.clear()
+
+
+class OpenTelemetryExporter(SpanExporter):
+    """Mirrors spans into OpenTelemetry (configure the SDK and its exporter separately)."""
+
+    def __init__(self, tracer=None):
+        from opentelemetry import trace
+        self._trace = trace
+        self.tracer = tracer or trace.get_tracer("youtube_qa")
+
+    def on_start(self, span: Span):
+        parent = span.parent._state.get("otel") if span.parent is not None else None
+        context = self._trace.set_span_in_context(parent) if parent is not None else None
+        span._state["otel"] = self.tracer.start_span(span.name, context=context, start_time=span.start_ns)
+
+    def on_end(self, span: Span):
+        otel_span = span._state.pop("otel", None)
+        if otel_span is None:
+            return
+        for key, value in span.attributes.items():
+            if isinstance(value, (str, bool, int, float)):
+                otel_span.set_attribute(key, value)
+        if span.error:
+            from opentelemetry.trace import Status, StatusCode
+            otel_span.set_status(Status(StatusCode.ERROR, span.error))
+        otel_span.end(end_time=span.start_ns + int(span.duration * 1e9))
+
+
+class PrometheusExporter(SpanExporter):
+    """Exports stage durations, LLM token counts and agent iteration counts."""
+
+    def __init__(self, registry=None, port: int = None):
+        """
+        Args:
+            registry: prometheus_client registry (the default registry if omitted)
+            port: Start an HTTP endpoint for scraping on this port
+        """
+        from prometheus_client import Counter, Histogram, start_http_server
+        kwargs = {"registry": registry} if registry is not None else {}
+        self.durations = Histogram(
+            "youtube_qa_stage_seconds", "Duration of traced stages", ["stage", "status"], **kwargs
+        )
+        self.tokens = Counter(
+            "youtube_qa_llm_tokens_total", "LLM tokens by model", ["model", "kind"], **kwargs
+        )
+        self.iterations = Histogram(
+            "youtube_qa_agent_iterations", "Agent LLM turns per question",
+            buckets=(1, 2, 3, 4, 5, 6, 8, 10, 15, 20), **kwargs
+        )
+        if port:
+            start_http_server(port, **kwargs)
+
+    def on_end(self, span: Span):
+        self.durations.labels(span.name, "error" if span.error else "ok").observe(span.duration)
+        attributes = span.attributes
+        for kind in ("input_tokens", "output_tokens"):
+            if attributes.get(kind):
+                self.tokens.labels(attributes.get("model", "unknown"), kind).inc(attributes[kind])
+        if span.name == "agent.question" and attributes.get("iterations"):
+            self.iterations.observe(attributes["iterations"])
+
+
+_EXPORTER_FACTORIES = {
+    "log": lambda: LogExporter(TRACE_LOG_PATH),
+    "memory": MemoryExporter,
+    "otel": OpenTelemetryExporter,
+    "prometheus": lambda: PrometheusExporter(port=PROMETHEUS_PORT),
+}
+
+
+def configure(enabled: bool = True, exporters: List = None):
+    """
+    Enable or disable tracing and set the exporters.
+
+    Args:
+        enabled: Record spans
+        exporters: SpanExporter instances or names ("log", "memory", "otel",
+                   "prometheus"); exporters whose package is missing are skipped
+                   with a warning
+    """
+    global _enabled
+    resolved = []
+    for exporter in exporters or []:
+        if isinstance(exporter, str):
+            try:
+                exporter = _EXPORTER_FACTORIES[exporter]()
+            except KeyError:
+                print(f"Warning: unknown trace exporter '{exporter}'")
+                continue
+            except ImportError as e:
+                print(f"Warning: trace exporter unavailable ({e})")
+                continue
+        resolved.append(exporter)
+    _exporters[:] = resolved
+    _enabled = enabled
+
+
+def add_exporter(exporter: SpanExporter):
+    """Add an exporter without replacing the configured ones."""
+    _exporters.append(exporter)
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+if TRACING_ENABLED:
+    configure(True, TRACE_EXPORTERS)
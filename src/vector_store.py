@@ -1,21 +1,357 @@
-from typing import List
+import math
+import threading
+import contextvars
+from functools import lru_cache
+from typing import Any, List, Optional, Set
 from langchain.docstore.document import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
 from langchain_community.vectorstores import FAISS
 from langchain_huggingface import HuggingFaceEmbeddings
-from config.settings import EMBEDDING_MODEL_NAME, TOP_K
+from config.settings import (
+    EMBEDDING_MODEL_NAME, EMBEDDING_PROVIDER, TOP_K, INGEST_WINDOW_SECONDS,
+    INDEX_TYPE, HNSW_M, HNSW_EF_SEARCH, IVF_NLIST, IVF_NPROBE, DOCSTORE,
+    EMBEDDING_PRECISION, RESCORE_FACTOR, CHAPTER_FETCH_FACTOR
+)
+from src import tracing
+from src.docstore import CompactDocstore, PositionalIds
+from src.query_expansion import QueryExpander, reciprocal_rank_fusion
+from src.workers import get_workers
+
+# Rough per-chunk cost of the Document object, metadata dict and docstore entry (InMemoryDocstore)
+_DOC_OVERHEAD_BYTES = 600
+
+def get_embeddings(model_name: str = None, provider: str = None):
+    """Load an embedding model once per process and share it between stores."""
+    provider = provider or EMBEDDING_PROVIDER
+    # Normalized before the cache lookup, so default and explicit arguments share one model
+    model_name = None if provider == "hashing" else model_name or EMBEDDING_MODEL_NAME
+    return _load_embeddings(model_name, provider)
+
+@lru_cache(maxsize=None)
+def _load_embeddings(model_name: str, provider: str):
+    if provider == "hashing":
+        # Offline stand-in; no model download
+        from src.offline_models import HashingEmbeddings
+        return HashingEmbeddings()
+    return HuggingFaceEmbeddings(model_name=model_name)
+
+_PRECISION_CODECS = {"float32": "Flat", "float16": "SQfp16", "int8": "SQ8"}
+# Rescoring re-ranks candidates with the next precision up
+_RESCORE_CODECS = {"int8": "Refine(SQfp16)", "float16": "RFlat"}
+
+def _factory_string(index_type: str, precision: str, ntotal: int, rescore: int) -> str:
+    """FAISS index_factory description for an index type, precision and rescoring factor."""
+    codec = _PRECISION_CODECS[precision]
+    if index_type == "flat":
+        description = codec
+    elif index_type == "hnsw":
+        description = f"HNSW{HNSW_M}" + ("" if codec == "Flat" else f"_{codec}")
+    elif index_type == "ivf":
+        # Clusters must be trained; faiss wants at least 39 points per cluster
+        nlist = min(IVF_NLIST, int(math.sqrt(ntotal)), ntotal // 39)
+        # Too few vectors to cluster; exact search is cheap anyway
+        description = f"IVF{nlist},{codec}" if nlist >= 1 else codec
+    else:
+        raise ValueError(f"Unknown index type: {index_type}")
+    if rescore > 1 and precision in _RESCORE_CODECS:
+        description += "," + _RESCORE_CODECS[precision]
+    return description
+
+def _convert_index(index, index_type: str, precision: str = "float32", rescore: int = 0):
+    """Rebuild a flat FAISS index with another structure and/or precision (same vectors, same ids)."""
+    import faiss
+    vectors = index.reconstruct_n(0, index.ntotal)
+    new_index = faiss.index_factory(index.d, _factory_string(index_type, precision, index.ntotal, rescore))
+    new_index.train(vectors)
+    new_index.add(vectors)
+
+    params = faiss.ParameterSpace()
+    if index_type == "hnsw":
+        params.set_index_parameter(new_index, "efSearch", HNSW_EF_SEARCH)
+    if faiss.try_extract_index_ivf(new_index) is not None:
+        params.set_index_parameter(new_index, "nprobe", IVF_NPROBE)
+    if rescore > 1 and precision in _RESCORE_CODECS:
+        # Fetch k * rescore candidates from the compact codes, re-rank with the finer copy
+        faiss.downcast_index(new_index).k_factor = rescore
+    return new_index
+
+def _index_bytes(index) -> int:
+    """Bytes held by a FAISS index, from its actual structure (codes, graph links, refinement copy)."""
+    import faiss
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexRefine):
+        return _index_bytes(index.base_index) + _index_bytes(index.refine_index)
+    if isinstance(index, faiss.IndexHNSW):
+        return _index_bytes(index.storage) + index.hnsw.neighbors.size() * 4
+    if isinstance(index, faiss.IndexIVF):
+        # Codes and ids in the inverted lists, plus the coarse centroids
+        return index.ntotal * (index.code_size + 8) + _index_bytes(index.quantizer)
+    return index.ntotal * (getattr(index, "code_size", 0) or index.d * 4)
+
+def _needs_conversion(index_type: str, precision: str, rescore: int) -> bool:
+    return index_type != "flat" or precision != "float32" or (rescore > 1 and precision in _RESCORE_CODECS)
+
+def _embed_in_worker(model_name: str, provider: str, texts: List[str]):
+    """Embed chunk texts in a worker process (the model is loaded there once)."""
+    import numpy as np
+    return np.asarray(get_embeddings(model_name, provider).embed_documents(texts), dtype="float32")
+
+def _convert_in_worker(data, index_type: str, precision: str, rescore: int):
+    """_convert_index on a serialized index, in a worker process."""
+    import faiss
+    return faiss.serialize_index(_convert_index(faiss.deserialize_index(data), index_type, precision, rescore))
+
+def _positions(start: int, count: int) -> List[str]:
+    """Docstore ids for chunks stored at consecutive index positions."""
+    return [str(i) for i in range(start, start + count)]
 
 class VectorStore:
-    def __init__(self):
-        self.embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
+    def __init__(
+        self,
+        index_type: str = INDEX_TYPE,
+        docstore_type: str = DOCSTORE,
+        precision: str = EMBEDDING_PRECISION,
+        rescore: int = RESCORE_FACTOR
+    ):
+        self.embeddings = get_embeddings(EMBEDDING_MODEL_NAME)
+        self.index_type = index_type
+        self.precision = precision  # Stored vector precision: "float32", "float16" or "int8"
+        self.rescore = rescore      # Candidates per result re-ranked at higher precision (0/1 = off)
+        self.docstore_type = docstore_type  # "compact" (array-backed) or "memory" (LangChain's InMemoryDocstore)
         self.store = None
+        self.summaries = None  # SummaryIndex built alongside the FAISS index
+        self.language = None   # Caption language of the indexed transcript
+        self.metadata = None   # VideoMetadata (title, duration, chapters) of the video
+
+        # Incremental ingestion state
+        self._lock = threading.RLock()
+        self._first_window = threading.Event()
+        self._thread = None
+        self.indexed = 0
+        self.total = 0
+        self.error = None
 
     def create(self, documents: List[Document]):
-        self.store = FAISS.from_documents(documents, self.embeddings)
+        texts = [d.page_content for d in documents]
+        with tracing.span("index.embed", chunks=len(texts)):
+            vectors = self._embed_documents(texts)
+        with tracing.span("index.build", chunks=len(texts), index_type=self.index_type, precision=self.precision):
+            self.store = self._build(list(zip(texts, vectors)), [d.metadata for d in documents])
+        self.summaries = None
+        self.indexed = self.total = len(documents)
+        self.error = None
+        self._first_window.set()
         return self.store
 
+    def create_incremental(self, documents: List[Document], window_seconds: int = INGEST_WINDOW_SECONDS):
+        """
+        Embed and index documents in time order on a background worker.
+
+        Documents are indexed one time window at a time, so searches see
+        everything indexed so far. Use wait_until_ready() to block until the
+        first window is searchable.
+        """
+        if self.ingesting:
+            raise RuntimeError("Ingestion already in progress")
+        self.store = None
+        self.summaries = None
+        self.indexed = 0
+        self.total = len(documents)
+        self.error = None
+        self._first_window.clear()
+
+        batches = []
+        for doc in sorted(documents, key=lambda d: d.metadata.get("start", 0)):
+            window = int(doc.metadata.get("start", 0) // window_seconds)
+            if not batches or batches[-1][0] != window:
+                batches.append((window, []))
+            batches[-1][1].append(doc)
+
+        # Run in a copy of the caller's context so indexing spans join the caller's trace
+        context = contextvars.copy_context()
+        self._thread = threading.Thread(
+            target=context.run, args=(self._ingest, [b for _, b in batches]), daemon=True
+        )
+        self._thread.start()
+
+    def _ingest(self, batches: List[List[Document]]):
+        try:
+            for batch in batches:
+                texts = [d.page_content for d in batch]
+                # Embed outside the lock so searches are not blocked meanwhile
+                with tracing.span("index.embed", chunks=len(texts)):
+                    vectors = self._embed_documents(texts)
+                with self._lock, tracing.span("index.build", chunks=len(texts), index_type=self.index_type, precision=self.precision):
+                    pairs = list(zip(texts, vectors))
+                    metadatas = [d.metadata for d in batch]
+                    if self.store is None:
+                        # IVF clusters and int8 value ranges are trained on the whole video,
+                        # so those indexes search flat until the last window is in
+                        self.store = self._build(pairs, metadatas, convert=not self._trained_on_all)
+                    else:
+                        start = len(self.store.index_to_docstore_id)
+                        self.store.add_embeddings(pairs, metadatas=metadatas, ids=_positions(start, len(pairs)))
+                    self.indexed += len(batch)
+                self._first_window.set()
+            if self._trained_on_all and self.store is not None:
+                with tracing.span("index.train", index_type=self.index_type, precision=self.precision):
+                    # Trained outside the lock (this thread is the only writer); searches use the flat index meanwhile
+                    index = self._convert(self.store.index)
+                    with self._lock:
+                        self.store.index = index
+        except Exception as e:
+            self.error = str(e)
+            print(f"Error indexing video: {e}")
+        finally:
+            # Never leave waiters hanging, even on failure
+            self._first_window.set()
+
+    def _build(self, pairs: list, metadatas: List[dict], convert: bool = True) -> FAISS:
+        kwargs = {}
+        if self.docstore_type == "compact":
+            kwargs = {"docstore": CompactDocstore(), "index_to_docstore_id": PositionalIds()}
+        store = FAISS.from_embeddings(
+            pairs, self.embeddings, metadatas=metadatas, ids=_positions(0, len(pairs)), **kwargs
+        )
+        if convert and _needs_conversion(self.index_type, self.precision, self.rescore):
+            store.index = self._convert(store.index)
+        return store
+
+    def _embed_documents(self, texts: List[str]):
+        """Embed chunks for indexing, in an ingestion worker process when the store uses the shared model."""
+        if self.embeddings is not get_embeddings(EMBEDDING_MODEL_NAME):
+            return self.embeddings.embed_documents(texts)  # A custom model may not exist in the workers
+        return get_workers().run_cpu(_embed_in_worker, EMBEDDING_MODEL_NAME, EMBEDDING_PROVIDER, texts)
+
+    def _convert(self, index):
+        """Rebuild a flat index with this store's structure and precision, in a worker process if there is one."""
+        workers = get_workers()
+        if workers.in_process:
+            return _convert_index(index, self.index_type, self.precision, self.rescore)
+        import faiss
+        data = workers.run_cpu(
+            _convert_in_worker, faiss.serialize_index(index), self.index_type, self.precision, self.rescore
+        )
+        return faiss.deserialize_index(data)
+
+    @property
+    def _trained_on_all(self) -> bool:
+        return self.index_type == "ivf" or self.precision == "int8"
+
+    @property
+    def ingesting(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def wait_until_ready(self, timeout: float = None) -> bool:
+        """Block until the first window is indexed. Returns False on error or timeout."""
+        return self._first_window.wait(timeout) and self.store is not None
+
+    def progress(self) -> dict:
+        return {
+            "indexed": self.indexed,
+            "total": self.total,
+            "done": self.total > 0 and self.indexed >= self.total,
+            "error": self.error
+        }
+
+    def memory_usage(self) -> int:
+        """Estimate the bytes held by the index, chunk text and metadata."""
+        with self._lock:
+            if self.store is None:
+                return 0
+            # Sized from the index itself: it stays float32 flat until it is converted
+            vectors = _index_bytes(self.store.index)
+            docstore = self.store.docstore
+            if isinstance(docstore, CompactDocstore):
+                return vectors + docstore.memory_usage()
+            docs = docstore._dict.values()
+            text = sum(len(d.page_content.encode("utf-8")) for d in docs)
+            return vectors + text + len(docs) * _DOC_OVERHEAD_BYTES
+
     def search(self, query: str, k: int = TOP_K) -> List[Document]:
-        return self.store.similarity_search(query, k=k)
+        with tracing.span("retriever.search", k=k) as span:
+            with tracing.span("index.embed_query"):
+                embedding = self.embeddings.embed_query(query)
+            chapters = self._match_chapters(embedding)
+            with self._lock:
+                if chapters is None:
+                    docs = self.store.similarity_search_by_vector(embedding, k=k)
+                else:
+                    # Coarse level first: only chunks in the chapters the query is about,
+                    # topped up from the whole video if they have fewer than k
+                    docs = self.store.similarity_search_by_vector(
+                        embedding, k=k, filter=self._in_chapters(chapters), fetch_k=k * CHAPTER_FETCH_FACTOR
+                    )
+                    if len(docs) < k:
+                        seen = {d.metadata.get("start") for d in docs}
+                        more = self.store.similarity_search_by_vector(embedding, k=k)
+                        docs += [d for d in more if d.metadata.get("start") not in seen][:k - len(docs)]
+                    span.set(chapters=len(chapters))
+            span.set(results=len(docs))
+            return docs
+
+    def _match_chapters(self, embedding) -> Optional[Set[int]]:
+        """Chapters a query is restricted to (see VideoMetadata.match_chapters), or None."""
+        if self.metadata is None:
+            return None
+        return self.metadata.match_chapters(embedding, self.embeddings)
+
+    def _in_chapters(self, chapters: Set[int]):
+        """Metadata filter for chunks starting in the given chapters."""
+        return lambda metadata: self.metadata.chapter_at(metadata.get("start", 0.0)) in chapters
+
+    def search_many(self, queries: List[str], k: int = TOP_K) -> List[Document]:
+        """Search several queries at once and fuse their rankings (reciprocal rank fusion)."""
+        if len(queries) == 1:
+            return self.search(queries[0], k)
+        import faiss
+        import numpy as np
+        with tracing.span("retriever.search_many", k=k, queries=len(queries)) as span:
+            with tracing.span("index.embed_query"):
+                # One batch for all sub-queries
+                vectors = np.array(self.embeddings.embed_documents(queries), dtype="float32")
+            # Chapters are matched on the original query
+            chapters = self._match_chapters(vectors[0])
+            with self._lock:
+                if self.store._normalize_L2:
+                    faiss.normalize_L2(vectors)
+                # One FAISS call; each sub-query gets its own top k (more to filter by chapter)
+                _, ids = self.store.index.search(vectors, k if chapters is None else k * CHAPTER_FETCH_FACTOR)
+                rankings = [[int(i) for i in row if i >= 0] for row in ids]
+                found = {}
+
+                def doc(i):
+                    if i not in found:
+                        found[i] = self.store.docstore.search(self.store.index_to_docstore_id[i])
+                    return found[i]
+
+                positions = reciprocal_rank_fusion(rankings)
+                if chapters is not None:
+                    in_chapters = self._in_chapters(chapters)
+                    narrowed = reciprocal_rank_fusion([[i for i in r if in_chapters(doc(i).metadata)] for r in rankings])
+                    kept = set(narrowed)
+                    positions = narrowed + [i for i in positions if i not in kept]
+                    span.set(chapters=len(chapters))
+                docs = [doc(i) for i in positions[:k]]
+            span.set(results=len(docs))
+            return docs
+
+    def as_retriever(self, k: int = TOP_K, expander: QueryExpander = None):
+        return _LockedRetriever(vector_store=self, k=k, expander=expander)
+
+
+class _LockedRetriever(BaseRetriever):
+    """Retriever that searches whatever is indexed so far, safe during ingestion."""
 
-    def as_retriever(self):
-        return self.store.as_retriever(search_kwargs={"k": TOP_K})
+    vector_store: Any
+    k: int = TOP_K
+    expander: Any = None  # QueryExpander; the query and its sub-queries are searched together
 
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, question: str = None
+    ) -> List[Document]:
+        # question (invoke(query, question=...)) is the user question the search is for
+        if self.expander is not None and self.expander.enabled:
+            return self.vector_store.search_many(self.expander.expand(query, question), k=self.k)
+        return self.vector_store.search(query, k=self.k)
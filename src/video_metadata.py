@@ -0,0 +1,187 @@
+import re
+import bisect
+import threading
+from typing import List, Optional, Set
+from config.settings import CHAPTER_MATCH_SCORE, CHAPTER_SEARCH_LIMIT
+
+# Questions answered from the metadata alone, without retrieval or an LLM call.
+# Each pattern must name the video itself ("the video", "this video's ..."):
+# "how long is it" or "which chapters" may be about anything the video covers,
+# so those go through the agent, which can still call the video_info tool.
+_VIDEO = r"(?:the|this) video"
+METADATA_QUESTION_PATTERNS = {
+    "duration": re.compile(
+        rf"\b(how long is {_VIDEO}|how long does {_VIDEO} (?:last|run|take)|"
+        rf"(?:length|duration|runtime|run time) of {_VIDEO}|video(?:'s)? (?:length|duration|runtime))\b",
+        re.IGNORECASE
+    ),
+    "chapters": re.compile(
+        rf"\b(how many chapters (?:does|are (?:there )?in|in) {_VIDEO}|(?:chapters|table of contents) (?:of|in|for) {_VIDEO}|"
+        rf"{_VIDEO}(?:'s)? (?:chapters|table of contents))\b",
+        re.IGNORECASE
+    ),
+    "title": re.compile(
+        rf"\b(what(?:'s| is) {_VIDEO}(?:'s)? (?:title|called)|(?:title|name) of {_VIDEO})\b",
+        re.IGNORECASE
+    ),
+    "channel": re.compile(
+        rf"\b(who (?:made|uploaded|posted|published|created) {_VIDEO}|"
+        rf"channel (?:name )?(?:of|behind) {_VIDEO}|{_VIDEO}(?:'s)? channel)\b",
+        re.IGNORECASE
+    ),
+    "date": re.compile(
+        rf"\b(when was {_VIDEO} (?:uploaded|posted|published|released)|"
+        rf"(?:upload|publish(?:ed)?|release) date of {_VIDEO}|{_VIDEO}(?:'s)? (?:upload|publish(?:ed)?|release) date)\b",
+        re.IGNORECASE
+    ),
+}
+
+
+def metadata_question(question: str) -> Optional[str]:
+    """Kind of metadata a question asks for ("duration", "chapters", ...), or None."""
+    for kind, pattern in METADATA_QUESTION_PATTERNS.items():
+        if pattern.search(question):
+            return kind
+    return None
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    return f"{hours}:{rest // 60:02d}:{rest % 60:02d}" if hours else f"{rest // 60:02d}:{rest % 60:02d}"
+
+
+class VideoMetadata:
+    """
+    Structured side index of a video's yt-dlp metadata.
+
+    Keeps the title, channel, upload date, duration, description and
+    chapters next to the FAISS index. Chapters are used three ways:
+    - chunking hints: chunks do not span chapter boundaries
+    - a coarse first-level index: a query that matches chapter titles
+      closely only searches chunks in those chapters
+    - the video_info tool and the metadata fast path, which answer
+      "how long is the video" or "what are the video's chapters" without retrieval
+    """
+
+    def __init__(self, info: dict, url: str = None, duration: float = None):
+        """
+        Build the side index.
+
+        Args:
+            info: Metadata from YouTubeLoader.extract_info
+            url: Video URL (for chapter links)
+            duration: Fallback duration in seconds (e.g. the transcript's last time)
+        """
+        self.video_id = info.get("id")
+        self.url = url
+        self.title = info.get("title") or ""
+        self.channel = info.get("channel") or info.get("uploader") or ""
+        self.description = info.get("description") or ""
+        self.upload_date = info.get("upload_date") or ""
+        self.duration = float(info.get("duration") or duration or 0.0)
+        self.chapters = [
+            {
+                "title": c.get("title") or f"Chapter {i + 1}",
+                "start": float(c.get("start_time") or 0.0),
+                "end": float(c.get("end_time") or self.duration)
+            }
+            for i, c in enumerate(sorted(info.get("chapters") or [], key=lambda c: c.get("start_time") or 0.0))
+        ]
+        self._starts = [c["start"] for c in self.chapters]
+        self._lock = threading.Lock()
+        self._title_vectors = None  # Chapter title embeddings, computed on first search
+
+    def to_info(self) -> dict:
+        """extract_info-style dict that rebuilds this index (VideoMetadata(info)), e.g. for snapshots."""
+        return {
+            "id": self.video_id,
+            "title": self.title,
+            "channel": self.channel,
+            "description": self.description,
+            "upload_date": self.upload_date,
+            "duration": self.duration,
+            "chapters": [{"title": c["title"], "start_time": c["start"], "end_time": c["end"]} for c in self.chapters]
+        }
+
+    def chapter_at(self, seconds: float) -> int:
+        """Index of the chapter containing a time (-1 before the first chapter or without chapters)."""
+        return bisect.bisect_right(self._starts, seconds) - 1
+
+    def match_chapters(self, query_vector: List[float], embeddings) -> Optional[Set[int]]:
+        """
+        Chapters a query is about, if it matches chapter titles closely.
+
+        Args:
+            query_vector: Embedded query
+            embeddings: Embedding model of the index (embeds the titles once)
+
+        Returns:
+            set: Up to CHAPTER_SEARCH_LIMIT chapter indexes scoring at least
+                 CHAPTER_MATCH_SCORE (cosine), or None to search the whole video
+        """
+        if len(self.chapters) < 2:
+            return None
+        import numpy as np
+        with self._lock:
+            if self._title_vectors is None:
+                vectors = np.array(embeddings.embed_documents([c["title"] for c in self.chapters]), dtype="float32")
+                self._title_vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        query = np.asarray(query_vector, dtype="float32")
+        scores = self._title_vectors @ (query / max(float(np.linalg.norm(query)), 1e-12))
+        best = np.argsort(-scores)[:CHAPTER_SEARCH_LIMIT]
+        matched = {int(i) for i in best if scores[i] >= CHAPTER_MATCH_SCORE}
+        return matched or None
+
+    def render(self) -> str:
+        """Metadata as text for the video_info tool."""
+        lines = [f"Title: {self.title}"]
+        if self.channel:
+            lines.append(f"Channel: {self.channel}")
+        if self.upload_date:
+            lines.append(f"Uploaded: {self._date()}")
+        if self.duration:
+            lines.append(f"Duration: {_format_duration(self.duration)}")
+        if self.chapters:
+            lines.append("Chapters:")
+            lines += [f"[{_format_duration(c['start'])}] {c['title']}" for c in self.chapters]
+        if self.description:
+            lines.append(f"Description: {self.description[:1000]}")
+        return "\n".join(lines)
+
+    def answer(self, kind: str) -> Optional[str]:
+        """
+        Direct answer to a metadata question.
+
+        Args:
+            kind: From metadata_question()
+
+        Returns:
+            str: Answer, or None if the metadata does not have it
+        """
+        if kind == "duration" and self.duration:
+            return f"The video is {_format_duration(self.duration)} long."
+        if kind == "chapters":
+            if not self.chapters:
+                return "This video has no chapters."
+            lines = [f"The video has {len(self.chapters)} chapters:"]
+            for i, c in enumerate(self.chapters):
+                link = self._link(c["start"])
+                lines.append(f"{i + 1}. {link} {c['title']}")
+            return "\n".join(lines)
+        if kind == "title" and self.title:
+            return f'The video is "{self.title}"' + (f" by {self.channel}." if self.channel else ".")
+        if kind == "channel" and self.channel:
+            return f"The video was published by {self.channel}."
+        if kind == "date" and self.upload_date:
+            return f"The video was uploaded on {self._date()}."
+        return None
+
+    def _date(self) -> str:
+        d = self.upload_date
+        return f"{d[:4]}-{d[4:6]}-{d[6:8]}" if len(d) == 8 and d.isdigit() else d
+
+    def _link(self, seconds: float) -> str:
+        from src.citations import watch_url
+        url = watch_url(self.video_id or self.url or "", seconds)
+        return f"[{_format_duration(seconds)}]({url})" if url else f"[{_format_duration(seconds)}]"
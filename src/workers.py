@@ -0,0 +1,216 @@
+"""
+Process-wide worker pools that keep ingestion from slowing down questions.
+
+- CPU pool: EMBEDDING_PROCESSES worker processes (opt-in, 0 by default) for
+  ingestion's CPU-heavy steps (embedding transcript chunks, training
+  IVF/quantized indexes). Each worker is limited to EMBEDDING_THREADS threads
+  and runs at a lower OS priority (INGEST_NICE), so ingestion neither holds
+  this process's GIL nor takes the cores question answering needs.
+- I/O pool: IO_WORKERS threads for network-bound ingestion (yt-dlp, subtitle
+  downloads, async video loads), apart from the default executor threads that
+  serve questions.
+
+Interactive work (embedding a question, FAISS search, LLM calls paced by the
+LLMScheduler) stays on the caller's thread, where it does not queue behind
+ingestion. Functions sent to the CPU pool must be picklable module-level
+functions; workers are spawned, so scripts using them need the usual
+if __name__ == "__main__" guard.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+import contextvars
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable
+from config.settings import EMBEDDING_PROCESSES, EMBEDDING_THREADS, INGEST_NICE, IO_WORKERS
+
+
+def _init_worker(threads: int, nice: int):
+    """Limit a worker process to its share of the CPU quota."""
+    # torch, FAISS and BLAS read these when first imported
+    for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[name] = str(threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    # Already imported while the parent's main module was re-imported
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads)
+    if "faiss" in sys.modules:
+        sys.modules["faiss"].omp_set_num_threads(threads)
+    if nice and hasattr(os, "nice"):
+        os.nice(nice)
+
+
+class WorkerPools:
+    """
+    CPU process pool and I/O thread pool for ingestion.
+
+    The process pool is started on first use. If it cannot start or a worker
+    dies, CPU tasks run in the calling thread from then on (with a warning),
+    which is how ingestion ran before the pools existed.
+    """
+
+    def __init__(
+        self,
+        processes: int = EMBEDDING_PROCESSES,
+        threads: int = EMBEDDING_THREADS,
+        nice: int = INGEST_NICE,
+        io_workers: int = IO_WORKERS
+    ):
+        """
+        Initialize the pools.
+
+        Args:
+            processes: CPU worker processes (0 runs CPU tasks in the calling thread)
+            threads: Threads per worker process (processes * threads is the CPU quota)
+            nice: Priority decrease of worker processes (0 keeps the parent's priority)
+            io_workers: Threads for network-bound ingestion
+        """
+        self.processes = processes
+        self.threads = threads
+        self.nice = nice
+        self.io = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="ingest-io")
+        self.io_workers = io_workers
+        self._cpu = None
+        self._lock = threading.Lock()
+        self._cpu_queued = 0
+        self._io_queued = 0
+        self._stats = {"tasks": 0, "in_process": 0, "failures": 0, "busy_seconds": 0.0, "io_tasks": 0}
+
+    @property
+    def in_process(self) -> bool:
+        """Whether CPU tasks run in the calling thread."""
+        return self.processes <= 0
+
+    def run_cpu(self, fn: Callable, *args):
+        """
+        Run a CPU-heavy function in a worker process and wait for its result.
+
+        Args:
+            fn: Picklable module-level function
+            *args: Picklable arguments
+
+        Returns:
+            The result of fn (raises its exception)
+        """
+        pool = self._pool()
+        if pool is None:
+            with self._lock:
+                self._stats["in_process"] += 1
+            return fn(*args)
+
+        started = time.perf_counter()
+        with self._lock:
+            self._cpu_queued += 1
+        try:
+            try:
+                future = pool.submit(fn, *args)
+            except RuntimeError as e:
+                # Pool shut down or broken, or this is a spawned process still importing its parent's main module
+                self._disable(pool, e)
+                return fn(*args)
+            try:
+                return future.result()
+            except BrokenProcessPool as e:
+                self._disable(pool, e)
+                return fn(*args)
+        finally:
+            with self._lock:
+                self._cpu_queued -= 1
+                self._stats["tasks"] += 1
+                self._stats["busy_seconds"] += time.perf_counter() - started
+
+    def run_io(self, fn: Callable, *args) -> Future:
+        """
+        Start network-bound work on the I/O pool (in the caller's context, so spans join its trace).
+
+        Args:
+            fn: Blocking callable
+            *args: Arguments for fn
+
+        Returns:
+            Future: Result of fn
+        """
+        with self._lock:
+            self._io_queued += 1
+            self._stats["io_tasks"] += 1
+        future = self.io.submit(contextvars.copy_context().run, fn, *args)
+        future.add_done_callback(self._io_done)
+        return future
+
+    async def run_io_async(self, fn: Callable, *args):
+        """Run network-bound work on the I/O pool without blocking the event loop."""
+        return await asyncio.wrap_future(self.run_io(fn, *args))
+
+    def metrics(self) -> dict:
+        """Pool sizes, queued tasks and CPU time spent in workers."""
+        with self._lock:
+            return {
+                "cpu": {
+                    "processes": max(self.processes, 0),
+                    "threads_per_process": self.threads,
+                    "started": self._cpu is not None,
+                    "queued": self._cpu_queued,
+                    "tasks": self._stats["tasks"],
+                    "in_process": self._stats["in_process"],
+                    "failures": self._stats["failures"],
+                    "busy_seconds": round(self._stats["busy_seconds"], 3)
+                },
+                "io": {
+                    "workers": self.io_workers,
+                    "queued": self._io_queued,
+                    "tasks": self._stats["io_tasks"]
+                }
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stop both pools (running tasks finish first when wait is True)."""
+        with self._lock:
+            pool, self._cpu = self._cpu, None
+            self.processes = 0
+        if pool is not None:
+            pool.shutdown(wait=wait)
+        self.io.shutdown(wait=wait)
+
+    def _pool(self):
+        with self._lock:
+            if self._cpu is None and self.processes > 0:
+                # Spawned, not forked: forking after torch/FAISS start their threads can deadlock
+                self._cpu = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.threads, self.nice)
+                )
+            return self._cpu
+
+    def _disable(self, pool: ProcessPoolExecutor, error: Exception):
+        with self._lock:
+            self._stats["failures"] += 1
+            if self._cpu is not pool:
+                return  # Another caller already fell back
+            self._cpu = None
+            self.processes = 0
+        print(f"Warning: Ingestion worker process failed ({error}). Embedding in-process from now on.")
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _io_done(self, future: Future):
+        with self._lock:
+            self._io_queued -= 1
+
+
+_workers = None
+_workers_lock = threading.Lock()
+
+
+def get_workers() -> WorkerPools:
+    """Get the process-wide worker pools (all sessions share the CPU quota)."""
+    global _workers
+    with _workers_lock:
+        if _workers is None:
+            _workers = WorkerPools()
+        return _workers
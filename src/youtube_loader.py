@@ -1,10 +1,37 @@
 import re
 import json
-from typing import List
+import time
+import bisect
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
 import yt_dlp
 from langchain.docstore.document import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from config.settings import CHUNK_SIZE, CHUNK_OVERLAP
+from config.settings import (
+    CHUNK_SIZE, CHUNK_OVERLAP, TRANSCRIPT_LANGUAGES, VIDEO_INFO_CACHE_SIZE, VIDEO_INFO_TTL
+)
+from src import tracing
+from src.single_flight import SingleFlight
+from src.video_metadata import VideoMetadata
+
+# extract_info fields kept in the metadata cache (the full info dict is much larger)
+_INFO_KEYS = (
+    "id", "title", "description", "duration", "chapters", "channel", "uploader",
+    "upload_date", "language", "subtitles", "automatic_captions"
+)
+
+# Process-wide metadata cache: video ID -> (time fetched, info), least recently used first
+_info_cache = OrderedDict()
+_info_lock = threading.Lock()
+_info_loads = SingleFlight()
+
+def _match_language(language: str, tracks: dict):
+    """Caption track key for a language: exact, else a regional/original variant (en-US, en-orig)."""
+    if language in tracks:
+        return language
+    variants = sorted(k for k in tracks if k.startswith(f"{language}-"))
+    return next((k for k in variants if k.endswith("-orig")), variants[0] if variants else None)
 
 class YouTubeLoader:
     """
@@ -14,11 +41,25 @@ class YouTubeLoader:
     IP blocks that affect youtube-transcript-api.
     """
 
-    def __init__(self):
-        """Initialize the YouTube loader with text splitter."""
+    def __init__(
+        self,
+        chunk_size: int = CHUNK_SIZE,
+        chunk_overlap: int = CHUNK_OVERLAP,
+        languages: List[str] = None
+    ):
+        """
+        Initialize the YouTube loader with text splitter.
+
+        Args:
+            chunk_size: Maximum characters per chunk
+            chunk_overlap: Characters shared by consecutive chunks
+            languages: Caption languages in order of preference (default TRANSCRIPT_LANGUAGES)
+        """
+        self.languages = list(languages or TRANSCRIPT_LANGUAGES)
         self.splitter = RecursiveCharacterTextSplitter(
-            chunk_size=CHUNK_SIZE,
-            chunk_overlap=CHUNK_OVERLAP
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            add_start_index=True  # Character offsets map chunks back to transcript times
         )
 
         # Configure yt-dlp options
@@ -26,17 +67,18 @@ class YouTubeLoader:
             'skip_download': True,  # Don't download video
             'writesubtitles': True,  # Get subtitles
             'writeautomaticsub': True,  # Get auto-generated subs if manual not available
-            'subtitleslangs': ['en'],  # English subtitles
+            'subtitleslangs': self.languages,  # Preferred caption languages
             'quiet': True,  # Suppress output
             'no_warnings': True,  # Suppress warnings
         }
 
-    def load(self, url: str) -> List[Document]:
+    def load(self, url: str, language: str = None) -> List[Document]:
         """
         Load and process a YouTube video transcript using yt-dlp.
 
         Args:
             url: YouTube video URL
+            language: Caption language (default: first available of self.languages)
 
         Returns:
             List[Document]: List of document chunks with metadata
@@ -44,63 +86,228 @@ class YouTubeLoader:
         Raises:
             Exception: If transcript cannot be retrieved
         """
+        transcript = self.fetch_transcript(url, language)
+        # Chapters (from the same cached metadata) are chunk boundaries
+        return self.split_transcript(transcript, url, self.video_metadata(url).chapters)
+
+    def video_metadata(self, url: str, transcript: List[dict] = None) -> VideoMetadata:
+        """
+        Get a video's title, duration, chapters, etc. as a side index.
+
+        Args:
+            url: YouTube video URL
+            transcript: Parsed transcript (its last time is the duration if yt-dlp has none)
+
+        Returns:
+            VideoMetadata: Structured metadata (from the extract_info cache)
+        """
+        duration = transcript[-1]["start"] if transcript else None
+        return VideoMetadata(self.extract_info(url), url, duration)
+
+    def extract_info(self, url: str) -> dict:
+        """
+        Get a video's yt-dlp metadata, from the process-wide cache when possible.
+
+        Concurrent callers for the same video share one extraction.
+
+        Args:
+            url: YouTube video URL
+
+        Returns:
+            dict: Caption tracks, title, description, duration, chapters, etc.
+        """
         try:
-            with yt_dlp.YoutubeDL(self.ydl_opts) as ydl:
-                # Extract video info including subtitles
+            key = self._extract_id(url)
+        except ValueError:
+            key = url
+        with _info_lock:
+            entry = _info_cache.get(key)
+            if entry is not None and time.time() - entry[0] < VIDEO_INFO_TTL:
+                _info_cache.move_to_end(key)
+                return entry[1]
+
+        def extract():
+            with yt_dlp.YoutubeDL(self.ydl_opts) as ydl, tracing.span("loader.extract_info"):
                 info = ydl.extract_info(url, download=False)
+            return {k: info.get(k) for k in _INFO_KEYS}
 
-                # Try to get subtitles
-                subtitles = info.get('subtitles', {})
-                automatic_captions = info.get('automatic_captions', {})
-
-                # Prefer manual subtitles, fall back to auto-generated
-                transcript_data = None
-                if 'en' in subtitles:
-                    transcript_data = subtitles['en']
-                elif 'en' in automatic_captions:
-                    transcript_data = automatic_captions['en']
-                else:
-                    raise Exception("No English subtitles/captions available for this video")
-
-                # Find JSON3 format (most detailed)
-                json3_subtitle = None
-                for sub in transcript_data:
-                    if sub.get('ext') == 'json3':
-                        json3_subtitle = sub
-                        break
-
-                # If no JSON3, try other formats
-                if not json3_subtitle and transcript_data:
-                    json3_subtitle = transcript_data[0]
-
-                # Download subtitle data
-                subtitle_url = json3_subtitle.get('url')
-                if not subtitle_url:
-                    raise Exception("Could not find subtitle URL")
-
-                # Fetch subtitle content
-                import urllib.request
-                with urllib.request.urlopen(subtitle_url) as response:
-                    subtitle_content = response.read().decode('utf-8')
+        info = _info_loads.do(key, extract)
+        with _info_lock:
+            _info_cache[key] = (time.time(), info)
+            _info_cache.move_to_end(key)
+            while len(_info_cache) > VIDEO_INFO_CACHE_SIZE:
+                _info_cache.popitem(last=False)
+        return info
+
+    def available_languages(self, url: str) -> Dict[str, List[str]]:
+        """
+        List a video's caption languages.
+
+        Args:
+            url: YouTube video URL
+
+        Returns:
+            dict: 'manual' and 'automatic' language codes
+        """
+        info = self.extract_info(url)
+        return {
+            "manual": sorted(k for k in (info.get("subtitles") or {}) if k != "live_chat"),
+            "automatic": sorted(info.get("automatic_captions") or {})
+        }
+
+    def select_language(self, info: dict, languages: List[str] = None, fallback: bool = True) -> Tuple[str, list]:
+        """
+        Pick the caption track to load.
+
+        Each preferred language is tried as manual subtitles, then as
+        auto-generated captions. If none is available, the video's original
+        language (or its first manual track) is used.
 
-                # Parse subtitle content
-                transcript = self._parse_subtitles(subtitle_content, json3_subtitle.get('ext', 'json3'))
+        Args:
+            info: Metadata from extract_info
+            languages: Languages in order of preference (default self.languages)
+            fallback: Fall back to the original language when none of languages is available
+
+        Returns:
+            tuple: (language code, list of formats of that track)
+
+        Raises:
+            Exception: If the video has no captions at all
+        """
+        subtitles = {k: v for k, v in (info.get("subtitles") or {}).items() if k != "live_chat"}
+        automatic = info.get("automatic_captions") or {}
+        original = info.get("language") if fallback else None
+        for language in list(languages or self.languages) + ([original] if original else []):
+            for tracks in (subtitles, automatic):
+                code = _match_language(language, tracks)
+                if code:
+                    return code, tracks[code]
+        if subtitles and fallback:
+            code = next(iter(subtitles))
+            return code, subtitles[code]
+        raise Exception(f"No subtitles/captions available for this video (tried {', '.join(languages or self.languages)})")
+
+    def resolve_language(self, url: str, language: str = None) -> str:
+        """
+        Caption language that fetch_transcript will load.
+
+        Args:
+            url: YouTube video URL
+            language: Requested language (default: first available of self.languages)
 
-                # Format transcript with timestamps
-                text = "\n".join([
-                    f"[{int(s['start']//60):02d}:{int(s['start']%60):02d}] {s['text']}"
-                    for s in transcript
-                ])
+        Returns:
+            str: Language code of the caption track
+        """
+        # An explicitly requested language must exist; preferences fall back
+        return self.select_language(self.extract_info(url), [language] if language else None, not language)[0]
 
-                # Split into chunks
-                chunks = self.splitter.split_text(text)
+    def fetch_transcript(self, url: str, language: str = None) -> List[dict]:
+        """
+        Download and parse the transcript of a YouTube video.
 
-                # Create documents with metadata
-                return [Document(page_content=c, metadata={"source": url}) for c in chunks]
+        Args:
+            url: YouTube video URL
+            language: Caption language (default: first available of self.languages)
+
+        Returns:
+            List of dicts with 'start' (seconds) and 'text' keys, in time order
+
+        Raises:
+            Exception: If transcript cannot be retrieved
+        """
+        try:
+            # Extract video info including subtitles (cached per video)
+            info = self.extract_info(url)
+
+            # Prefer manual subtitles, fall back to auto-generated, per language
+            _, transcript_data = self.select_language(info, [language] if language else None, not language)
+
+            # Find JSON3 format (most detailed)
+            json3_subtitle = None
+            for sub in transcript_data:
+                if sub.get('ext') == 'json3':
+                    json3_subtitle = sub
+                    break
+
+            # If no JSON3, try other formats
+            if not json3_subtitle and transcript_data:
+                json3_subtitle = transcript_data[0]
+
+            # Download subtitle data
+            subtitle_url = json3_subtitle.get('url')
+            if not subtitle_url:
+                raise Exception("Could not find subtitle URL")
+
+            # Fetch subtitle content
+            import urllib.request
+            with tracing.span("loader.fetch_subtitles") as span:
+                with urllib.request.urlopen(subtitle_url) as response:
+                    subtitle_content = response.read().decode('utf-8')
+                span.set(bytes=len(subtitle_content))
+
+            # Parse subtitle content
+            format_type = json3_subtitle.get('ext', 'json3')
+            with tracing.span("loader.parse_subtitles", format=format_type) as span:
+                transcript = self._parse_subtitles(subtitle_content, format_type)
+                span.set(segments=len(transcript))
+            return transcript
 
         except Exception as e:
             raise Exception(f"Failed to load YouTube transcript: {str(e)}")
 
+    def split_transcript(self, transcript: List[dict], url: str, chapters: List[dict] = None) -> List[Document]:
+        """
+        Split a parsed transcript into chunks.
+
+        Chunk text is the caption text only; times are kept in the metadata
+        ('start'/'end' seconds), so they cost no prompt tokens and citations
+        are built from them (src/citations.py).
+
+        Args:
+            transcript: Parsed transcript from fetch_transcript
+            url: YouTube video URL (stored as the chunk source)
+            chapters: Chapters with 'start' seconds (VideoMetadata.chapters);
+                      no chunk spans two chapters
+
+        Returns:
+            List[Document]: List of document chunks with metadata
+        """
+        # Transcript line ranges split at chapter starts
+        times = [s['start'] for s in transcript]
+        bounds = sorted({bisect.bisect_left(times, c["start"]) for c in chapters or []} - {0, len(times)})
+        sections = list(zip([0] + bounds, bounds + [len(times)]))
+
+        docs = []
+        with tracing.span("loader.split", sections=len(sections)) as span:
+            for first_line, stop_line in sections:
+                docs += self._split_section(transcript[first_line:stop_line], url)
+            span.set(chunks=len(docs))
+        return docs
+
+    def _split_section(self, transcript: List[dict], url: str) -> List[Document]:
+        """Split consecutive transcript lines into chunks tagged with the time range each covers."""
+        lines = [s['text'] for s in transcript]
+        text = "\n".join(lines)
+
+        # Character offset where each transcript line starts
+        line_offsets = []
+        offset = 0
+        for line in lines:
+            line_offsets.append(offset)
+            offset += len(line) + 1
+
+        docs = []
+        for doc in self.splitter.create_documents([text]):
+            start_index = doc.metadata["start_index"]
+            first = bisect.bisect_right(line_offsets, start_index) - 1
+            last = bisect.bisect_right(line_offsets, start_index + len(doc.page_content) - 1) - 1
+            docs.append(Document(page_content=doc.page_content, metadata={
+                "source": url,
+                "start": transcript[max(first, 0)]["start"],
+                "end": transcript[max(last, 0)]["start"]
+            }))
+        return docs
+
     def _parse_subtitles(self, content: str, format_type: str) -> List[dict]:
         """
         Parse subtitle content into transcript format.
@@ -153,10 +360,15 @@ class YouTubeLoader:
 
         return transcript
 
-    def _extract_id(self, url: str) -> str:
+    @staticmethod
+    def _extract_id(url: str) -> str:
         """
         Extract video ID from YouTube URL.
 
+        Watch, youtu.be, shorts, embed and live URLs (any host variant) and
+        bare 11-character IDs all give the same ID, so it can be used as a
+        cache and de-duplication key.
+
         Args:
             url: YouTube video URL
 
@@ -166,7 +378,11 @@ class YouTubeLoader:
         Raises:
             ValueError: If URL format is invalid
         """
+        url = url.strip()
+        if re.fullmatch(r'[\w-]{11}', url):
+            return url
         patterns = [
+            r'(?:youtube(?:-nocookie)?\.com\/(?:watch\?(?:.*&)?v=|shorts\/|embed\/|live\/|v\/)|youtu\.be\/)([\w-]{11})',
             r'(?:youtube\.com\/watch\?v=|youtu\.be\/)([^&\n?#]+)',
         ]
         for p in patterns:
@@ -1,9 +1,21 @@
+import uuid
 import streamlit as st
-from src.app import YouTubeQA
+from src.session_manager import SessionManager
 
 st.set_page_config(page_title="YouTube Q&A", page_icon="🎥", layout="wide")
 
+
+@st.cache_resource
+def get_session_manager():
+    """One manager per process, so all browser sessions share video indexes."""
+    return SessionManager()
+
+
+sessions = get_session_manager()
+
 # Initialize session state
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = str(uuid.uuid4())
 if 'qa' not in st.session_state:
     st.session_state.qa = None
 if 'messages' not in st.session_state:
@@ -13,6 +25,11 @@ if 'ready' not in st.session_state:
 if 'temperature' not in st.session_state:
     st.session_state.temperature = 0.7  # Default temperature
 
+# Keep this session alive in the shared manager; start over if it expired while idle
+if st.session_state.qa and sessions.get(st.session_state.session_id) is not st.session_state.qa:
+    st.session_state.qa = None
+    st.session_state.ready = False
+
 # Sidebar
 with st.sidebar:
     st.header("⚙️ Configuration")
@@ -21,7 +38,8 @@ with st.sidebar:
     api_key = st.text_input("Groq API Key:", type="password")
     if st.button("Set API Key"):
         if api_key:
-            st.session_state.qa = YouTubeQA(api_key, st.session_state.temperature)
+            st.session_state.qa = sessions.get(st.session_state.session_id)
+            st.session_state.qa.set_api_key(api_key, st.session_state.temperature)
             st.success("✅ API key set!")
 
     st.divider()
@@ -58,21 +76,58 @@ with st.sidebar:
     st.divider()
 
     video_url = st.text_input("YouTube URL:")
+    language = st.text_input(
+        "Transcript language (optional):",
+        help="Caption language code such as 'en' or 'es'; empty uses the configured preference order"
+    ).strip() or None
     if st.button("Load Video"):
         if not st.session_state.qa:
             st.warning("⚠️ Set API key first!")
         elif video_url:
             with st.spinner("Loading video..."):
-                if st.session_state.qa.load_video(video_url):
+                thread_id = st.session_state.qa.thread_id
+                if st.session_state.qa.load_video(video_url, language=language):
                     st.session_state.ready = True
-                    st.success("✅ Video loaded!")
+                    if st.session_state.qa.thread_id != thread_id:
+                        # Another video starts a new conversation
+                        st.session_state.messages = []
+                    st.success(f"✅ Video loaded! ({st.session_state.qa.language} transcript)")
                 else:
                     st.error("❌ Failed to load video")
 
+    # Indexing and summaries continue in the background after loading
+    @st.fragment(run_every=1)
+    def show_ingestion_status():
+        if not (st.session_state.qa and st.session_state.ready):
+            return
+        progress = st.session_state.qa.ingestion_progress()
+        if progress["error"]:
+            st.error(f"❌ Indexing failed: {progress['error']}")
+        elif not progress["done"]:
+            st.progress(
+                progress["indexed"] / max(progress["total"], 1),
+                text=f"Indexing {progress['indexed']}/{progress['total']} chunks..."
+            )
+        st.caption(f"Video summary: {st.session_state.qa.summary_status()}")
+
+    show_ingestion_status()
+
     st.divider()
 
     if st.button("🗑️ Clear Chat"):
         st.session_state.messages = []
+        if st.session_state.qa:
+            st.session_state.qa.reset_conversation()
+
+    with st.expander("📊 Shared indexes"):
+        report = sessions.report()
+        st.caption(
+            f"{report['sessions']} sessions · {report['total_bytes'] / 2**20:.1f} / "
+            f"{report['budget_bytes'] / 2**20:.0f} MB · {report['hits']} hits, "
+            f"{report['misses']} misses, {report['evictions']} evictions"
+        )
+        for index in report["indexes"]:
+            st.caption(f"{index['video_id']}: {index['bytes'] / 2**20:.1f} MB, {index['refs']} sessions")
 
 # Main chat interface
 st.title("🎥 YouTube Video Q&A")
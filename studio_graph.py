@@ -22,16 +22,29 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import os
-from typing import TypedDict, Annotated, List
+import time
+from typing import TypedDict, Annotated, List, Tuple
+from typing_extensions import NotRequired
 import operator
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
-from langchain.tools import Tool
+from langchain_core.tools import tool
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
-from langgraph.prebuilt import ToolNode
-from langchain_groq import ChatGroq
+from langgraph.prebuilt import ToolNode, InjectedState
 
 # Import configuration (after load_dotenv)
-from config.settings import GROQ_MODEL_NAME, SYSTEM_PROMPT, MAX_ITERATIONS, DEFAULT_TEMPERATURE, get_api_key
+from config.settings import (
+    GROQ_MODEL_NAME, GROQ_FAST_MODEL_NAME, MODEL_ROUTING, LLM_PROVIDER,
+    MAX_ITERATIONS, DEFAULT_TEMPERATURE, QUERY_EXPANSION, get_api_key
+)
+from src.llm_manager import get_scheduler, create_chat_model, cached_prompt_tokens, KEYLESS_PROVIDERS, INTERACTIVE
+from src.youtube_loader import YouTubeLoader
+from src.vector_store import VectorStore
+from src.session_manager import IndexManager
+from src.prompt_registry import get_registry
+from src.query_expansion import QueryExpander
+from src.loop_control import chunk_ids, current_question, stop_reason, final_answer_message
+from src.citations import format_excerpts
 
 # ============================================================================
 # AGENT STATE DEFINITION
@@ -45,62 +58,129 @@ class AgentState(TypedDict):
         messages: List of conversation messages (user questions, AI responses, tool outputs)
                   The 'operator.add' annotation means new messages are appended to the list
         iterations: Counter to prevent infinite loops in the ReAct cycle
-        video_url: The YouTube URL being analyzed (set once at the start)
+        video_url: The YouTube URL being analyzed (set once at the start); the
+                   search tool looks the video's index up by it
         video_loaded: Boolean flag indicating if video transcript is loaded
         temperature: LLM temperature setting (0.0-1.0) for controlling randomness
+        language: Optional requested caption language (default: TRANSCRIPT_LANGUAGES order)
+        resolved_language: Caption language of the loaded index, resolved by the
+                           load_video node on every run (the thread's video may change)
+        started_at: time.time() when the question started (wall-clock budget)
+        prompt_version: System prompt version for this question, picked once by the
+                        load_video node from the thread's A/B split
     """
     messages: Annotated[List[BaseMessage], operator.add]
     iterations: int
     video_url: str
     video_loaded: bool
     temperature: float
+    language: NotRequired[str]
+    resolved_language: NotRequired[str]
+    started_at: NotRequired[float]
+    prompt_version: NotRequired[str]
 
 
 # ============================================================================
-# GLOBAL VARIABLES FOR VIDEO CONTEXT
+# VIDEO INDEXES
 # ============================================================================
-# These store the loaded video data so the graph can access it
-# In a production system, you might use a database or cache instead
-_vector_store = None
-_retriever = None
-_search_tool = None  # Global tool instance to ensure consistency
+# Loaded videos are kept in a process-wide IndexManager keyed by video ID and
+# caption language, so
+# Studio threads on different videos each get their own index, and threads on
+# the same video share one (built once, even when they start together).
+# References are only held while an index is in use (building it, or one
+# search), and are released in a finally, so a run that fails part-way
+# leaves nothing pinned. Idle indexes are evicted least recently used first
+# (INDEX_MEMORY_BUDGET_MB) and rebuilt on next use.
+_indexes = IndexManager()
+
+
+def _index_key(video_url: str, language: str) -> str:
+    try:
+        return f"{YouTubeLoader._extract_id(video_url)}:{language}"
+    except ValueError:
+        return f"{video_url}:{language}"
+
+
+def resolve_language(video_url: str, language: str = None) -> str:
+    """
+    Caption language the video's index is built from.
+
+    Args:
+        video_url: YouTube video URL
+        language: Requested language (default: first available of TRANSCRIPT_LANGUAGES)
+
+    Returns:
+        str: Language of the caption track that will be loaded
+    """
+    # Metadata is cached per video, so this extracts it at most once
+    return YouTubeLoader().resolve_language(video_url, language)
+
+
+def get_video_store(video_url: str, language: str) -> VectorStore:
+    """
+    Get the index for a video, loading it on first use.
+
+    The caller holds a reference to the index until it calls
+    release_video_store() with the same arguments.
+
+    Args:
+        video_url: YouTube video URL
+        language: Caption language from resolve_language()
+
+    Returns:
+        VectorStore: The video's index
+    """
+    def build():
+        loader = YouTubeLoader()
+        print(f"📥 Loading video: {video_url} ({language})")
+        transcript = loader.fetch_transcript(video_url, language)
+        # Chapters from the video's metadata bound the chunks and narrow searches
+        metadata = loader.video_metadata(video_url, transcript)
+        docs = loader.split_transcript(transcript, video_url, metadata.chapters)
+        print(f"✅ Loaded {len(docs)} document chunks")
+        store = VectorStore()
+        store.language = language
+        store.metadata = metadata
+        store.create(docs)
+        return store
+
+    return _indexes.acquire(_index_key(video_url, language), build)
+
+
+def release_video_store(video_url: str, language: str):
+    """
+    Drop the reference taken by get_video_store().
+
+    Args:
+        video_url: YouTube video URL
+        language: Caption language passed to get_video_store()
+    """
+    _indexes.release(_index_key(video_url, language))
 
 
 # ============================================================================
 # HELPER FUNCTION: LOAD VIDEO
 # ============================================================================
-def load_video_for_studio(video_url: str):
+def load_video_for_studio(video_url: str, language: str = None):
     """
     Load a YouTube video and create a vector store for searching.
     This function is called before running the graph in LangGraph Studio.
     
     Args:
         video_url: YouTube video URL (e.g., "https://youtube.com/watch?v=...")
+        language: Caption language (default: first available of TRANSCRIPT_LANGUAGES)
     
     Returns:
         bool: True if successful, False otherwise
     """
-    global _vector_store, _retriever
-    
     try:
-        # Import here to avoid circular dependencies
-        from src.youtube_loader import YouTubeLoader
-        from src.vector_store import VectorStore
-        
-        # Load YouTube transcript
-        print(f"Loading video: {video_url}")
-        loader = YouTubeLoader()
-        docs = loader.load(video_url)
-        print(f"Loaded {len(docs)} document chunks")
-        
-        # Create vector store for semantic search
-        _vector_store = VectorStore()
-        _vector_store.create(docs)
-        _retriever = _vector_store.as_retriever()
-        
+        # Only warms the cache; each graph run takes its own reference
+        language = resolve_language(video_url, language)
+        get_video_store(video_url, language)
+        release_video_store(video_url, language)
         print("✅ Video loaded successfully!")
         return True
-        
+
     except Exception as e:
         print(f"❌ Error loading video: {e}")
         return False
@@ -109,99 +189,83 @@ def load_video_for_studio(video_url: str):
 # ============================================================================
 # TOOL DEFINITION: SEARCH VIDEO TRANSCRIPT
 # ============================================================================
-def search_video_transcript(query: str) -> str:
-    """
-    Search the video transcript for relevant information.
-
-    Args:
-        query: The search query (what to look for in the video)
-
-    Returns:
-        str: Concatenated relevant transcript chunks
-    """
-    global _retriever
-
-    # Check if video is loaded
-    if _retriever is None:
-        return "Error: No video loaded. Please load a video first using load_video_for_studio(url)"
+@tool("search_video", response_format="content_and_artifact")
+def search_video_transcript(query: str, state: Annotated[dict, InjectedState]) -> Tuple[str, List[str]]:
+    """Search the YouTube video transcript for relevant information. Use this to find specific content from the video."""
+    # state is filled in from the graph state by ToolNode, not by the model
+    video_url = state.get("video_url")
+    if not video_url:
+        return "Error: No video loaded. Please set video_url in the graph state", []
 
     # Perform semantic search using invoke (not deprecated get_relevant_documents)
-    docs = _retriever.invoke(query)
+    # With QUERY_EXPANSION, the query and its sub-queries are searched in one batch
+    # (the llm mode rewrites the user question once, for all of its searches)
+    expander = QueryExpander(llm=create_llm(state, "rewrite") if QUERY_EXPANSION == "llm" else None)
+    # Held only for this search (load_video built it, so this is normally a cache hit)
+    store = get_video_store(video_url, state["resolved_language"])
+    try:
+        docs = store.as_retriever(expander=expander).invoke(query, question=current_question(state.get("messages", [])))
+    finally:
+        release_video_store(video_url, state["resolved_language"])
 
-    # Combine results into a single string
-    result = "\n\n".join([doc.page_content for doc in docs])
+    # Combine results into labelled excerpts ([c754] text); the chunk IDs (the artifact, not
+    # shown to the model) let the loop stop when a search finds nothing new
+    result = format_excerpts(docs)
 
-    return result if result else "No relevant information found in the video."
+    return (result if result else "No relevant information found in the video."), chunk_ids(docs)
 
 
 def get_search_tool():
     """
-    Get the global search tool instance.
+    Get the search tool instance.
 
-    This ensures the same tool instance is used throughout the graph,
-    preventing tool validation errors.
+    The same tool instance is bound to the LLM and run by the ToolNode,
+    preventing tool validation errors. It finds the video to search through
+    the video_url in the graph state.
 
     Returns:
-        Tool: LangChain Tool object that the agent can call
+        BaseTool: LangChain tool the agent can call
     """
-    global _search_tool
-
-    # Create tool only once
-    if _search_tool is None:
-        _search_tool = Tool(
-            name="search_video",
-            description="Search the YouTube video transcript for relevant information. Use this to find specific content from the video.",
-            func=search_video_transcript
-        )
-
-    return _search_tool
+    return search_video_transcript
 
 
 # ============================================================================
 # GRAPH NODE: LOAD VIDEO (IF NOT LOADED)
 # ============================================================================
-def load_video_node(state: AgentState) -> dict:
+def load_video_node(state: AgentState, config: RunnableConfig = None) -> dict:
     """
-    Load the video if it hasn't been loaded yet.
+    Make sure the state's video is indexed.
 
-    This node checks if the video is loaded and loads it if necessary.
-    It runs before the agent starts processing questions.
+    The index is looked up by video_url and language, so a thread whose video is already
+    cached (by this or any other thread) does not re-ingest it. No reference is
+    kept after the index is built; each search takes its own. The caption language is resolved
+    here, once per run, from the requested language (never from an earlier run's
+    video), and stored as resolved_language for the nodes after it. The
+    prompt version is picked here too, so both LLM nodes use the same one.
 
     Args:
         state: Current agent state
+        config: Run config (its thread_id picks the prompt version of the A/B split)
 
     Returns:
-        dict: Updated state with video_loaded flag
+        dict: Updated state with video_loaded flag, resolved_language and prompt_version
     """
-    global _vector_store, _retriever
-
-    # Check if video is already loaded
-    if state.get("video_loaded", False) and _retriever is not None:
-        return {"video_loaded": True}
-
-    # Load the video
     video_url = state.get("video_url", "")
     if not video_url:
         raise ValueError("No video URL provided in state")
 
     try:
-        # Import here to avoid circular dependencies
-        from src.youtube_loader import YouTubeLoader
-        from src.vector_store import VectorStore
-
-        # Load YouTube transcript
-        print(f"📥 Loading video: {video_url}")
-        loader = YouTubeLoader()
-        docs = loader.load(video_url)
-        print(f"✅ Loaded {len(docs)} document chunks")
-
-        # Create vector store for semantic search
-        _vector_store = VectorStore()
-        _vector_store.create(docs)
-        _retriever = _vector_store.as_retriever()
-
-        print("✅ Video loaded successfully!")
-        return {"video_loaded": True}
+        language = resolve_language(video_url, state.get("language"))
+        get_video_store(video_url, language)
+        release_video_store(video_url, language)
+        # The question's time budget starts once its video is available
+        thread_id = (config or {}).get("configurable", {}).get("thread_id")
+        return {
+            "video_loaded": True,
+            "resolved_language": language,
+            "started_at": time.time(),
+            "prompt_version": get_registry().version_for(thread_id)
+        }
 
     except Exception as e:
         error_msg = f"❌ Error loading video: {e}"
@@ -210,43 +274,131 @@ def load_video_node(state: AgentState) -> dict:
 
 
 # ============================================================================
-# GRAPH NODE: CALL MODEL (AGENT REASONING)
+# HELPER FUNCTION: CREATE LLM FOR A TURN
 # ============================================================================
-def call_model(state: AgentState) -> dict:
+def create_llm(state: AgentState, role: str):
     """
-    Agent node: The LLM reasons about the question and decides what to do.
+    Create the LLM for a kind of turn (Groq unless LLM_PROVIDER says otherwise).
 
-    This is where the "Reasoning" part of ReAct happens. The agent:
-    1. Looks at the conversation history
-    2. Decides if it needs to search the video
-    3. Either calls a tool or provides a final answer
+    MODEL_ROUTING in config/settings.py decides whether the turn runs on the
+    small fast model or the large model.
 
     Args:
-        state: Current agent state with messages and metadata
+        state: Current agent state (provides the temperature)
+        role: Turn type from MODEL_ROUTING ("tool_call" or "final")
 
     Returns:
-        dict: Updated state with new message and incremented iteration count
+        BaseChatModel: The LLM instance
     """
-    # Get the LLM (Groq GPT-OSS model)
     api_key = get_api_key()
-    if not api_key:
+    if not api_key and LLM_PROVIDER not in KEYLESS_PROVIDERS:
         raise ValueError("GROQ_API_KEY not set. Please set it in your .env file")
 
     # Get temperature from state, or use default
     temperature = state.get("temperature", DEFAULT_TEMPERATURE)
 
+    model = GROQ_FAST_MODEL_NAME if MODEL_ROUTING.get(role, "large") == "fast" else GROQ_MODEL_NAME
+
     # Create LLM with specified temperature
     # Temperature controls randomness: 0.0 = deterministic, 1.0 = creative
-    llm = ChatGroq(model=GROQ_MODEL_NAME, temperature=temperature, api_key=api_key)
+    return create_chat_model(model, temperature, LLM_PROVIDER, api_key)
+
+
+# ============================================================================
+# HELPER FUNCTION: CALL AN LLM WITH THE QUESTION'S PROMPT VERSION
+# ============================================================================
+def call_llm(state: AgentState, runnable, history: List[BaseMessage], *extra: BaseMessage):
+    """
+    Invoke a model with the question's system prompt in front of history.
+
+    Uses the prompt version pinned in the state, so a hot reload cannot switch
+    prompts mid-question, and records usage per version like the app's agent.
+
+    Args:
+        state: Current agent state (provides prompt_version and started_at)
+        runnable: Chat model, optionally with tools bound
+        history: Conversation messages
+        *extra: Messages appended for this call only
+
+    Returns:
+        AIMessage: The model response
+    """
+    registry = get_registry()
+    version = state.get("prompt_version") or registry.version_for()
+    messages = registry.get(version).messages(history, *extra)
+    response = get_scheduler().invoke(runnable, messages, INTERACTIVE)
+    registry.record_call(version, response.usage_metadata, cached_prompt_tokens(response))
+
+    # The question ends with this call when the graph routes it to END
+    iterations = state.get("iterations", 0) + 1
+    if should_continue({"messages": [response], "iterations": iterations}) == "end":
+        registry.record_question(version, time.time() - state.get("started_at", time.time()))
+    return response
 
-    # Bind the search tool to the LLM so it can call it
-    llm_with_tools = llm.bind_tools([get_search_tool()])
 
-    # Prepare messages: system prompt + conversation history
-    messages = [HumanMessage(content=SYSTEM_PROMPT)] + state["messages"]
+# ============================================================================
+# GRAPH NODE: CALL TOOL MODEL (FIRST SEARCH)
+# ============================================================================
+def call_tool_model(state: AgentState) -> dict:
+    """
+    First agent turn: pick the search query.
+
+    The model is forced to call search_video, so this turn never writes an
+    answer and runs on the fast model (MODEL_ROUTING["tool_call"]).
 
-    # Call the LLM - it will decide whether to use tools or answer directly
-    response = llm_with_tools.invoke(messages)
+    Args:
+        state: Current agent state with messages and metadata
+
+    Returns:
+        dict: Updated state with the tool call message and incremented iteration count
+    """
+    llm = create_llm(state, "tool_call")
+    llm_force_tool = llm.bind_tools([get_search_tool()], tool_choice="search_video")
+
+    response = call_llm(state, llm_force_tool, state["messages"])
+
+    return {
+        "messages": [response],
+        "iterations": state.get("iterations", 0) + 1
+    }
+
+
+# ============================================================================
+# GRAPH NODE: CALL MODEL (AGENT REASONING)
+# ============================================================================
+def call_model(state: AgentState) -> dict:
+    """
+    Agent node: The LLM reasons about the question and decides what to do.
+
+    This is where the "Reasoning" part of ReAct happens. The agent:
+    1. Looks at the conversation history
+    2. Decides if it needs to search the video
+    3. Either calls a tool or provides a final answer
+
+    When the last search found no new chunks, or the question's time, token
+    or iteration budget is used up (src/loop_control.py), the LLM is called
+    without tools and told to answer from what was already retrieved.
+
+    Args:
+        state: Current agent state with messages and metadata
+
+    Returns:
+        dict: Updated state with new message and incremented iteration count
+    """
+    # Get the LLM for turns that may write the final answer (large model)
+    llm = create_llm(state, "final")
+
+    # call_llm puts the question's system prompt (a stable SystemMessage prefix,
+    # so provider prompt caching applies) in front of the conversation history
+    if stop_reason(state):
+        # Stop searching: no tools, answer from the excerpts retrieved so far
+        response = call_llm(state, llm, state["messages"], final_answer_message())
+    else:
+        # Bind the search tool to the LLM so it can call it
+        llm_with_tools = llm.bind_tools([get_search_tool()])
+
+        # Call the LLM - it will decide whether to use tools or answer directly
+        response = call_llm(state, llm_with_tools, state["messages"])
 
     # Return updated state
     return {
@@ -302,12 +454,14 @@ def build_graph():
     Build the LangGraph ReAct agent graph.
 
     Graph structure:
-        START → load_video → agent → [decision] → tools → agent → ... → END
-                                         ↓
-                                        END
+        START → load_video → tool_call → tools → agent → [decision] → tools → agent → ... → END
+                                                             ↓
+                                                            END
 
-    The graph first loads the video (if not loaded), then the agent alternates
-    between reasoning (agent node) and acting (tools node) until it has a final answer.
+    The graph first loads the video (if not loaded), then the fast model picks
+    the first search (tool_call node). After that the agent alternates between
+    reasoning (agent node, large model) and acting (tools node) until it has a
+    final answer.
 
     Returns:
         CompiledGraph: The compiled graph ready for execution
@@ -321,14 +475,23 @@ def build_graph():
 
     # Add nodes
     workflow.add_node("load_video", load_video_node)  # Video loading node
+    workflow.add_node("tool_call", call_tool_model)   # First search (fast model)
     workflow.add_node("agent", call_model)            # Reasoning node
     workflow.add_node("tools", tool_node)             # Acting node (using ToolNode)
 
     # Set entry point - start by loading video
     workflow.set_entry_point("load_video")
 
-    # After loading video, go to agent
-    workflow.add_edge("load_video", "agent")
+    # After loading video, pick the first search
+    workflow.add_edge("load_video", "tool_call")
+    workflow.add_conditional_edges(
+        "tool_call",
+        should_continue,
+        {
+            "continue": "tools",
+            "end": END
+        }
+    )
 
     # Add conditional routing from agent
     workflow.add_conditional_edges(
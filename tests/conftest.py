@@ -0,0 +1,48 @@
+"""
+Shared test setup: everything runs offline.
+
+The fake chat model and hashing embeddings (src/offline_models.py) stand in
+for Groq and HuggingFace, synthetic videos are served from the loader's
+metadata cache (benchmarks.loadtest.register_videos), and conversation
+checkpoints go to a temporary SQLite file.
+"""
+
+import os
+
+# Read by config.settings at import time, so set before any src import
+os.environ.setdefault("LLM_PROVIDER", "fake")
+os.environ.setdefault("EMBEDDING_PROVIDER", "hashing")
+os.environ.setdefault("FAKE_LLM_LATENCY", "0")
+os.environ.setdefault("FAKE_LLM_TOKENS_PER_SECOND", "100000")
+os.environ.setdefault("EMBEDDING_PROCESSES", "0")
+
+import pytest
+from langchain_core.documents import Document
+
+
+@pytest.fixture(scope="session", autouse=True)
+def checkpointer(tmp_path_factory):
+    """Point the process-wide checkpointer at a temporary database."""
+    from src.memory import get_checkpointer
+    return get_checkpointer(tmp_path_factory.mktemp("checkpoints") / "checkpoints.sqlite")
+
+
+@pytest.fixture(scope="session")
+def videos():
+    """Two synthetic videos (2 and 3 minutes) loadable without network access."""
+    from benchmarks.loadtest import register_videos
+    return register_videos([2, 3], seed=7)
+
+
+def make_store(chunks: int = 20, source: str = "https://youtu.be/test0000000", times: bool = True):
+    """Small VectorStore over numbered chunks (with start/end times unless times is False)."""
+    from src.vector_store import VectorStore
+    docs = []
+    for i in range(chunks):
+        metadata = {"source": source}
+        if times:
+            metadata.update(start=i * 10.0, end=i * 10.0 + 9.0)
+        docs.append(Document(page_content=f"chunk {i} talks about topic {i % 5}", metadata=metadata))
+    store = VectorStore()
+    store.create(docs)
+    return store
@@ -0,0 +1,71 @@
+import time
+import asyncio
+import pytest
+from src.server import AdmissionController, Overloaded
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_slots_are_released_and_idle_tenants_dropped():
+    async def scenario():
+        admission = AdmissionController(max_concurrency=2, tenant_concurrency=1, max_queue=10, queue_timeout=1)
+        for i in range(20):
+            async with admission.slot(f"tenant{i}"):
+                assert admission.stats()["active"] == 1
+        return admission.stats()
+
+    stats = run(scenario())
+    assert stats["active"] == 0 and stats["tenants"] == 0 and stats["rejected"] == 0
+
+
+def test_full_queue_is_rejected():
+    async def scenario():
+        admission = AdmissionController(max_concurrency=1, tenant_concurrency=1, max_queue=1, queue_timeout=5)
+        await admission.acquire("a")
+        waiter = asyncio.create_task(admission.acquire("b"))
+        await asyncio.sleep(0.01)
+        with pytest.raises(Overloaded, match="queue is full"):
+            await admission.acquire("c")
+        admission.release("a")
+        await waiter
+        admission.release("b")
+        return admission.stats()
+
+    stats = run(scenario())
+    assert stats["rejected"] == 1 and stats["tenants"] == 0
+
+
+def test_tenant_and_global_waits_share_one_deadline():
+    async def scenario():
+        admission = AdmissionController(max_concurrency=1, tenant_concurrency=1, max_queue=10, queue_timeout=0.3)
+        await admission.acquire("a")  # Holds the global slot and tenant a's slot
+
+        async def free_tenant_slot_later():
+            await asyncio.sleep(0.2)
+            admission._tenants["a"][0].release()
+
+        asyncio.create_task(free_tenant_slot_later())
+        started = time.monotonic()
+        with pytest.raises(Overloaded, match="Timed out"):
+            await admission.acquire("a")  # Tenant slot after 0.2s, then only 0.1s left for the global one
+        return time.monotonic() - started, admission.stats()
+
+    waited, stats = run(scenario())
+    assert waited < 0.45
+    assert stats["waiting"] == 0 and stats["rejected"] == 1
+
+
+def test_drain_rejects_new_requests_and_waits_for_active_ones():
+    async def scenario():
+        admission = AdmissionController(max_concurrency=2, tenant_concurrency=2, max_queue=10, queue_timeout=1)
+        await admission.acquire("a")
+        drained = asyncio.create_task(admission.drain(timeout=1))
+        await asyncio.sleep(0.01)
+        with pytest.raises(Overloaded, match="shutting down"):
+            await admission.acquire("b")
+        admission.release("a")
+        return await drained
+
+    assert run(scenario()) is True
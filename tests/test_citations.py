@@ -0,0 +1,32 @@
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from src.citations import format_excerpts, question_sources, add_citations
+from src.loop_control import chunk_ids
+from tests.conftest import make_store
+
+
+def _sources(docs) -> dict:
+    call = AIMessage(content="", tool_calls=[{"name": "search_video", "args": {"query": "q"}, "id": "1"}])
+    result = ToolMessage(content=format_excerpts(docs), tool_call_id="1", artifact=chunk_ids(docs))
+    return question_sources([HumanMessage(content="q"), call, result])
+
+
+def test_timed_chunks_are_cited_with_timestamp_links():
+    docs = make_store().search("topic 3", k=2)
+    start = int(docs[0].metadata["start"])
+    assert f"[c{start}] " in format_excerpts(docs)
+
+    answer = add_citations(f"Explained here [c{start}].", _sources(docs))
+    assert f"watch?v=test0000000&t={start}s" in answer
+
+
+def test_transcript_without_times_gets_position_labels_and_no_links():
+    docs = make_store(times=False).search("topic 3", k=3)
+    excerpts = format_excerpts(docs)
+    assert [line[:4] for line in excerpts.split("\n\n")] == ["[p1]", "[p2]", "[p3]"]
+    assert "[c0]" not in excerpts
+
+    sources = _sources(docs)
+    assert set(sources) == {"p1", "p2", "p3"}
+    answer = add_citations("First point [p1]. Second point [p2, p3].", sources)
+    assert answer == "First point. Second point."
+    assert "&t=" not in answer
@@ -0,0 +1,28 @@
+import math
+from langchain_core.documents import Document
+from src.docstore import CompactDocstore
+
+
+def _store() -> CompactDocstore:
+    store = CompactDocstore()
+    store.add({
+        "0": Document(page_content="timed chunk", metadata={"source": "v", "start": 12.5, "end": 20.0}),
+        "1": Document(page_content="untimed chunk", metadata={"source": "v", "speaker": "A"})
+    })
+    return store
+
+
+def test_missing_times_are_left_out_of_the_metadata():
+    store = _store()
+    assert store.search("0").metadata == {"source": "v", "start": 12.5, "end": 20.0}
+    assert store.search("1").metadata == {"source": "v", "speaker": "A"}
+    assert math.isnan(store._start[1])
+
+
+def test_mapped_store_counts_its_mapped_size(tmp_path):
+    store = _store()
+    store.save(tmp_path)
+    mapped = CompactDocstore.load(tmp_path, mmap_mode=True)
+
+    assert mapped.memory_usage() == store.memory_usage() > 0
+    assert mapped.search("1").metadata == {"source": "v", "speaker": "A"}
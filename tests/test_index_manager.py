@@ -0,0 +1,78 @@
+import threading
+from src.session_manager import IndexManager
+from tests.conftest import make_store
+
+
+def test_acquire_builds_once_and_counts_references():
+    manager = IndexManager()
+    builds = []
+
+    def build():
+        builds.append(1)
+        return make_store()
+
+    first = manager.acquire("v1", build)
+    second = manager.acquire("v1", build)
+
+    assert first is second
+    assert len(builds) == 1
+    assert manager.report()["indexes"][0]["refs"] == 2
+    manager.release("v1")
+    manager.release("v1")
+    assert manager.report()["indexes"][0]["refs"] == 0
+
+
+def test_concurrent_misses_share_one_entry():
+    manager = IndexManager()
+    builds = []
+    gate = threading.Barrier(4)
+
+    def build():
+        builds.append(1)
+        return make_store()
+
+    stores = []
+
+    def worker():
+        gate.wait()
+        stores.append(manager.acquire("v1", build))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len({id(s) for s in stores}) == 1
+    assert len(manager.report()["indexes"]) == 1
+    assert manager.report()["indexes"][0]["refs"] == 4
+    # Either one build, or a late flight that found the first build's entry
+    assert len(builds) == 1
+
+
+def test_build_after_a_finished_flight_reuses_the_cached_index():
+    manager = IndexManager()
+    cached = manager.acquire("v1", make_store)
+
+    # A caller that missed before the entry existed starts its own flight
+    def fail():
+        raise AssertionError("should not rebuild")
+
+    assert manager._build("v1", fail) is cached
+    assert manager._add("v1", make_store()) is cached
+    assert manager.report()["indexes"][0]["refs"] == 2
+
+
+def test_idle_indexes_are_evicted_least_recently_used_first():
+    manager = IndexManager(memory_budget_mb=0)
+    manager.acquire("v1", make_store)
+    manager.acquire("v2", make_store)
+
+    manager.release("v1")
+    assert [i["video_id"] for i in manager.report()["indexes"]] == ["v2"]
+    assert manager.evictions == 1
+
+    # Held indexes stay even over budget
+    assert manager.report()["indexes"][0]["refs"] == 1
+    manager.release("v2")
+    assert manager.report()["indexes"] == []
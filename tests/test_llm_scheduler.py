@@ -0,0 +1,58 @@
+import pytest
+from langchain_core.messages import AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGenerationChunk
+from src.llm_manager import LLMScheduler
+from src.offline_models import FakeChatModel
+
+
+class ServerError(Exception):
+    status_code = 503
+
+
+class FlakyModel(FakeChatModel):
+    """Fails its first attempts with a retryable error, after streaming `sent` tokens."""
+
+    failures: int = 1
+    sent: int = 0
+    attempts: int = 0
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.attempts += 1
+        for i in range(self.sent):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=f"t{i} "))
+        if self.attempts <= self.failures:
+            raise ServerError("upstream failed")
+        yield from super()._stream(messages, stop, run_manager, **kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise ServerError("upstream failed")
+        return super()._generate(messages, stop, run_manager, **kwargs)
+
+
+def _scheduler():
+    return LLMScheduler(requests_per_minute=1000, tokens_per_minute=10 ** 7, backoff_base=0.001, backoff_max=0.001)
+
+
+def test_failed_call_is_retried_before_any_token():
+    scheduler = _scheduler()
+    model = FlakyModel(latency=0)
+    assert scheduler.invoke(model, [HumanMessage(content="hello")]).content
+    assert model.attempts == 2 and scheduler.metrics()["retries"] == 1
+
+
+def test_stream_that_sent_tokens_is_not_retried():
+    scheduler = _scheduler()
+    model = FlakyModel(latency=0, sent=3)
+    with pytest.raises(ServerError):
+        scheduler.invoke(model.bind(stream=True), [HumanMessage(content="hello")])
+    assert model.attempts == 1
+    assert scheduler.metrics()["retries"] == 0 and scheduler.metrics()["failures"] == 1
+
+
+def test_stream_that_failed_before_its_first_token_is_retried():
+    scheduler = _scheduler()
+    model = FlakyModel(latency=0, sent=0)
+    assert scheduler.invoke(model.bind(stream=True), [HumanMessage(content="hello")]).content
+    assert model.attempts == 2
@@ -0,0 +1,49 @@
+import time
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from src.loop_control import chunk_ids, stop_reason
+
+
+def _search(call_id: str, docs) -> list:
+    call = AIMessage(content="", tool_calls=[{"name": "search_video", "args": {"query": "q"}, "id": call_id}])
+    return [call, ToolMessage(content="excerpts", tool_call_id=call_id, artifact=chunk_ids(docs))]
+
+
+def _docs(*starts) -> list:
+    return [Document(page_content=f"text {s}", metadata={"source": "v", "start": s}) for s in starts]
+
+
+def test_model_decides_while_searches_find_new_chunks():
+    messages = [HumanMessage(content="q")] + _search("1", _docs(0, 10)) + _search("2", _docs(10, 20))
+    assert stop_reason({"messages": messages, "iterations": 2}) is None
+
+
+def test_repeated_search_stops_the_loop():
+    messages = [HumanMessage(content="q")] + _search("1", _docs(0, 10)) + _search("2", _docs(10, 0))
+    assert stop_reason({"messages": messages, "iterations": 2}) == "no_new_chunks"
+
+
+def test_chunks_without_start_times_stay_distinct():
+    untimed = [Document(page_content=f"untimed {i}", metadata={"source": "v"}) for i in range(4)]
+    assert len(set(chunk_ids(untimed))) == 4
+
+    messages = [HumanMessage(content="q")] + _search("1", untimed[:2]) + _search("2", untimed[2:])
+    assert stop_reason({"messages": messages, "iterations": 2}) is None
+    messages += _search("3", untimed[1:3])
+    assert stop_reason({"messages": messages, "iterations": 3}) == "no_new_chunks"
+
+
+def test_only_the_current_question_counts():
+    messages = [HumanMessage(content="earlier")] + _search("1", _docs(0))
+    messages += [AIMessage(content="answer"), HumanMessage(content="q")] + _search("2", _docs(0))
+    assert stop_reason({"messages": messages, "iterations": 1}) is None
+
+
+def test_budgets():
+    messages = [HumanMessage(content="q")] + _search("1", _docs(0))
+    assert stop_reason({"messages": messages, "iterations": 1, "started_at": time.time() - 60}, max_seconds=30) == "time_budget"
+    assert stop_reason({"messages": messages, "iterations": 4}, max_iterations=5) == "max_iterations"
+
+    messages[1].usage_metadata = {"input_tokens": 900, "output_tokens": 200, "total_tokens": 1100}
+    assert stop_reason({"messages": messages, "iterations": 1}, max_tokens=1000) == "token_budget"
+    assert stop_reason({"messages": messages, "iterations": 1}, max_tokens=0) is None
@@ -0,0 +1,43 @@
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from src.query_expansion import QueryExpander, keywords
+from tests.conftest import make_store
+
+
+class CountingModel(FakeListChatModel):
+    calls: int = 0
+
+    def _call(self, *args, **kwargs):
+        self.calls += 1
+        return super()._call(*args, **kwargs)
+
+
+def _rewriter() -> CountingModel:
+    return CountingModel(responses=["topic 1 overview\ntopic 2 details\ntopic 3 examples"])
+
+
+def test_keywords_drop_stopwords():
+    assert keywords("What does the video say about topic 3?") == ["topic"]
+
+
+def test_llm_expansion_runs_once_per_question():
+    rewriter = _rewriter()
+    expander = QueryExpander("llm", rewriter)
+    question = "What are the topics of this unique test question?"
+
+    first = expander.expand("topics", question)
+    second = expander.expand("topic details", question)
+    assert rewriter.calls == 1  # The second search reused the question's sub-queries
+    assert first[0] == "topics" and second[0] == "topic details"
+    assert first[1:] == second[1:] == ["topic 1 overview", "topic 2 details", "topic 3 examples"]
+
+    expander.expand("topics", "A different question about the topics?")
+    assert rewriter.calls == 2
+
+
+def test_retriever_passes_the_question_to_the_expander():
+    rewriter = _rewriter()
+    retriever = make_store().as_retriever(expander=QueryExpander("llm", rewriter))
+    question = "Which topics does the retriever test cover?"
+    for query in ("topic 1", "topic 2", "topic 3"):
+        assert retriever.invoke(query, question=question)
+    assert rewriter.calls == 1
@@ -0,0 +1,97 @@
+import json
+import time
+import asyncio
+import threading
+import httpx
+import pytest
+from src.server import create_app
+from src.session_manager import SessionManager
+
+
+async def _client(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", timeout=60)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_ask_answers_as_json_and_as_server_sent_events(videos):
+    url, topics = videos[0]
+    app = create_app(SessionManager())
+
+    async def scenario():
+        async with app.router.lifespan_context(app):
+            async with await _client(app) as client:
+                loaded = await client.post("/videos", json={"session_id": "s1", "url": url})
+                assert loaded.status_code == 200 and loaded.json()["ready"]
+
+                answer = await client.post("/ask", json={"session_id": "s1", "question": f"What about {topics[0]}?"})
+                assert answer.status_code == 200 and answer.json()["answer"]
+
+                async with client.stream(
+                    "POST", "/ask", json={"session_id": "s1", "question": f"And {topics[-1]}?", "stream": True}
+                ) as response:
+                    assert response.headers["content-type"].startswith("text/event-stream")
+                    body = "".join([chunk async for chunk in response.aiter_text()])
+        return body
+
+    events = [e for e in run(scenario()).split("\n\n") if e]
+    deltas = "".join(json.loads(e[len("data: "):])["delta"] for e in events if e.startswith("data: "))
+    done = [e for e in events if e.startswith("event: done")]
+    assert len(done) == 1
+    assert json.loads(done[0].split("data: ", 1)[1])["answer"] == deltas != ""
+    assert app.state.admission.stats()["active"] == 0
+
+
+def test_ask_never_creates_a_session():
+    sessions = SessionManager()
+    app = create_app(sessions)
+
+    async def scenario():
+        async with app.router.lifespan_context(app):
+            async with await _client(app) as client:
+                return await client.post("/ask", json={"session_id": "missing", "question": "hi"})
+
+    assert run(scenario()).status_code == 409
+    assert sessions.peek("missing") is None
+
+
+def test_touch_does_not_revive_an_expired_session():
+    sessions = SessionManager(idle_timeout=0.05)
+    qa = sessions.get("s1")
+    assert sessions.touch("s1") is qa
+
+    time.sleep(0.1)
+    assert sessions.touch("s1") is None
+    assert sessions.peek("s1") is None
+
+
+def test_questions_of_one_session_run_one_at_a_time(videos):
+    url, _ = videos[0]
+    sessions = SessionManager()
+    app = create_app(sessions)
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def slow_ask(question, thread_id=None):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return "ok"
+
+    async def scenario():
+        async with app.router.lifespan_context(app):
+            async with await _client(app) as client:
+                await client.post("/videos", json={"session_id": "s1", "url": url})
+                sessions.peek("s1").ask = slow_ask
+                return await asyncio.gather(*[
+                    client.post("/ask", json={"session_id": "s1", "question": f"q{i}"}) for i in range(4)
+                ])
+
+    responses = run(scenario())
+    assert [r.status_code for r in responses] == [200] * 4
+    assert peak[0] == 1
@@ -0,0 +1,38 @@
+import time
+from src.memory import get_checkpointer
+from src.session_manager import IndexManager, SessionManager
+
+
+def _checkpoints(thread_id: str) -> int:
+    return len(list(get_checkpointer().list({"configurable": {"thread_id": thread_id}})))
+
+
+def test_idle_sessions_expire_and_release_their_index(videos):
+    url, topics = videos[0]
+    sessions = SessionManager(IndexManager(), idle_timeout=0.2)
+    qa = sessions.get("s1")
+    assert qa.load_video(url, summarize=False, background=False)
+    qa.ask(f"What about {topics[0]}?")
+    thread_id = qa.thread_id
+    assert _checkpoints(thread_id) > 0
+    assert sessions.index_manager.report()["indexes"][0]["refs"] == 1
+
+    time.sleep(0.3)
+    sessions.expire_idle()
+
+    assert sessions.peek("s1") is None
+    assert sessions.index_manager.report()["indexes"][0]["refs"] == 0
+    assert _checkpoints(thread_id) == 0  # Expired conversations are forgotten
+
+
+def test_sessions_on_one_video_share_its_index(videos):
+    url, _ = videos[1]
+    sessions = SessionManager(IndexManager())
+    first, second = sessions.get("a"), sessions.get("b")
+    assert first.load_video(url, summarize=False, background=False)
+    assert second.load_video(url, summarize=False, background=False)
+
+    report = sessions.index_manager.report()
+    assert len(report["indexes"]) == 1 and report["indexes"][0]["refs"] == 2
+    sessions.close_all()
+    assert sessions.index_manager.report()["indexes"][0]["refs"] == 0
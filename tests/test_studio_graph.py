@@ -0,0 +1,99 @@
+import pytest
+from langchain_core.messages import HumanMessage
+import studio_graph
+
+
+def _refs():
+    return {i["video_id"]: i["refs"] for i in studio_graph._indexes.report()["indexes"]}
+
+
+def _run(url: str, question: str, config_thread: str = None, **state):
+    config = {"configurable": {"thread_id": config_thread}} if config_thread else None
+    return studio_graph.graph.invoke({
+        "messages": [HumanMessage(content=question)],
+        "iterations": 0,
+        "video_url": url,
+        "video_loaded": False,
+        "temperature": 0.0,
+        **state
+    }, config)
+
+
+def test_run_answers_and_holds_no_reference(videos):
+    url, topics = videos[0]
+    result = _run(url, f"What about {topics[0]}?")
+    assert result["messages"][-1].content
+    assert set(_refs().values()) == {0}
+
+
+def test_run_pins_and_records_its_prompt_version(videos):
+    from src.prompt_registry import get_registry
+    url, topics = videos[0]
+    registry = get_registry()
+    version = registry.version_for("studio-thread")
+
+    def stats():
+        return registry.report()["stats"].get(version, {"questions": 0, "llm_calls": 0})
+
+    before = stats()
+    result = _run(url, f"What about {topics[0]}?", config_thread="studio-thread")
+    assert result["prompt_version"] == version
+    assert stats()["questions"] == before["questions"] + 1
+    assert stats()["llm_calls"] >= before["llm_calls"] + 2  # tool_call and agent turns
+
+
+def test_failed_run_releases_the_index(videos, monkeypatch):
+    url, topics = videos[0]
+    create_llm = studio_graph.create_llm
+
+    def failing_final_llm(state, role):
+        if role == "final":
+            raise RuntimeError("LLM unavailable")
+        return create_llm(state, role)
+
+    # Fails in the agent node, after load_video and the first search
+    monkeypatch.setattr(studio_graph, "create_llm", failing_final_llm)
+    with pytest.raises(RuntimeError, match="LLM unavailable"):
+        _run(url, f"What about {topics[0]}?")
+    assert set(_refs().values()) == {0}
+
+
+def test_failed_search_releases_the_index(videos, monkeypatch):
+    url, topics = videos[0]
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("index broken")
+
+    monkeypatch.setattr(studio_graph.VectorStore, "as_retriever", broken)
+    result = _run(url, f"What about {topics[0]}?")  # ToolNode reports the error to the model
+    assert any("index broken" in str(m.content) for m in result["messages"])
+    assert set(_refs().values()) == {0}
+
+
+def test_thread_switching_video_resolves_its_own_language(videos):
+    import copy
+    from langgraph.checkpoint.memory import MemorySaver
+    from src import youtube_loader
+
+    # A copy of the first video with German captions only
+    english_url, topics = videos[0]
+    with youtube_loader._info_lock:
+        expires, info = youtube_loader._info_cache[english_url.rsplit("=", 1)[1]]
+        german = copy.deepcopy(info)
+        german.update(id="germanvid01", language="de", subtitles={"de": info["subtitles"]["en"]})
+        youtube_loader._info_cache["germanvid01"] = (expires, german)
+    german_url = "https://www.youtube.com/watch?v=germanvid01"
+
+    graph = studio_graph.build_graph().builder.compile(checkpointer=MemorySaver())
+    config = {"configurable": {"thread_id": "t1"}}
+
+    def ask(url):
+        return graph.invoke({
+            "messages": [HumanMessage(content=f"What about {topics[0]}?")],
+            "iterations": 0, "video_url": url, "video_loaded": False, "temperature": 0.0
+        }, config)
+
+    assert ask(german_url)["resolved_language"] == "de"
+    result = ask(english_url)  # Same thread, video without German captions
+    assert result["resolved_language"] == "en" and "language" not in result
+    assert set(_refs().values()) == {0}